@@ -0,0 +1,88 @@
+"""
+Compare per-call requests.get against the pooled keep-alive connections used
+by hockeyapp.api.APIRequest, counting the connections opened against a local
+stub server.
+
+    python benchmarks/connection_pool.py [calls]
+
+"""
+import sys
+import threading
+import time
+
+try:
+    from http import server
+    from socketserver import ThreadingMixIn
+except ImportError:
+    import BaseHTTPServer as server
+    from SocketServer import ThreadingMixIn
+
+import requests
+
+from hockeyapp import api
+
+TOKEN = 'abcdef0123456789abcdef0123456789'
+
+
+class StubHandler(server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self):
+        StubHandler.connections += 1
+        server.BaseHTTPRequestHandler.setup(self)
+
+    def do_GET(self):
+        body = b'{"apps": []}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingMixIn, server.HTTPServer):
+    daemon_threads = True
+
+
+class LocalRequest(api.APIRequest):
+    SERVER = None
+
+    def _build_uri(self, path_parts):
+        return 'http://%s%s/%s' % (self.SERVER, self.BASE_URI,
+                                   '/'.join(path_parts))
+
+
+def run(label, func, calls):
+    StubHandler.connections = 0
+    start = time.time()
+    for _ignore in range(calls):
+        func()
+    duration = time.time() - start
+    print('%-16s %6d calls %6d connections %8.3fs' %
+          (label, calls, StubHandler.connections, duration))
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    httpd = StubServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    LocalRequest.SERVER = '%s:%s' % httpd.server_address
+    request = LocalRequest(TOKEN, api.ConnectionPool())
+    uri = request._build_uri(['apps'])
+
+    run('requests.get', lambda: requests.get(uri, headers=request.headers),
+        calls)
+    run('ConnectionPool', lambda: request._get(['apps']), calls)
+    httpd.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Measure the throughput of hockeyapp.crashparse on synthetic Apple and Android
+crash logs with a realistic number of threads and binary images.
+
+    python benchmarks/crash_parse.py [logs]
+
+"""
+import sys
+import time
+
+from hockeyapp import crashparse
+
+
+def apple_log(index):
+    """Return an Apple crash log with 20 threads and 300 binary images"""
+    lines = ['Incident Identifier: %08d-344E-4D9E-84E0-87AFD0D0AE7B' % index,
+             'Hardware Model:      iPhone10,3',
+             'Process:         MyApp [3596]',
+             'Identifier:      net.hockeyapp.MyApp',
+             'Version:         1.0 (%d)' % (index % 50),
+             'Code Type:       ARM-64',
+             'OS Version:      iPhone OS 13.3 (17C54)',
+             'Exception Type:  EXC_BAD_ACCESS (SIGSEGV)',
+             'Exception Codes: KERN_INVALID_ADDRESS at 0x0000000000000010',
+             'Crashed Thread:  3', '']
+    for thread in range(20):
+        lines.append('Thread %d%s:' % (thread,
+                                       ' Crashed' if thread == 3 else ''))
+        for frame in range(25):
+            lines.append('%-4d%-30s\t0x%016x -[Class%d method%d:] + %d '
+                         '(Class%d.m:%d)' % (frame, 'MyApp', 0x100f1c2a4 +
+                                              frame * 64, frame, thread,
+                                              frame * 4 + index % 7, frame,
+                                              frame + 10))
+        lines.append('')
+    lines.append('Binary Images:')
+    for image in range(300):
+        lines.append('0x%x - 0x%x Image%d arm64  <%032x> /usr/lib/Image%d'
+                     % (0x100000000 + image * 0x100000,
+                        0x1000fffff + image * 0x100000, image, image, image))
+    return '\n'.join(lines) + '\n'
+
+
+def android_log(index):
+    """Return an Android crash log with a cause"""
+    lines = ['Package: net.hockeyapp.myapp', 'Version Code: %d' % index,
+             'Version Name: 1.0', 'Android: 9', 'Manufacturer: Google',
+             'Model: Pixel 3', '',
+             'java.lang.IllegalStateException: Could not execute method']
+    for frame in range(40):
+        lines.append('\tat com.example.Class%d.method%d(Class%d.java:%d)'
+                     % (frame, frame, frame, frame + index % 5))
+    lines.append('Caused by: java.lang.NullPointerException')
+    lines.append('\tat com.example.Foo.bar(Foo.java:10)')
+    lines.append('\t... 40 more')
+    return '\n'.join(lines) + '\n'
+
+
+def run(label, logs):
+    start = time.time()
+    signatures = set()
+    for log in logs:
+        signatures.add(crashparse.signature(crashparse.parse_string(log)))
+    elapsed = time.time() - start
+    print('%-10s %6d logs %8.3fs %10.0f logs/s %12.0f logs/hour, '
+          '%d signatures' % (label, len(logs), elapsed, len(logs) / elapsed,
+                             len(logs) / elapsed * 3600, len(signatures)))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    run('apple', [apple_log(index) for index in range(count)])
+    run('android', [android_log(index) for index in range(count)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Compare the serial zipfile loop previously used by Application.upload with
+the multi-core hockeyapp.dsym.pack when compressing a synthetic .dSYM bundle.
+
+    python benchmarks/dsym_pack.py [megabytes] [files]
+
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+from hockeyapp import dsym
+
+
+def make_bundle(root, megabytes, files):
+    """Create a bundle of DWARF-like files that compress about 3:1"""
+    path = os.path.join(root, 'App.app.dSYM')
+    dwarf = os.path.join(path, 'Contents', 'Resources', 'DWARF')
+    os.makedirs(dwarf)
+    words = [os.urandom(8).hex().encode('ascii') for _ignore in range(4096)]
+    size = megabytes * 1048576 // files
+    for index in range(files):
+        with open(os.path.join(dwarf, 'App%d' % index), 'wb') as handle:
+            written = 0
+            while written < size:
+                chunk = b' '.join(random.choice(words) for _i in range(8192))
+                handle.write(chunk)
+                written += len(chunk)
+    return path
+
+
+def serial(path, destination):
+    """The loop from Application.upload before hockeyapp.dsym existed"""
+    archive = zipfile.ZipFile(destination, 'w', zipfile.ZIP_DEFLATED)
+    root_length = len(os.path.split(path)[0]) + 1
+    for base, _dirs, names in os.walk(path):
+        for name in names:
+            file_path = os.path.join(base, name)
+            archive.write(file_path, file_path[root_length:])
+    archive.close()
+
+
+def run(label, func):
+    start = time.time()
+    func()
+    print('%-24s %8.3fs' % (label, time.time() - start))
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    files = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    root = tempfile.mkdtemp()
+    try:
+        path = make_bundle(root, megabytes, files)
+        destination = os.path.join(root, 'App.app.dSYM.zip')
+        print('%d MB in %d files, %d CPUs' %
+              (megabytes, files, os.cpu_count() or 1))
+        run('serial zipfile', lambda: serial(path, destination))
+        for workers in sorted(set([1, 2, 4, os.cpu_count() or 1])):
+            run('dsym.pack workers=%d' % workers,
+                lambda: dsym.pack(path, destination, workers=workers))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
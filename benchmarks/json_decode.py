@@ -0,0 +1,107 @@
+"""
+Measure the time taken to decode realistic crash_reasons and app_versions
+pages with each installed JSON decoder, against the text decoding done by
+requests.Response.json().
+
+    python benchmarks/json_decode.py [pages]
+
+"""
+import json
+import sys
+import time
+
+import requests
+
+from hockeyapp import api
+
+
+def crash_reasons_page(page):
+    """Return a page of 100 crash reasons as the API encodes it"""
+    reasons = [{'id': page * 100 + index, 'app_id': 1234,
+                'app_version_id': 500 + index % 20,
+                'number_of_crashes': index * 37 % 1000,
+                'created_at': '2015-01-%02dT10:%02d:00Z' % (
+                    index % 28 + 1, index % 60),
+                'updated_at': '2015-02-%02dT11:%02d:00Z' % (
+                    index % 28 + 1, index % 60),
+                'last_crash_at': '2015-03-%02dT12:%02d:00Z' % (
+                    index % 28 + 1, index % 60),
+                'bundle_short_version': '1.%d' % (index % 20),
+                'bundle_version': str(200 + index % 20), 'status': 0,
+                'fixed': False, 'file': 'ViewController%d.swift' % index,
+                'class': 'MyApp.ViewController%d' % index,
+                'method': 'viewDidLoad() -> ()', 'line': str(index * 7),
+                'reason': u'Unexpectedly found nil while unwrapping an '
+                          u'Optional value \u2014 %d' % index,
+                'exception_type': 'EXC_BREAKPOINT',
+                'developer_mentioned': False}
+               for index in range(100)]
+    return json.dumps({'crash_reasons': reasons, 'total_entries': 25000,
+                       'total_pages': 250, 'current_page': page,
+                       'per_page': 100, 'status': 'success'}).encode('utf-8')
+
+
+def app_versions_page():
+    """Return the versions of an app with 500 builds"""
+    notes = u'<ul>%s</ul>' % ''.join(
+        u'<li>Fixed issue #%d in the caf\u00e9 screen</li>' % index
+        for index in range(20))
+    versions = [{'id': index, 'version': str(index),
+                 'shortversion': '1.%d.%d' % (index // 50, index % 50),
+                 'title': 'MyApp', 'timestamp': 1420070400 + index * 3600,
+                 'appsize': 25000000 + index, 'notes': notes,
+                 'mandatory': False, 'external': False,
+                 'device_family': 'iPhone/iPod/iPad',
+                 'minimum_os_version': '10.0', 'status': 2,
+                 'config_url': 'https://rink.hockeyapp.net/manage/apps/1234/'
+                               'app_versions/%d' % index,
+                 'download_url': 'https://rink.hockeyapp.net/apps/0123456789a'
+                                 'bcdef/app_versions/%d' % index,
+                 'restricted_to_tags': False, 'tags': [],
+                 'created_at': '2015-01-01T00:00:00Z',
+                 'updated_at': '2015-01-01T00:00:00Z',
+                 'sdk_version': '5.1.2', 'block_crashes': False,
+                 'app_owner': 'Example Inc.'}
+                for index in range(500)]
+    return json.dumps({'app_versions': versions,
+                       'status': 'success'}).encode('utf-8')
+
+
+def requests_json(content):
+    """Decode a body the way requests.Response.json() does"""
+    response = requests.Response()
+    response._content = content
+    response.headers['Content-Type'] = 'application/json'
+    return response.json()
+
+
+def run(label, decoder, pages):
+    start = time.time()
+    for page in pages:
+        decoder(page)
+    elapsed = time.time() - start
+    size = sum(len(page) for page in pages)
+    print('%-28s %8.3fs %8.0f pages/s %8.1f MB/s' % (
+        label, elapsed, len(pages) / elapsed, size / elapsed / 1048576))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    for label, pages in (('crash_reasons', [crash_reasons_page(page)
+                                            for page in range(count)]),
+                         ('app_versions', [app_versions_page()] *
+                          max(count // 10, 1))):
+        print('%s: %d pages of %d bytes' % (label, len(pages),
+                                            len(pages[0])))
+        run('  requests Response.json()', requests_json, pages)
+        for name in api.JSON_DECODERS:
+            try:
+                decoder = api.json_decoder(name)
+            except ValueError:
+                print('  %-26s not installed' % name)
+                continue
+            run('  ' + name, decoder, pages)
+
+
+if __name__ == '__main__':
+    main()
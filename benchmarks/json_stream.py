@@ -0,0 +1,84 @@
+"""
+Measure the peak memory used and the time to the first item when reading a
+large app_versions response all at once and when streaming it with
+hockeyapp.jsonstream.
+
+    python benchmarks/json_stream.py [versions]
+
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+from hockeyapp import api
+from hockeyapp import jsonstream
+
+
+def app_versions(count):
+    """Return an app_versions response with count versions"""
+    notes = u'<ul>%s</ul>' % ''.join(
+        u'<li>Fixed issue #%d in the caf\u00e9 screen</li>' % index
+        for index in range(20))
+    versions = [{'id': index, 'version': str(index),
+                 'shortversion': '1.%d.%d' % (index // 50, index % 50),
+                 'title': 'MyApp', 'timestamp': 1420070400 + index * 3600,
+                 'appsize': 25000000 + index, 'notes': notes,
+                 'mandatory': False, 'status': 2,
+                 'download_url': 'https://rink.hockeyapp.net/apps/0123456789a'
+                                 'bcdef/app_versions/%d' % index}
+                for index in range(count)]
+    return json.dumps({'status': 'success',
+                       'app_versions': versions}).encode('utf-8')
+
+
+def chunks(content):
+    """Yield the body in chunks, as requests.Response.iter_content does"""
+    for offset in range(0, len(content), jsonstream.CHUNK_SIZE):
+        yield content[offset:offset + jsonstream.CHUNK_SIZE]
+
+
+def buffered(content, decode):
+    """Read the whole body, then decode it"""
+    return iter(decode(b''.join(chunks(content)))['app_versions'])
+
+
+def streamed(content, decode):
+    """Decode the items as the body is read"""
+    return jsonstream.items(chunks(content), 'app_versions', decode)
+
+
+def run(label, reader, content, decode):
+    start = time.time()
+    items = reader(content, decode)
+    next(items)
+    first = time.time() - start
+    count = 1 + sum(1 for _item in items)
+    elapsed = time.time() - start
+    tracemalloc.start()
+    for _item in reader(content, decode):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print('  %-10s %6d items  first %8.2fms  total %7.3fs  peak %7.2f MB'
+          % (label, count, first * 1000, elapsed, peak / 1048576.0))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    content = app_versions(count)
+    print('app_versions: %d versions in %.1f MB' % (
+        count, len(content) / 1048576.0))
+    for name in api.JSON_DECODERS:
+        try:
+            decode = api.json_decoder(name)
+        except ValueError:
+            print('%s: not installed' % name)
+            continue
+        print(name)
+        run('buffered', buffered, content, decode)
+        run('streamed', streamed, content, decode)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Measure building a hockeyapp.proguard index from a synthetic mapping.txt,
+opening it, and retracing frames with it, compared with reparsing the mapping
+into dicts on every run.
+
+    python benchmarks/proguard_retrace.py [classes] [frames]
+
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from hockeyapp import proguard
+
+
+def obfuscated(index):
+    """Return a short obfuscated name for an index"""
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    name = ''
+    while True:
+        name = letters[index % 26] + name
+        index //= 26
+        if not index:
+            return name
+
+
+def make_mapping(path, classes):
+    """Write a mapping with 20 methods of 10 lines per class"""
+    with open(path, 'w') as handle:
+        for index in range(classes):
+            handle.write('com.example.package%d.Class%d -> %s.%s:\n' % (
+                index % 100, index, obfuscated(index % 100), obfuscated(index)))
+            handle.write('    java.lang.String field -> a\n')
+            for method in range(20):
+                start = method * 10 + 1
+                handle.write('    %d:%d:void method%d(int,java.lang.String)'
+                             ':%d:%d -> %s\n' % (start, start + 9, method,
+                                                 start + 100, start + 109,
+                                                 obfuscated(method % 5)))
+
+
+def reparse(path):
+    """Parse the mapping into dicts the way a script without an index would"""
+    classes, methods, current = {}, {}, None
+    with open(path) as handle:
+        for line in handle:
+            if not line[0].isspace():
+                original, name = line.rstrip()[:-1].split(' -> ')
+                classes[name] = original
+                current = name
+            elif '(' in line:
+                ranges, name = line.strip().split(' -> ')
+                methods.setdefault((current, name), []).append(ranges)
+    return classes, methods
+
+
+def run(label, func):
+    start = time.time()
+    result = func()
+    print('%-32s %8.3fs' % (label, time.time() - start))
+    return result
+
+
+def main():
+    classes = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    root = tempfile.mkdtemp()
+    try:
+        mapping = os.path.join(root, 'mapping.txt')
+        make_mapping(mapping, classes)
+        index_path = os.path.join(root, 'mapping.idx')
+        print('mapping.txt %.1f MB, %d classes, %d methods' % (
+            os.path.getsize(mapping) / 1048576.0, classes, classes * 20))
+        run('reparse mapping.txt', lambda: reparse(mapping))
+        run('build index', lambda: proguard.build_index(mapping, index_path))
+        print('index %.1f MB' % (os.path.getsize(index_path) / 1048576.0))
+        index = run('open index', lambda: proguard.MappingIndex(index_path))
+        frames = []
+        for _ignore in range(count):
+            value, method = random.randrange(classes), random.randrange(20)
+            frames.append(('%s.%s' % (obfuscated(value % 100),
+                                      obfuscated(value)),
+                           obfuscated(method % 5),
+                           method * 10 + 1 + random.randrange(10)))
+        start = time.time()
+        for class_name, method, line in frames:
+            assert index.methods(class_name, method, line)
+        elapsed = time.time() - start
+        print('%-32s %8.3fs %10.0f frames/s' % ('retrace %d frames' % count,
+                                               elapsed, count / elapsed))
+        index.close()
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Measure the memory used by crashes held as decoded JSON dicts and as
+hockeyapp.records.Crash records and in a hockeyapp.records.RecordTable, and
+the cost of building them.
+
+    python benchmarks/records_memory.py [crashes]
+
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+from hockeyapp import records
+
+
+def payload(count):
+    """Return a JSON page of crashes from a realistic mix of devices"""
+    models = ['iPhone%d,%d' % (major, minor) for major in range(8, 14)
+              for minor in range(1, 4)]
+    crashes = [{'id': 100000000 + index, 'app_id': 1234,
+                'app_version_id': 500 + index % 20,
+                'crash_reason_id': 9000 + index % 300,
+                'created_at': '2015-01-%02dT%02d:%02d:%02dZ' % (
+                    index % 28 + 1, index % 24, index % 60, index % 59),
+                'updated_at': '2015-01-%02dT%02d:%02d:%02dZ' % (
+                    index % 28 + 1, index % 24, index % 60, index % 59),
+                'oem': 'Apple', 'model': models[index % len(models)],
+                'os_version': '13.%d' % (index % 5), 'jail_break': False,
+                'contact_string': '', 'user_string': '', 'has_log': True,
+                'has_description': False,
+                'bundle_version': str(200 + index % 20),
+                'bundle_short_version': '1.%d' % (index % 20)}
+               for index in range(count)]
+    return json.dumps({'crashes': crashes})
+
+
+def measure(label, build, data):
+    tracemalloc.start()
+    start = time.time()
+    values = build(data)
+    elapsed = time.time() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print('%-8s %8d crashes %8.1f MB %6.0f bytes/crash %6.2fs' % (
+        label, len(values), size / 1048576.0, size / float(len(values)),
+        elapsed))
+    return size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    data = payload(count)
+    dicts = measure('dicts', lambda value: json.loads(value)['crashes'], data)
+    slots = measure('records', lambda value: records.records(
+        records.Crash, json.loads(value)['crashes']), data)
+    table = measure('table', lambda value: records.RecordTable(
+        records.Crash, json.loads(value)['crashes']), data)
+    print('records use %.1fx and tables %.1fx less memory than dicts' % (
+        dicts / float(slots), dicts / float(table)))
+
+
+if __name__ == '__main__':
+    main()
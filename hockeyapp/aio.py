@@ -0,0 +1,421 @@
+"""
+asyncio versions of the Application and Applications API objects, built on
+aiohttp. A single event loop can drive thousands of concurrent API calls
+while an AsyncConnectionPool bounds the number of requests in flight.
+
+Requires Python 3.5+ and the ``aiohttp`` package (``pip install
+hockeyapp[aio]``).
+
+"""
+import asyncio
+import logging
+
+import aiohttp
+
+from hockeyapp import api
+from hockeyapp import app
+from hockeyapp import records
+
+LOGGER = logging.getLogger(__name__)
+
+
+class AsyncConnectionPool(object):
+    """Pool of keep-alive HTTP connections for asyncio API objects that also
+    bounds the number of in-flight requests. Share one pool between all of
+    the API objects driven by an event loop.
+
+    """
+    def __init__(self, concurrency=100, per_host=0, keep_alive=True):
+        """Create a new connection pool
+
+        :param int concurrency: The maximum number of requests in flight
+        :param int per_host: The maximum number of connections per host,
+            ``0`` for no limit beyond ``concurrency``
+        :param bool keep_alive: Keep connections open between requests
+
+        """
+        self.concurrency = concurrency
+        self.keep_alive = keep_alive
+        self._per_host = per_host
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def close(self):
+        """Close the underlying client session and its connections"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def request(self, method, uri, **kwargs):
+        """Perform a HTTP request using a pooled connection, waiting for a
+        free slot if ``concurrency`` requests are already in flight.
+
+        :param str method: The HTTP method
+        :param str uri: The URI to request
+        :param dict kwargs: Keyword arguments for
+            :meth:`aiohttp.ClientSession.request`
+        :return: The status code, content type, URL and body
+        :rtype: tuple(int, str, str, bytes)
+
+        """
+        async with self._semaphore:
+            async with self.session.request(method, uri, **kwargs) as resp:
+                content = await resp.read()
+                return (resp.status, resp.headers.get('Content-Type', ''),
+                        str(resp.url), content)
+
+    @property
+    def session(self):
+        """Return the client session, creating it if needed. Must be called
+        from within the running event loop.
+
+        :rtype: aiohttp.ClientSession
+
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.concurrency, limit_per_host=self._per_host,
+                force_close=not self.keep_alive)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+
+class AsyncAPIRequest(api.APIRequest):
+    """Base class for asyncio API requests, reusing the URI building and
+    response handling of :class:`hockeyapp.api.APIRequest`. If no pool is
+    passed in, the object creates its own, which is closed by :meth:`close`
+    or by using the object with ``async with``.
+
+    """
+    def __init__(self, token, pool=None):
+        """Construct the AsyncAPIRequest object
+
+        :param str token: The API token for the request
+        :param AsyncConnectionPool pool: The connection pool to use
+            (optional)
+
+        """
+        self._owns_pool = pool is None
+        super(AsyncAPIRequest, self).__init__(token,
+                                              pool or AsyncConnectionPool())
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def close(self):
+        """Close the connection pool if it was created by this object. A pool
+        that was passed in is left open for the objects sharing it.
+
+        """
+        if self._owns_pool:
+            await self.pool.close()
+
+    async def _delete(self, uri_parts, data=None):
+        """Delete data from the API
+
+        :param list uri_parts: Parts of the URI to compose the URI
+        :param dict data: Optional query parameters for the DELETE
+        :rtype: list or dict
+
+        """
+        return await self._request('DELETE', uri_parts, data=data)
+
+    async def _get(self, uri_parts, data=None):
+        """Get data from the API. The query parameters are sent form encoded
+        in the request body, as :meth:`hockeyapp.api.APIRequest._get` sends
+        them.
+
+        :param list uri_parts: Parts of the URI to compose the URI
+        :param dict data: Optional query parameters for the GET
+        :rtype: list or dict
+
+        """
+        return await self._request('GET', uri_parts, data=data)
+
+    async def _post(self, uri_parts=None, data=None):
+        """Post data to the API
+
+        :param list uri_parts: Parts of the URI to compose the URI
+        :param dict data: Optional form data for the POST
+        :rtype: list or dict
+
+        """
+        return await self._request('POST', uri_parts, data=data)
+
+    async def _request(self, method, uri_parts, data=None):
+        """Perform the HTTP request and process the response
+
+        :param str method: The HTTP method
+        :param list uri_parts: Parts of the URI to compose the URI
+        :param dict data: Optional form data
+        :rtype: list or dict or bytes
+        :raise: hockeyapp.api.APIError
+
+        """
+        uri = self._build_uri(uri_parts) if uri_parts else self._uri
+        LOGGER.debug('Performing HTTP %s to %s', method, uri)
+        status, content_type, url, content = await self.pool.request(
+            method, uri, headers=self.headers, data=_stringify(data))
+        LOGGER.debug('Response status code: %s', status)
+        return self._result(status, content_type, url, content,
+                            lambda: self._decode(content))
+
+
+class AsyncApplications(AsyncAPIRequest):
+    """Top level management of apps"""
+    KEY = 'apps'
+
+    async def list(self):
+        """List all apps for the API token, including owned apps, developer
+        apps, member apps, and tester apps.
+
+        :rtype: list
+
+        """
+        return (await self._get(uri_parts=['apps']))['apps']
+
+
+class AsyncApplication(AsyncAPIRequest):
+    """Manage an Application at HockeyApp from an asyncio event loop"""
+    APP_ID_PATTERN = app.Application.APP_ID_PATTERN
+
+    _check_app_id = app.Application._check_app_id
+
+    def __init__(self, token, app_id=None, pool=None):
+        """Construct the AsyncApplication object
+
+        :param str token: The API token for the request
+        :param str app_id: The App ID public identifier for an existing app
+        :param AsyncConnectionPool pool: The connection pool to use
+            (optional)
+        :raises: ValueError
+
+        """
+        if app_id:
+            self._check_app_id(app_id)
+        self._app_id = app_id
+        super(AsyncApplication, self).__init__(token, pool)
+
+    async def create(self, title, bundle_identifier, platform='iOS',
+                     release_type=0):
+        """Create a new application without uploading a file.
+
+        :param str title: The application's name
+        :param str bundle_identifier: Bundle identifier on iOS or Mac OS X,
+            the package name on Android, or the namespace on Windows Phone
+        :param str platform: The app platform (optional)
+        :param int release_type: An integer value for Alpha, Beta or Live.
+        :return str: app_id public identifier
+
+        """
+        if platform not in app.Application.VALID_PLATFORMS:
+            raise ValueError('Invalid platform value')
+        if release_type not in app.Application.VALUE_RELEASE:
+            raise ValueError('Invalid release value')
+        response = await self._post(uri_parts=['apps', 'new'],
+                                    data={'title': title,
+                                          'bundle_identifier':
+                                              bundle_identifier,
+                                          'platform': platform,
+                                          'release_type': release_type})
+        self._app_id = response['public_identifier']
+        return response['public_identifier']
+
+    async def crash_description(self, crash_id):
+        """Get the crash description
+
+        :param str crash_id: The specific crash to get
+        :rtype: str
+
+        """
+        return await self._get(uri_parts=['apps', self._app_id,
+                                          'crashes', str(crash_id)],
+                               data={'format': 'text'})
+
+    async def crash_log(self, crash_id):
+        """Download the crash log for a specific crash
+
+        :param str crash_id: The specific crash to get
+        :rtype: str
+
+        """
+        return await self._get(uri_parts=['apps', self._app_id,
+                                          'crashes', str(crash_id)],
+                               data={'format': 'log'})
+
+    async def crash_groups(self, version_id=None, symbolicated=False,
+                           offset=1, limit=25, order='asc', sort=None,
+                           as_records=False):
+        """List all crashes grouped by reason for an app. If version_id is
+        specified, return all of the crash groupings for that version.
+
+        :param str version_id: An optional version number to restrict groups to
+        :param bool symbolicated: run crashes through the symbolication process
+        :param int offset: The offset for the page of feedback
+        :param int limit: The maximum number of entries per page (25, 50, 100)
+        :param str order: Order of items in list, ``asc`` or ``desc``
+        :param str sort: Sort items by ``date``, ``number_of_crashes`` or
+            ``last_crash_at`` (optional)
+        :param bool as_records: Return the crash reasons as
+            :class:`hockeyapp.records.CrashReason` records
+        :rtype: hockeyapp.app.CrashGroups
+
+        """
+        if order not in ['asc', 'desc']:
+            raise ValueError('order must either be "asc" or "desc"')
+        if sort and sort not in app.Application.VALID_CRASH_SORTS:
+            raise ValueError('Invalid sort value')
+        parts = ['apps', self._app_id, 'crash_reasons']
+        if version_id:
+            parts = ['apps', self._app_id,
+                     'app_versions', str(version_id),
+                     'crash_reasons']
+        data = {'symbolication': int(symbolicated),
+                'page': offset,
+                'per_page': limit,
+                'order': order}
+        if sort:
+            data['sort'] = sort
+        response = await self._get(uri_parts=parts, data=data)
+        return app._page(app.CrashGroups, 'crash_reasons', response,
+                         records.CrashReason if as_records else None)
+
+    async def crashes(self, reason_id, offset=0, limit=25, as_records=False):
+        """Paginated list of crashes in a crash reason group.
+
+        :param str reason_id: The id value returned for a crash group
+        :param int offset: The starting offset for the crash reason
+        :param int limit: The maximum number of entries returned (25, 50, 100)
+        :param bool as_records: Return the crashes as
+            :class:`hockeyapp.records.Crash` records
+        :rtype: hockeyapp.app.Crashes
+
+        """
+        response = await self._get(uri_parts=['apps',
+                                              self._app_id,
+                                              'crash_reasons',
+                                              str(reason_id)],
+                                   data={'page': offset,
+                                         'per_page': limit})
+        return app._page(app.Crashes, 'crashes', response,
+                         records.Crash if as_records else None)
+
+    async def delete(self):
+        """Delete the app
+
+        :rtype: bool
+
+        """
+        await self._delete(uri_parts=['apps', self._app_id])
+        self._app_id = None
+        return True
+
+    async def feedback(self, offset=1, limit=25, order='asc',
+                       as_records=False):
+        """Paginated list of feedback for an application.
+
+        :param int offset: The offset for the page of feedback
+        :param int limit: The maximum number of entries per page (25, 50, 100)
+        :param str order: Order of items in list, ``asc`` or ``desc``
+        :param bool as_records: Return the feedback as
+            :class:`hockeyapp.records.Feedback` records
+        :rtype: hockeyapp.app.Feedback
+
+        """
+        if order not in ['asc', 'desc']:
+            raise ValueError('order must either be "asc" or "desc"')
+        response = await self._get(uri_parts=['apps',
+                                              self._app_id,
+                                              'feedback'],
+                                   data={'page': offset,
+                                         'per_page': limit,
+                                         'order': order})
+        return app._page(app.Feedback, 'feedback', response,
+                         records.Feedback if as_records else None)
+
+    async def histogram(self, start_date, end_date):
+        """Get a histogram of the number of crashes between two given dates
+
+        :param datetime.date start_date: The start date for the histogram
+        :param datetime.date end_date: The end date for the histogram
+        :rtype: dict
+
+        """
+        response = await self._get(uri_parts=['apps', self._app_id,
+                                              'crashes', 'histogram'],
+                                   data={'start_date': start_date.isoformat(),
+                                         'end_date': end_date.isoformat()})
+        return dict(response.get('histogram', []))
+
+    async def statistics(self):
+        """Get statistics about downloads, installs, and crashes for all
+        versions for an application.
+
+        :rtype: list
+
+        """
+        return await self._get(uri_parts=['apps', self._app_id,
+                                          'statistics'])
+
+    async def update_crash_reason(self, reason_id, status=None,
+                                  ticket_url=None):
+        """Update a crash reason grouping with an optional status flag and
+        optional ticket URL.
+
+        :param str reason_id: The crash group id
+        :param int status: Crash group status (0, 1, 2))
+        :param str ticket_url: URL a ticket for this crash reason group
+        :rtype: bool
+        :raises: ValueError
+
+        """
+        data = dict()
+        if status:
+            if status not in [app.Application.CRASH_STATUS_OPEN,
+                              app.Application.CRASH_STATUS_RESOLVED,
+                              app.Application.CRASH_STATUS_IGNORED]:
+                raise ValueError('Invalid status value')
+            data['status'] = status
+        if ticket_url:
+            data['ticket_url'] = ticket_url
+        await self._post(uri_parts=['apps', self._app_id,
+                                    'crash_reasons', str(reason_id)],
+                         data=data)
+        return True
+
+    async def versions(self, as_records=False):
+        """Get all versions for an application.
+
+        :param bool as_records: Return the versions as
+            :class:`hockeyapp.records.Version` records
+        :rtype: list
+
+        """
+        response = await self._get(uri_parts=['apps', self._app_id,
+                                              'app_versions'])
+        if as_records:
+            return records.RecordList(records.Version,
+                                      response['app_versions'])
+        return response['app_versions']
+
+
+def _stringify(values):
+    """Return the request parameters with all values as strings, as required
+    by aiohttp.
+
+    :param dict values: The request parameters
+    :rtype: dict or None
+
+    """
+    if values is None:
+        return None
+    return dict((key, str(value)) for key, value in values.items())
@@ -0,0 +1,362 @@
+"""
+Crash analytics across many apps, stored in columnar NumPy arrays. Crash
+histograms and version statistics are fetched concurrently for every app,
+with long date ranges split into chunks that are requested in parallel. The
+results are held as one array per column, so rollups across hundreds of apps
+and versions are vectorized instead of looping over dicts.
+
+Requires the ``numpy`` package (``pip install hockeyapp[analytics]``).
+
+"""
+from concurrent import futures
+import datetime
+import logging
+
+import numpy
+import requests
+
+from hockeyapp import api
+
+LOGGER = logging.getLogger(__name__)
+
+CHUNK_DAYS = 31
+ERRORS = (api.APIError, ValueError, requests.exceptions.RequestException)
+
+
+def date_chunks(start_date, end_date, days=CHUNK_DAYS):
+    """Split an inclusive date range into consecutive ranges of at most the
+    specified number of days.
+
+    :param datetime.date start_date: The first day
+    :param datetime.date end_date: The last day
+    :param int days: The maximum number of days in a chunk
+    :rtype: list
+
+    """
+    chunks = []
+    while start_date <= end_date:
+        chunk_end = min(start_date + datetime.timedelta(days=days - 1),
+                        end_date)
+        chunks.append((start_date, chunk_end))
+        start_date = chunk_end + datetime.timedelta(days=1)
+    return chunks
+
+
+def histograms(applications, start_date, end_date, app_ids=None,
+               chunk_days=CHUNK_DAYS, workers=10):
+    """Fetch the daily crash histograms of many apps, requesting each chunk
+    of the date range for each app concurrently. An app for which any chunk
+    fails is left out of the histogram entirely, with the first error in
+    ``errors``, so the rollups never count it over part of the range.
+
+    :param hockeyapp.Applications applications: The API object whose
+        connection pool, cache and rate limiter are used
+    :param datetime.date start_date: The first day
+    :param datetime.date end_date: The last day
+    :param list app_ids: The app public identifiers, defaults to every app
+        for the API token
+    :param int chunk_days: The maximum number of days per request
+    :param int workers: The number of concurrent requests
+    :rtype: CrashHistogram
+
+    """
+    app_ids = _app_ids(applications, app_ids)
+    jobs = [(index, chunk) for index in range(len(app_ids))
+            for chunk in date_chunks(start_date, end_date, chunk_days)]
+
+    def fetch(job):
+        index, chunk = job
+        return applications.application(app_ids[index]).histogram(*chunk)
+
+    results, errors = [], {}
+    for (index, _chunk), result in zip(jobs, _run(fetch, jobs, workers)):
+        if isinstance(result, Exception):
+            errors.setdefault(app_ids[index], result)
+        else:
+            results.append((index, result))
+
+    apps, days, crashes = [], [], []
+    for index, result in results:
+        if app_ids[index] in errors:
+            continue
+        apps.extend([index] * len(result))
+        days.extend(result.keys())
+        crashes.extend(result.values())
+    return CrashHistogram(app_ids,
+                          numpy.array(apps, dtype=numpy.int32),
+                          numpy.array(days, dtype='datetime64[D]'),
+                          numpy.array(crashes, dtype=numpy.int64), errors)
+
+
+def statistics(applications, app_ids=None, workers=10):
+    """Fetch the download, install and crash statistics of every version of
+    many apps concurrently.
+
+    :param hockeyapp.Applications applications: The API object whose
+        connection pool, cache and rate limiter are used
+    :param list app_ids: The app public identifiers, defaults to every app
+        for the API token
+    :param int workers: The number of concurrent requests
+    :rtype: VersionStatistics
+
+    """
+    app_ids = _app_ids(applications, app_ids)
+
+    def fetch(index):
+        return applications.application(app_ids[index]).statistics()
+
+    columns = {'apps': [], 'versions': [], 'downloads': [], 'installs': [],
+               'crashes': []}
+    errors = {}
+    indexes = list(range(len(app_ids)))
+    for index, result in zip(indexes, _run(fetch, indexes, workers)):
+        if isinstance(result, Exception):
+            errors[app_ids[index]] = result
+            continue
+        for version in result.get('app_versions', []):
+            values = version.get('statistics') or {}
+            columns['apps'].append(index)
+            columns['versions'].append(int(version['id']))
+            for key in ('downloads', 'installs', 'crashes'):
+                columns[key].append(int(values.get(key) or 0))
+    return VersionStatistics(
+        app_ids, numpy.array(columns['apps'], dtype=numpy.int32),
+        *[numpy.array(columns[key], dtype=numpy.int64)
+          for key in ('versions', 'downloads', 'installs', 'crashes')],
+        errors=errors)
+
+
+class CrashHistogram(object):
+    """Daily crash counts for many apps, one row per app and day"""
+
+    def __init__(self, app_ids, apps, days, crashes, errors=None):
+        """Create the histogram from its columns
+
+        :param list app_ids: The app public identifiers, indexed by ``apps``
+        :param numpy.ndarray apps: The index of the app of each row
+        :param numpy.ndarray days: The day of each row
+        :param numpy.ndarray crashes: The number of crashes of each row
+        :param dict errors: Errors raised fetching an app, by app id. The
+            histogram has no rows for these apps.
+
+        """
+        self.app_ids = list(app_ids)
+        self.apps = apps
+        self.days = days
+        self.crashes = crashes
+        self.errors = errors or {}
+
+    def anomalies(self, window=7, threshold=3.0, minimum=10):
+        """Return the days on which an app had more crashes than expected,
+        using the z-score of each day against the mean and standard
+        deviation of the preceding window of days.
+
+        :param int window: The number of preceding days compared against
+        :param float threshold: The z-score above which a day is anomalous
+        :param int minimum: The fewest crashes an anomalous day can have
+        :return list: Tuples of app id, day, crashes and z-score
+
+        """
+        days, matrix = self.matrix()
+        if matrix.shape[1] <= window:
+            return []
+        trailing = _windows(matrix, window)[:, :, :-1]
+        mean = trailing.mean(axis=2)
+        deviation = numpy.maximum(trailing.std(axis=2), 1.0)
+        current = matrix[:, window:]
+        scores = (current - mean) / deviation
+        rows, columns = numpy.nonzero((scores > threshold) &
+                                      (current >= minimum))
+        return [(self.app_ids[row], days[column + window].item(),
+                 int(current[row, column]), float(scores[row, column]))
+                for row, column in zip(rows, columns)]
+
+    def matrix(self):
+        """Return the crashes as a dense matrix with a row for each app and a
+        column for each day from the first to the last day.
+
+        :rtype: tuple(numpy.ndarray, numpy.ndarray)
+
+        """
+        if not len(self.days):
+            return (numpy.array([], dtype='datetime64[D]'),
+                    numpy.zeros((len(self.app_ids), 0), dtype=numpy.int64))
+        first = self.days.min()
+        days = numpy.arange(first, self.days.max() + 1)
+        matrix = numpy.zeros((len(self.app_ids), len(days)),
+                             dtype=numpy.int64)
+        numpy.add.at(matrix, (self.apps, (self.days - first).astype(int)),
+                     self.crashes)
+        return days, matrix
+
+    def per_app(self):
+        """Return the total number of crashes of each app
+
+        :return numpy.ndarray: Totals in the order of ``app_ids``
+
+        """
+        return numpy.bincount(self.apps, weights=self.crashes,
+                              minlength=len(self.app_ids)).astype(numpy.int64)
+
+    def per_day(self):
+        """Return the total number of crashes of all apps for each day
+
+        :rtype: tuple(numpy.ndarray, numpy.ndarray)
+
+        """
+        days, matrix = self.matrix()
+        return days, matrix.sum(axis=0)
+
+    def rolling_mean(self, window=7):
+        """Return the mean number of crashes of each app over a rolling
+        window ending on each day, starting from the first full window.
+
+        :param int window: The number of days in the window
+        :rtype: tuple(numpy.ndarray, numpy.ndarray)
+
+        """
+        days, matrix = self.matrix()
+        if matrix.shape[1] < window:
+            return days[:0], matrix[:, :0].astype(float)
+        totals = numpy.cumsum(numpy.pad(matrix, ((0, 0), (1, 0)),
+                                        'constant'), axis=1)
+        return (days[window - 1:],
+                (totals[:, window:] - totals[:, :-window]) / float(window))
+
+    def week_over_week(self):
+        """Return the change in the number of crashes of each app on each
+        day compared with the same day a week earlier, as a fraction of the
+        earlier day, or NaN if there were no crashes a week earlier.
+
+        :rtype: tuple(numpy.ndarray, numpy.ndarray)
+
+        """
+        days, matrix = self.matrix()
+        previous = matrix[:, :-7].astype(float)
+        current = matrix[:, 7:]
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            change = numpy.where(previous > 0,
+                                 (current - previous) / previous, numpy.nan)
+        return days[7:], change
+
+
+class VersionStatistics(object):
+    """Download, install and crash counts for the versions of many apps, one
+    row per version.
+
+    """
+    def __init__(self, app_ids, apps, versions, downloads, installs, crashes,
+                 errors=None):
+        """Create the statistics from their columns
+
+        :param list app_ids: The app public identifiers, indexed by ``apps``
+        :param numpy.ndarray apps: The index of the app of each row
+        :param numpy.ndarray versions: The version id of each row
+        :param numpy.ndarray downloads: The downloads of each version
+        :param numpy.ndarray installs: The installs of each version
+        :param numpy.ndarray crashes: The crashes of each version
+        :param dict errors: Errors raised fetching an app, by app id
+
+        """
+        self.app_ids = list(app_ids)
+        self.apps = apps
+        self.versions = versions
+        self.downloads = downloads
+        self.installs = installs
+        self.crashes = crashes
+        self.errors = errors or {}
+
+    def crash_free_rate(self):
+        """Return the fraction of installs without a crash for each version,
+        estimated as one minus crashes per install, or NaN for versions
+        without installs.
+
+        :rtype: numpy.ndarray
+
+        """
+        return _crash_free(self.crashes, self.installs)
+
+    def per_app(self):
+        """Return the downloads, installs, crashes and crash-free rate of
+        each app, summed over its versions.
+
+        :return dict: Arrays in the order of ``app_ids``, by column name
+
+        """
+        totals = dict(
+            (key, numpy.bincount(self.apps, weights=getattr(self, key),
+                                 minlength=len(self.app_ids))
+             .astype(numpy.int64))
+            for key in ('downloads', 'installs', 'crashes'))
+        totals['crash_free_rate'] = _crash_free(totals['crashes'],
+                                                totals['installs'])
+        return totals
+
+
+def _app_ids(applications, app_ids):
+    """Return the app ids, or the id of every app if app_ids is None
+
+    :param hockeyapp.Applications applications: The API object
+    :param list app_ids: The app public identifiers
+    :rtype: list
+
+    """
+    if app_ids is None:
+        return [value['public_identifier'] for value in applications.list()]
+    return list(app_ids)
+
+
+def _crash_free(crashes, installs):
+    """Return the crash-free rate for arrays of crashes and installs
+
+    :param numpy.ndarray crashes: The crash counts
+    :param numpy.ndarray installs: The install counts
+    :rtype: numpy.ndarray
+
+    """
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        rate = 1.0 - crashes / installs.astype(float)
+    return numpy.where(installs > 0, numpy.clip(rate, 0.0, 1.0), numpy.nan)
+
+
+def _run(func, jobs, workers):
+    """Call a function for each job on a thread pool, returning the results
+    in order with the errors raised in place of results.
+
+    :param callable func: The function to call
+    :param list jobs: The arguments for each call
+    :param int workers: The number of concurrent calls
+    :rtype: list
+
+    """
+    def call(job):
+        try:
+            return func(job)
+        except ERRORS as error:
+            LOGGER.debug('Request failed: %s', error)
+            return error
+
+    if not jobs:
+        return []
+    executor = futures.ThreadPoolExecutor(max(min(workers, len(jobs)), 1))
+    try:
+        return list(executor.map(call, jobs))
+    finally:
+        executor.shutdown()
+
+
+def _windows(matrix, window):
+    """Return a view of the rows of a matrix as sliding windows of window + 1
+    columns, without copying the matrix.
+
+    :param numpy.ndarray matrix: The matrix
+    :param int window: The number of columns before each column
+    :rtype: numpy.ndarray
+
+    """
+    rows, columns = matrix.shape
+    stride_rows, stride_columns = matrix.strides
+    return numpy.lib.stride_tricks.as_strided(
+        matrix, shape=(rows, columns - window, window + 1),
+        strides=(stride_rows, stride_columns, stride_columns),
+        writeable=False)
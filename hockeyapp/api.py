@@ -2,16 +2,45 @@
 Extended by all API classes for communicating with the hockeyapp API
 
 """
+import gzip
+import importlib
+import json
 import logging
+import random
 import re
+import threading
+import time
+
 import requests
+from requests import adapters
+
+from hockeyapp import cache as response_cache
+from hockeyapp import jsonstream
+from hockeyapp import multipart
 
 LOGGER = logging.getLogger(__name__)
 
+_DEFAULT_POOL = None
+_DEFAULT_POOL_LOCK = threading.Lock()
+
+# JSON decoders in order of preference, used if they are installed
+JSON_DECODERS = ('orjson', 'simdjson', 'ujson', 'json')
+_JSON_DECODER = None
+
 
 class APIError(Exception):
     """Raised when the Hockeyapp API returns an error for a request"""
 
+    def __init__(self, errors, status_code=None):
+        """Create the exception
+
+        :param dict errors: The errors returned by the API
+        :param int status_code: The HTTP status code of the response
+
+        """
+        super(APIError, self).__init__(errors)
+        self.status_code = status_code
+
     def __repr__(self):
         """Return a representation of the exception
 
@@ -32,9 +61,144 @@ class APIError(Exception):
                           for key in self.args[0]]))
 
 
+class ConnectionPool(object):
+    """Thread-safe pool of keep-alive HTTP connections that can be shared by
+    any number of API request objects. Each thread gets its own
+    :class:`requests.Session`, but all sessions share the same transport
+    adapter so TCP and TLS connections are reused across threads and calls.
+
+    """
+    def __init__(self, size=10, per_host=10, keep_alive=True, block=False):
+        """Create a new connection pool
+
+        :param int size: The number of per-host connection pools to cache
+        :param int per_host: The maximum number of connections kept per host
+        :param bool keep_alive: Keep connections open between requests
+        :param bool block: Block when all connections to a host are in use
+            instead of opening a connection that will not be pooled
+
+        """
+        self.keep_alive = keep_alive
+        self._adapter = adapters.HTTPAdapter(pool_connections=size,
+                                             pool_maxsize=per_host,
+                                             pool_block=block)
+        self._local = threading.local()
+
+    def close(self):
+        """Close all of the pooled connections"""
+        self._adapter.close()
+
+    def request(self, method, uri, **kwargs):
+        """Perform a HTTP request using a pooled connection
+
+        :param str method: The HTTP method
+        :param str uri: The URI to request
+        :param dict kwargs: Keyword arguments for
+            :meth:`requests.Session.request`
+        :rtype: requests.Response
+
+        """
+        return self.session.request(method, uri, **kwargs)
+
+    @property
+    def session(self):
+        """Return the session for the current thread, creating it if needed
+
+        :rtype: requests.Session
+
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('https://', self._adapter)
+            session.mount('http://', self._adapter)
+            if not self.keep_alive:
+                session.headers['Connection'] = 'close'
+            self._local.session = session
+        return session
+
+
+def backoff(attempt, base=1.0, maximum=60.0):
+    """Return the number of seconds to wait before retrying a request, using
+    exponential backoff with full jitter.
+
+    :param int attempt: The number of attempts made so far, starting at 1
+    :param float base: The delay before jitter after the first attempt
+    :param float maximum: The maximum delay
+    :rtype: float
+
+    """
+    return random.uniform(0, min(maximum, base * 2 ** (attempt - 1)))
+
+
+def default_pool():
+    """Return the process wide connection pool used by API requests that are
+    not given one explicitly.
+
+    :rtype: ConnectionPool
+
+    """
+    global _DEFAULT_POOL
+    with _DEFAULT_POOL_LOCK:
+        if _DEFAULT_POOL is None:
+            _DEFAULT_POOL = ConnectionPool()
+        return _DEFAULT_POOL
+
+
+def json_decoder(name=None):
+    """Return a function that decodes a JSON document from the raw bytes of
+    a response body. orjson, simdjson and ujson parse the bytes directly,
+    without building an intermediate text string. If no name is given the
+    first of them that is installed is used, falling back to the standard
+    library.
+
+    :param str name: ``orjson``, ``simdjson``, ``ujson`` or ``json``
+        (optional)
+    :rtype: callable
+    :raises: ValueError
+
+    """
+    for value in [name] if name else JSON_DECODERS:
+        if value not in JSON_DECODERS:
+            raise ValueError('Unknown JSON decoder: %s' % value)
+        if value == 'json':
+            return _stdlib_decode
+        try:
+            return importlib.import_module(value).loads
+        except ImportError:
+            if name:
+                raise ValueError('JSON decoder not installed: %s' % value)
+    return _stdlib_decode
+
+
+def set_json_decoder(decoder):
+    """Set the JSON decoder used by API requests that do not have their own
+
+    :param decoder: The name of a decoder for :func:`json_decoder`, or a
+        function that decodes JSON from bytes
+    :type decoder: str or callable
+    :raises: ValueError
+
+    """
+    global _JSON_DECODER
+    _JSON_DECODER = decoder if callable(decoder) else json_decoder(decoder)
+
+
+def _stdlib_decode(content):
+    """Decode a UTF-8 JSON document with the standard library
+
+    :param bytes content: The JSON document
+    :rtype: list or dict
+
+    """
+    return json.loads(content.decode('utf-8'))
+
+
 class APIRequest(object):
     """Base class for all API requests. Set Class.KEY to the part of the path
-    specific to the request.
+    specific to the request. Set the ``json_decoder`` attribute to a function
+    that decodes JSON from bytes to override the default decoder for one
+    request object.
 
     """
     SERVER = 'rink.hockeyapp.net'
@@ -42,16 +206,25 @@ class APIRequest(object):
     TOKEN_PATTERN = re.compile('[a-f0-9]{32}')
     KEY = 'override_me'
 
-    def __init__(self, token):
+    def __init__(self, token, pool=None, cache=None, limiter=None):
         """Construct the APIRequestObject
 
         :param str token: The API token for the request
+        :param ConnectionPool pool: The connection pool to use (optional)
+        :param cache: A :class:`hockeyapp.cache.MemoryCache` or
+            :class:`hockeyapp.cache.DiskCache` for GET responses (optional)
+        :param hockeyapp.ratelimit.RateLimiter limiter: A rate limiter shared
+            with other requests, throttled requests are retried (optional)
 
         """
         if not self.TOKEN_PATTERN.match(token):
             raise ValueError('The API token should be a 32 char hex digest')
+        self.pool = pool or default_pool()
+        self.cache = cache
+        self.limiter = limiter
         self.headers = {'Accept': 'application/json; text/plain;',
                         'X-HockeyAppToken': token}
+        self.json_decoder = None
 
     def _build_uri(self, path_parts):
         """Return the URI for the request
@@ -62,6 +235,31 @@ class APIRequest(object):
         return 'https://%s%s/%s' % (self.SERVER, self.BASE_URI,
                                     '/'.join(path_parts))
 
+    def _cached_result(self, uri, entry):
+        """Return the result for a cached response
+
+        :param str uri: The URI that was requested
+        :param hockeyapp.cache.CacheEntry entry: The cached response
+        :rtype: list or dict or bytes
+
+        """
+        return self._result(200, entry.content_type, uri, entry.content,
+                            lambda: self._decode(entry.content))
+
+    def _decode(self, content):
+        """Decode a JSON response body with the request's JSON decoder, or
+        the default decoder if the request does not have one.
+
+        :param bytes content: The raw response body
+        :rtype: list or dict
+
+        """
+        global _JSON_DECODER
+        decoder = self.json_decoder or _JSON_DECODER
+        if decoder is None:
+            decoder = _JSON_DECODER = json_decoder()
+        return decoder(content)
+
     def _delete(self, uri_parts, data=None):
         """Delete data from the API
 
@@ -72,12 +270,52 @@ class APIRequest(object):
         """
         uri = self._build_uri(uri_parts) if uri_parts else self._uri
         LOGGER.debug('Performing HTTP DELETE to %s', uri)
-        return self._response(requests.delete(uri,
-                                              headers=self.headers,
-                                              data=data))
+        return self._response(self._request('DELETE', uri,
+                                            headers=self.headers, data=data))
+
+    def _download(self, uri_parts, sink, data=None, compress=False,
+                  chunk_size=multipart.CHUNK_SIZE):
+        """Stream a response body from the API to a file in chunks, so the
+        body is never held in memory.
+
+        :param list uri_parts: Parts of the URI to compose the URI
+        :param sink: The path of the file to write to, or a writable
+            file-like object
+        :param dict data: Optional query parameters for the GET
+        :param bool compress: Gzip compress the body as it is written
+        :param int chunk_size: The number of bytes to read at a time
+        :return int: The number of bytes downloaded
+        :raise: hockeyapp.api.APIError
+
+        """
+        uri = self._build_uri(uri_parts) if uri_parts else self._uri
+        LOGGER.debug('Performing streaming HTTP GET to %s', uri)
+        response = self._request('GET', uri, headers=self.headers, data=data,
+                                 stream=True)
+        try:
+            if not 200 <= response.status_code <= 300:
+                self._response(response)  # Raises the APIError
+            handle = sink if hasattr(sink, 'write') else open(sink, 'wb')
+            output = gzip.GzipFile(fileobj=handle, mode='wb') \
+                if compress else handle
+            size = 0
+            try:
+                for chunk in response.iter_content(chunk_size):
+                    output.write(chunk)
+                    size += len(chunk)
+            finally:
+                if output is not handle:
+                    output.close()
+                if handle is not sink:
+                    handle.close()
+            return size
+        finally:
+            response.close()
 
     def _get(self, uri_parts, data=None):
-        """Post data to the API
+        """Get data from the API. If the request has a response cache, fresh
+        cached responses are returned without a request and expired ones are
+        revalidated with the server.
 
         :param list uri_parts: Parts of the URI to compose the URI
         :param dict data: Optional query parameters for the GET
@@ -85,26 +323,104 @@ class APIRequest(object):
 
         """
         uri = self._build_uri(uri_parts) if uri_parts else self._uri
+        if self.cache is None:
+            LOGGER.debug('Performing HTTP GET to %s', uri)
+            return self._response(self._request('GET', uri,
+                                                headers=self.headers,
+                                                data=data))
+        key = response_cache.cache_key(self.headers['X-HockeyAppToken'],
+                                       uri, data)
+        entry = self.cache.get(key)
+        if entry and entry.expires > time.time():
+            LOGGER.debug('Using cached response for %s', uri)
+            return self._cached_result(uri, entry)
+
+        headers = dict(self.headers)
+        if entry and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
         LOGGER.debug('Performing HTTP GET to %s', uri)
-        return self._response(requests.get(uri,
-                                           headers=self.headers,
-                                           data=data))
-
-    def _post(self, uri_parts=None, data=None, files=None):
-        """Get data from the API
+        response = self._request('GET', uri, headers=headers, data=data)
+        if entry and response.status_code == 304:
+            LOGGER.debug('Cached response for %s is still valid', uri)
+            entry = entry._replace(expires=time.time() + self.cache.ttl)
+            self.cache.set(key, entry)
+            return self._cached_result(uri, entry)
+
+        result = self._response(response)
+        self.cache.set(key, response_cache.new_entry(
+            response.content, response.headers.get('Content-Type', ''),
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified'), self.cache.ttl))
+        return result
+
+    def _post(self, uri_parts=None, data=None, files=None, headers=None):
+        """Post data to the API
 
         :param list uri_parts: Parts of the URI to compose the URI
-        :param dict data: Optional query parameters for the POST
+        :param dict data: Optional query parameters for the POST, or a
+            file-like request body
         :param dict files: A dictionary of field name and open file handles
+        :param dict headers: Additional request headers
         :rtype: list or dict
 
         """
         uri = self._build_uri(uri_parts) if uri_parts else self._uri
         LOGGER.debug('Performing HTTP POST to %s', uri)
-        return self._response(requests.post(uri,
-                                            headers=self.headers,
-                                            data=data,
-                                            files=files))
+        return self._response(self._request('POST', uri,
+                                            headers=dict(self.headers,
+                                                         **(headers or {})),
+                                            data=data, files=files))
+
+    def _put(self, uri_parts=None, data=None, headers=None):
+        """Put data to the API
+
+        :param list uri_parts: Parts of the URI to compose the URI
+        :param dict data: Optional form data for the PUT, or a file-like
+            request body
+        :param dict headers: Additional request headers
+        :rtype: list or dict
+
+        """
+        uri = self._build_uri(uri_parts) if uri_parts else self._uri
+        LOGGER.debug('Performing HTTP PUT to %s', uri)
+        return self._response(self._request('PUT', uri,
+                                            headers=dict(self.headers,
+                                                         **(headers or {})),
+                                            data=data))
+
+    def _request(self, method, uri, **kwargs):
+        """Perform a HTTP request using the connection pool. If the request
+        has a rate limiter, wait for it before sending the request and retry
+        responses that were throttled, unless the request body is a stream
+        that can not be sent again.
+
+        :param str method: The HTTP method
+        :param str uri: The URI to request
+        :param dict kwargs: Keyword arguments for
+            :meth:`ConnectionPool.request`
+        :rtype: requests.Response
+
+        """
+        if self.limiter is None:
+            return self.pool.request(method, uri, **kwargs)
+        retry = not hasattr(kwargs.get('data'), 'read')
+        attempt = 0
+        while True:
+            attempt += 1
+            self.limiter.acquire()
+            response = self.pool.request(method, uri, **kwargs)
+            if response.status_code not in self.limiter.STATUS_CODES:
+                self.limiter.success()
+                return response
+            delay = self.limiter.throttle(
+                attempt, response.headers.get('Retry-After'))
+            if not retry or attempt > self.limiter.retries:
+                return response
+            response.close()
+            LOGGER.warning('HTTP %s %s throttled with %s, retrying in %.1fs',
+                           method, uri, response.status_code, delay)
 
     def _response(self, response):
         """Process the API response
@@ -116,16 +432,65 @@ class APIRequest(object):
         """
         LOGGER.debug('Response status code: %s', response.status_code)
         LOGGER.debug('Headers: %r', response.headers)
-        if 200 <= response.status_code <= 300:
-            if 'application/json' in response.headers['Content-Type']:
-                return response.json()
-            return response.content
-        if response.status_code == 404:
-            raise APIError({'404': 'URL Not Found: %s' % response.url})
-        if 'application/json' in response.headers['Content-Type']:
-            raise APIError(response.json().get('errors'))
-        LOGGER.debug(response.content)
-        raise APIError('Not JSON')
+        return self._result(response.status_code,
+                            response.headers.get('Content-Type', ''),
+                            response.url, response.content,
+                            lambda: self._decode(response.content))
+
+    def _result(self, status_code, content_type, url, content, decode):
+        """Return the result of an API call or raise an APIError, independent
+        of the HTTP client that made the request.
+
+        :param int status_code: The HTTP response status code
+        :param str content_type: The response content type
+        :param str url: The URL that was requested
+        :param bytes content: The raw response body
+        :param callable decode: Returns the decoded JSON response body
+        :rtype: list or dict or bytes
+        :raise: hockeyapp.app.APIError
+
+        """
+        if 200 <= status_code <= 300:
+            if 'application/json' in content_type:
+                return decode()
+            return content
+        if status_code == 404:
+            raise APIError({'404': 'URL Not Found: %s' % url}, status_code)
+        if 'application/json' in content_type:
+            raise APIError(decode().get('errors'), status_code)
+        LOGGER.debug(content)
+        raise APIError({str(status_code): 'Not JSON'}, status_code)
+
+    def _stream(self, uri_parts, key, data=None,
+                chunk_size=jsonstream.CHUNK_SIZE):
+        """Get a list from the API, yielding its items as they are parsed
+        from the response body instead of after the whole body is read.
+        Streamed responses are not cached.
+
+        :param list uri_parts: Parts of the URI to compose the URI
+        :param str key: The key of the list in the response
+        :param dict data: Optional query parameters for the GET
+        :param int chunk_size: The number of bytes to read at a time
+        :rtype: generator
+        :raise: hockeyapp.api.APIError
+        :raise: ValueError
+
+        """
+        uri = self._build_uri(uri_parts) if uri_parts else self._uri
+        LOGGER.debug('Performing streaming HTTP GET to %s', uri)
+        response = self._request('GET', uri, headers=self.headers, data=data,
+                                 stream=True)
+        try:
+            if not 200 <= response.status_code <= 300:
+                self._response(response)  # Raises the APIError
+            if 'application/json' not in \
+                    response.headers.get('Content-Type', ''):
+                raise ValueError('Response from %s is not JSON' % uri)
+            for item in jsonstream.items(response.iter_content(chunk_size),
+                                         key, self._decode):
+                yield item
+        finally:
+            response.close()
 
     @property
     def _uri(self):
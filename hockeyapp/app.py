@@ -3,13 +3,26 @@ Implements an object for calling the Application List API
 
 """
 import collections
+from concurrent import futures
+import itertools
+import logging
 import os
 import re
-import tempfile
 import warnings
-import zipfile
+
+import requests
 
 from hockeyapp import api
+from hockeyapp import dedup
+from hockeyapp import dsym
+from hockeyapp import multipart
+from hockeyapp import records
+from hockeyapp import retention
+
+LOGGER = logging.getLogger(__name__)
+
+# Text accepted for version metadata, str or unicode on Python 2
+TEXT_TYPES = (str, type(u''))
 
 Crashes = collections.namedtuple('Crashes', 'crashes,total_entries,'
                                             'total_pages,current_page,'
@@ -19,24 +32,135 @@ CrashGroups = collections.namedtuple('CrashGroup', 'reasons,total_entries,'
                                                    'total_pages,current_page,'
                                                    'per_page')
 
+BulkResult = collections.namedtuple('BulkResult', 'result,error')
+
 Feedback = collections.namedtuple('Feedback', 'feedback,total_entries,'
                                               'total_pages,current_page,'
                                               'items_per_page')
 
 
+def _page(page_type, key, response, record_type=None):
+    """Return a page of results from a paginated API response. The items are
+    the decoded JSON objects, or a :class:`hockeyapp.records.RecordList` if
+    a record type is passed.
+
+    :param type page_type: The namedtuple type for the page
+    :param str key: The response key containing the list of items
+    :param dict response: The decoded API response
+    :param type record_type: The record class for the items (optional)
+    :rtype: Crashes or CrashGroups or Feedback
+
+    """
+    items = response.get(key, [])
+    if record_type:
+        items = records.RecordList(record_type, items)
+    return page_type(items,
+                     response.get('total_entries', 0),
+                     response.get('total_pages', 0),
+                     response.get('current_page', 0),
+                     response.get('per_page', 0))
+
+
 class Applications(api.APIRequest):
     """Top level management of apps"""
     KEY = 'apps'
 
-    def list(self):
+    def application(self, app_id):
+        """Return an Application that shares the connection pool, cache and
+        rate limiter of this object.
+
+        :param str app_id: The app public identifier
+        :rtype: Application
+        :raises: ValueError
+
+        """
+        return Application(self.headers['X-HockeyAppToken'], app_id,
+                           self.pool, self.cache, self.limiter)
+
+    def bulk_crash_groups(self, app_ids=None, workers=10, **kwargs):
+        """Get the first page of crash groups for many apps concurrently.
+
+        :param list app_ids: The app public identifiers, defaults to every
+            app for the API token
+        :param int workers: The number of apps to request concurrently
+        :param dict kwargs: Keyword arguments for
+            :meth:`Application.crash_groups`
+        :return dict: :class:`BulkResult` values of :class:`CrashGroups` or
+            the error raised, keyed by public identifier
+
+        """
+        return self._bulk('crash_groups', app_ids, workers, **kwargs)
+
+    def bulk_statistics(self, app_ids=None, workers=10):
+        """Get the statistics for many apps concurrently.
+
+        :param list app_ids: The app public identifiers, defaults to every
+            app for the API token
+        :param int workers: The number of apps to request concurrently
+        :return dict: :class:`BulkResult` values of statistics or the error
+            raised, keyed by public identifier
+
+        """
+        return self._bulk('statistics', app_ids, workers)
+
+    def bulk_versions(self, app_ids=None, workers=10):
+        """Get the versions of many apps concurrently.
+
+        :param list app_ids: The app public identifiers, defaults to every
+            app for the API token
+        :param int workers: The number of apps to request concurrently
+        :return dict: :class:`BulkResult` values of versions or the error
+            raised, keyed by public identifier
+
+        """
+        return self._bulk('versions', app_ids, workers)
+
+    def list(self, stream=False):
         """List all apps for the API token, including owned apps, developer
-        apps, member apps, and tester apps.
+        apps, member apps, and tester apps. If stream is set, the apps are
+        yielded as they are read from the response instead.
 
-        :rtype: list
+        :param bool stream: Stream the apps from the response
+        :rtype: list or generator
 
         """
+        if stream:
+            return self._stream(['apps'], 'apps')
         return self._get(uri_parts=['apps'])['apps']
 
+    def _bulk(self, method, app_ids, workers, **kwargs):
+        """Call an Application method for each app using a thread pool. Each
+        app shares the connection pool, cache and rate limiter of this
+        object. Errors are returned in the results instead of being raised.
+
+        :param str method: The Application method name
+        :param list app_ids: The app public identifiers
+        :param int workers: The number of apps to request concurrently
+        :param dict kwargs: Keyword arguments for the method
+        :rtype: dict
+
+        """
+        if app_ids is None:
+            app_ids = [value['public_identifier'] for value in self.list()]
+
+        def call(app_id):
+            try:
+                return BulkResult(getattr(self.application(app_id),
+                                          method)(**kwargs), None)
+            except (api.APIError, ValueError,
+                    requests.exceptions.RequestException) as error:
+                LOGGER.debug('%s failed for %s: %s', method, app_id, error)
+                return BulkResult(None, error)
+
+        if not app_ids:
+            return {}
+        executor = futures.ThreadPoolExecutor(max(min(workers, len(app_ids)),
+                                                  1))
+        try:
+            return dict(zip(app_ids, executor.map(call, app_ids)))
+        finally:
+            executor.shutdown()
+
 
 class Application(api.APIRequest):
     """Manage an Application at HockeyApp"""
@@ -48,6 +172,10 @@ class Application(api.APIRequest):
     CRASH_STATUS_RESOLVED = 1
     CRASH_STATUS_IGNORED = 2
 
+    CRASH_SORT_DATE = 'date'
+    CRASH_SORT_LAST_CRASH = 'last_crash_at'
+    CRASH_SORT_NUMBER = 'number_of_crashes'
+
     NOTES_TEXTILE = 0
     NOTES_MARKDOWN = 1
 
@@ -67,19 +195,48 @@ class Application(api.APIRequest):
     VALID_PLATFORMS = [PLATFORM_ANDROID, PLATFORM_CUSTOM, PLATFORM_IOS,
                        PLATFORM_OSX, PLATFORM_WINDOWS_PHONE]
     VALUE_RELEASE = [RELEASE_ALPHA, RELEASE_BETA, RELEASE_LIVE]
+    VALID_CRASH_SORTS = [CRASH_SORT_DATE, CRASH_SORT_LAST_CRASH,
+                         CRASH_SORT_NUMBER]
 
-    def __init__(self, token, app_id=None):
+    def __init__(self, token, app_id=None, pool=None, cache=None,
+                 limiter=None):
         """Construct the Application object
 
         :param str token: The API token for the request
         :param str app_id: The App ID public identifier for an existing app
+        :param hockeyapp.api.ConnectionPool pool: The connection pool to use
+            (optional)
+        :param cache: A :mod:`hockeyapp.cache` response cache (optional)
+        :param hockeyapp.ratelimit.RateLimiter limiter: A shared rate limiter
+            (optional)
         :raises: ValueError
 
         """
         if app_id:
             self._check_app_id(app_id)
         self._app_id = app_id
-        super(Application, self).__init__(token)
+        super(Application, self).__init__(token, pool, cache, limiter)
+
+    @property
+    def app_id(self):
+        """Return the public identifier of the application
+
+        :rtype: str
+
+        """
+        return self._app_id
+
+    @app_id.setter
+    def app_id(self, value):
+        """Set the public identifier of the application
+
+        :param str value: The public identifier
+        :raises: ValueError
+
+        """
+        if value:
+            self._check_app_id(value)
+        self._app_id = value
 
     def create(self, title, bundle_identifier, platform='iOS', release_type=0):
         """Create a new application without uploading a file.
@@ -146,7 +303,7 @@ class Application(api.APIRequest):
         return response
 
     def crash_groups(self, version_id=None, symbolicated=False, offset=1,
-                     limit=25, order='asc'):
+                     limit=25, order='asc', sort=None, as_records=False):
         """List all crashes grouped by reason for an app. If version_id is
         specified, return all of the crash groupings for that version.
 
@@ -155,34 +312,41 @@ class Application(api.APIRequest):
         :param int offset: The offset for the page of feedback
         :param int limit: The maximum number of entries per page (25, 50, 100)
         :param str order: Order of items in list, ``asc`` or ``desc``
-        :rtype: Feedback
+        :param str sort: Sort items by ``date``, ``number_of_crashes`` or
+            ``last_crash_at`` (optional)
+        :param bool as_records: Return the crash reasons as
+            :class:`hockeyapp.records.CrashReason` records
+        :rtype: CrashGroups
 
         """
         if order not in ['asc', 'desc']:
             raise ValueError('order must either be "asc" or "desc"')
+        if sort and sort not in self.VALID_CRASH_SORTS:
+            raise ValueError('Invalid sort value')
 
         parts = ['apps', self._app_id, 'crash_reasons']
         if version_id:
             parts = ['apps', self._app_id,
                      'app_versions', str(version_id),
                      'crash_reasons']
-        response = self._get(uri_parts=parts,
-                             data={'symbolication': int(symbolicated),
-                                   'page': offset,
-                                   'per_page': limit,
-                                   'order': order})
-        return CrashGroups(response.get('crash_reasons', []),
-                           response.get('total_entries', 0),
-                           response.get('total_pages', 0),
-                           response.get('current_page', 0),
-                           response.get('per_page', 0))
-
-    def crashes(self, reason_id, offset=0, limit=25):
+        data = {'symbolication': int(symbolicated),
+                'page': offset,
+                'per_page': limit,
+                'order': order}
+        if sort:
+            data['sort'] = sort
+        response = self._get(uri_parts=parts, data=data)
+        return _page(CrashGroups, 'crash_reasons', response,
+                     records.CrashReason if as_records else None)
+
+    def crashes(self, reason_id, offset=0, limit=25, as_records=False):
         """Paginated list of crashes in a crash reason group.
 
         :param str reason_id: The id value returned for a crash group
         :param int offset: The starting offset for the crash reason
         :param int limit: The maximum number of entries returned (25, 50, 100)
+        :param bool as_records: Return the crashes as
+            :class:`hockeyapp.records.Crash` records
         :rtype: list
 
         """
@@ -192,11 +356,8 @@ class Application(api.APIRequest):
                                         str(reason_id)],
                              data={'page': offset,
                                    'per_page': limit})
-        return Crashes(response.get('crashes', []),
-                       response.get('total_entries', 0),
-                       response.get('total_pages', 0),
-                       response.get('current_page', 0),
-                       response.get('per_page', 0))
+        return _page(Crashes, 'crashes', response,
+                     records.Crash if as_records else None)
 
     def delete(self):
         """Delete the app
@@ -223,37 +384,95 @@ class Application(api.APIRequest):
         :raises: ValueError
 
         """
-        pass
+        self._delete(uri_parts=['apps', self._app_id,
+                                'app_versions', str(version_id)],
+                     data={'strategy': 'purge'} if purge else None)
+        return True
 
-    def delete_multiple_versions(self, version_id,
+    def delete_multiple_versions(self, version_id=None,
                                  purge=False,
                                  sort='version', number=0, keep=0,
-                                 storage_percentage=None):
+                                 storage_percentage=None, dry_run=False,
+                                 workers=4):
         """Delete multiple version from an application. If purge is set to
         True, all data will be removed along with the versions of the
         application. If it is False, crashes and crashes will be remain. To
         remove only a certain number of versions, use the number argument. To
         keep a certain number of versions, use the keep argument. If
-        storage_percentage is set to an integer, any app that exceeds that
-        percentage of the storage will be removed.
+        storage_percentage is set to an integer, the oldest versions are
+        removed until the remaining versions use no more than that percentage
+        of the storage.
 
         sort must be either the string 'version' or 'date' and ordering of
         versions for removal is based upon this value.
 
-        :param str version_id: The version id to remove
+        The versions are fetched once and the versions to remove are planned
+        locally with :func:`hockeyapp.retention.plan`, then deleted
+        concurrently. If dry_run is True, the planned versions are returned
+        without deleting them.
+
+        :param str version_id: Only remove versions older than this version
+            (optional)
         :param bool purge: Purge all data for the version
         :param str sort: Either 'version' or 'date' for ordering for removal
         :param int number: Number of build versions to remove
         :param int keep: Number of build versions to keep
-        :param int storage_percentage: The percentage of storage used to
-                                       qualify removal
-        :rtype: bool
+        :param int storage_percentage: The percentage of the current storage
+            the remaining versions may use
+        :param bool dry_run: Plan the removal without deleting anything
+        :param int workers: The number of versions to delete concurrently
+        :return dict: A :class:`BulkResult` with the version or the error
+            raised deleting it, by version id, in removal order
         :raises: ValueError
 
         """
-        pass
+        planned = retention.plan(self.versions(), sort, number, keep,
+                                 storage_percentage, version_id)
+        if dry_run or not planned:
+            return collections.OrderedDict(
+                (value['id'], BulkResult(value, None)) for value in planned)
+
+        def call(value):
+            try:
+                self.delete_version(value['id'], purge)
+                return BulkResult(value, None)
+            except (api.APIError,
+                    requests.exceptions.RequestException) as error:
+                LOGGER.warning('Error deleting version %s: %s', value['id'],
+                               error)
+                return BulkResult(None, error)
+
+        executor = futures.ThreadPoolExecutor(max(min(workers, len(planned)),
+                                                  1))
+        try:
+            return collections.OrderedDict(zip(
+                [value['id'] for value in planned],
+                executor.map(call, planned)))
+        finally:
+            executor.shutdown()
+
+    def download_crash(self, crash_id, sink, format='log', compress=False,
+                       chunk_size=multipart.CHUNK_SIZE):
+        """Stream the crash log or description for a specific crash to a
+        file, writing it in chunks as it is downloaded.
+
+        :param str crash_id: The specific crash to get
+        :param sink: The path of the file to write to, or a writable
+            file-like object
+        :param str format: ``log`` for the crash log or ``text`` for the
+            crash description
+        :param bool compress: Gzip compress the crash log as it is written
+        :param int chunk_size: The number of bytes to read at a time
+        :return int: The number of bytes downloaded
+        :raise: ValueError
+
+        """
+        if format not in ['log', 'text']:
+            raise ValueError('format must either be "log" or "text"')
+        return self._download(['apps', self._app_id, 'crashes', str(crash_id)],
+                              sink, {'format': format}, compress, chunk_size)
 
-    def feedback(self, offset=1, limit=25, order='asc'):
+    def feedback(self, offset=1, limit=25, order='asc', as_records=False):
         """Paginated list of feedback for an application. Returns a tuple of
         the list of feedback, total entries, total pages, current page, and
         the limit per page.
@@ -261,6 +480,8 @@ class Application(api.APIRequest):
         :param int offset: The offset for the page of feedback
         :param int limit: The maximum number of entries per page (25, 50, 100)
         :param str order: Order of items in list, ``asc`` or ``desc``
+        :param bool as_records: Return the feedback as
+            :class:`hockeyapp.records.Feedback` records
         :rtype: Feedback
 
         """
@@ -272,11 +493,8 @@ class Application(api.APIRequest):
                              data={'page': offset,
                                    'per_page': limit,
                                    'order': order})
-        return Feedback(response.get('feedback', []),
-                        response.get('total_entries', 0),
-                        response.get('total_pages', 0),
-                        response.get('current_page', 0),
-                        response.get('per_page', 0))
+        return _page(Feedback, 'feedback', response,
+                     records.Feedback if as_records else None)
 
     def histogram(self, start_date, end_date):
         """Get a histogram of the number of crashes between two given dates
@@ -292,6 +510,143 @@ class Application(api.APIRequest):
                                    'end_date': end_date.isoformat()})
         return dict(response.get('histogram', []))
 
+    def iter_crash_groups(self, version_id=None, symbolicated=False,
+                          limit=100, order='asc', prefetch=True, workers=1,
+                          ordered=True, sort=None, as_records=False):
+        """Iterate over all of the crash groups for an app, or for a version
+        of the app if version_id is specified, fetching pages as needed. The
+        next page is fetched in the background while the current page is
+        consumed, unless prefetch is False.
+
+        :param str version_id: An optional version number to restrict groups to
+        :param bool symbolicated: run crashes through the symbolication process
+        :param int limit: The maximum number of entries per page (25, 50, 100)
+        :param str order: Order of items in list, ``asc`` or ``desc``
+        :param bool prefetch: Fetch the next page while the current one is
+            being consumed
+        :param int workers: The number of pages to fetch concurrently once
+            the total number of pages is known
+        :param bool ordered: Yield pages in page order instead of the order
+            they are returned in
+        :param str sort: Sort items by ``date``, ``number_of_crashes`` or
+            ``last_crash_at`` (optional)
+        :param bool as_records: Yield the crash reasons as
+            :class:`hockeyapp.records.CrashReason` records
+        :rtype: generator
+
+        """
+        return self._iter_pages(self.crash_groups, 'reasons', limit, prefetch,
+                                workers, ordered, version_id=version_id,
+                                symbolicated=symbolicated, order=order,
+                                sort=sort, as_records=as_records)
+
+    def iter_crashes(self, reason_id, limit=100, prefetch=True, workers=1,
+                     ordered=True, as_records=False):
+        """Iterate over all of the crashes in a crash reason group, fetching
+        pages as needed. The next page is fetched in the background while the
+        current page is consumed, unless prefetch is False.
+
+        :param str reason_id: The id value returned for a crash group
+        :param int limit: The maximum number of entries per page (25, 50, 100)
+        :param bool prefetch: Fetch the next page while the current one is
+            being consumed
+        :param int workers: The number of pages to fetch concurrently once
+            the total number of pages is known
+        :param bool ordered: Yield pages in page order instead of the order
+            they are returned in
+        :param bool as_records: Yield the crashes as
+            :class:`hockeyapp.records.Crash` records
+        :rtype: generator
+
+        """
+        return self._iter_pages(self.crashes, 'crashes', limit, prefetch,
+                                workers, ordered, reason_id=reason_id,
+                                as_records=as_records)
+
+    def iter_feedback(self, limit=100, order='asc', prefetch=True,
+                      workers=1, ordered=True, as_records=False):
+        """Iterate over all of the feedback for an app, fetching pages as
+        needed. The next page is fetched in the background while the current
+        page is consumed, unless prefetch is False.
+
+        :param int limit: The maximum number of entries per page (25, 50, 100)
+        :param str order: Order of items in list, ``asc`` or ``desc``
+        :param bool prefetch: Fetch the next page while the current one is
+            being consumed
+        :param int workers: The number of pages to fetch concurrently once
+            the total number of pages is known
+        :param bool ordered: Yield pages in page order instead of the order
+            they are returned in
+        :param bool as_records: Yield the feedback as
+            :class:`hockeyapp.records.Feedback` records
+        :rtype: generator
+
+        """
+        return self._iter_pages(self.feedback, 'feedback', limit, prefetch,
+                                workers, ordered, order=order,
+                                as_records=as_records)
+
+    @staticmethod
+    def _iter_pages(method, attribute, limit, prefetch, workers=1,
+                    ordered=True, **kwargs):
+        """Yield each item from every page returned by a paginated method.
+        Once the first page has returned the total number of pages, up to
+        ``workers`` of the remaining pages are fetched concurrently, holding
+        at most ``workers + 1`` pages in memory at a time.
+
+        :param callable method: The paginated method to call
+        :param str attribute: The page attribute containing the items
+        :param int limit: The maximum number of entries per page
+        :param bool prefetch: Fetch the next page while the current one is
+            being consumed
+        :param int workers: The number of pages to fetch concurrently
+        :param bool ordered: Yield pages in page order instead of the order
+            they are returned in
+        :param dict kwargs: Keyword arguments for the paginated method,
+            ``as_records`` is only passed on when it is set
+        :rtype: generator
+
+        """
+        if not kwargs.get('as_records'):
+            kwargs.pop('as_records', None)
+        executor = None
+        if prefetch or workers > 1:
+            executor = futures.ThreadPoolExecutor(max(workers, 1))
+        pending = collections.deque()
+        try:
+            page = method(offset=1, limit=limit, **kwargs)
+            numbers = iter(range(2, page.total_pages + 1)
+                           if getattr(page, attribute) else [])
+            while True:
+                if executor:
+                    for number in itertools.islice(
+                            numbers, max(workers, 1) - len(pending)):
+                        pending.append(executor.submit(
+                            method, offset=number, limit=limit, **kwargs))
+                for item in getattr(page, attribute):
+                    yield item
+                if executor:
+                    if not pending:
+                        return
+                    if ordered:
+                        future = pending.popleft()
+                    else:
+                        future = futures.wait(
+                            pending,
+                            return_when=futures.FIRST_COMPLETED)[0].pop()
+                        pending.remove(future)
+                    page = future.result()
+                else:
+                    number = next(numbers, None)
+                    if number is None:
+                        return
+                    page = method(offset=number, limit=limit, **kwargs)
+        finally:
+            for future in pending:
+                future.cancel()
+            if executor:
+                executor.shutdown(wait=False)
+
     def post_crash(self, log_path, description=None,
                    attachment_paths=None, user_id=None, contact=None):
         """Post a crash report, e.g. if you don't want to use the HockeyApp
@@ -351,7 +706,10 @@ class Application(api.APIRequest):
                notes=None, notes_type=None, notify=False, status=1,
                mandatory=None, tags=None, commit_sha=None,
                build_server_url=None, repository_url=None,
-               release_type=None):
+               release_type=None, progress=None,
+               chunk_size=multipart.CHUNK_SIZE,
+               dsym_compress_level=dsym.DEFAULT_COMPRESS_LEVEL,
+               dsym_workers=1, index=None):
         """Upload an .ipa, .apk, or .zip file to create a new app. If an app
         with the same bundle identifier or package name and the same release
         type already exists, the uploaded file is assigned to this existing
@@ -377,71 +735,166 @@ class Application(api.APIRequest):
         :param str build_server_url: URL of the build job (optional)
         :param str repository_url: URL to source repository (optional)
         :param int release_type: 2 for alpha, 0 for beta, 1 for live (optional)
+        :param callable progress: Called with the number of bytes sent and the
+            total number of bytes as the upload progresses (optional)
+        :param int chunk_size: The number of bytes to read from the files at
+            a time while uploading
+        :param int dsym_compress_level: The deflate level used when zipping a
+            .dSYM folder, or 0 to store files without compressing them
+        :param int dsym_workers: The number of threads compressing a .dSYM
+            folder, or None for the number of CPUs
+        :param hockeyapp.dedup.UploadIndex index: Skip files that were
+            already uploaded for this app and build, and record the SHA-256
+            digest of the ipa and the content key of the dSYM or mapping.txt
+            uploaded (optional)
         :return str: app_id public identifier
         :raises: ValueError
 
         """
+        for path in (ipa_file, dsym_file):
+            if path and not os.path.exists(path):
+                raise ValueError('File not found: %s' % path)
+
+        signatures, sizes, digests = {}, {}, {}
+        if index:
+            for kind, path in (('ipa', ipa_file), ('dsym', dsym_file)):
+                if path:
+                    signatures[kind] = dedup.signature(path)
+                    sizes[kind] = dedup.file_size(path)
+                    digests[kind] = index.digest(signatures[kind]) or \
+                        self._content_key(index, kind, path, sizes[kind])
+            if self._app_id:
+                ipa_file, dsym_file = self._skip_uploaded(index, digests,
+                                                          ipa_file, dsym_file)
+                if not ipa_file and not dsym_file:
+                    LOGGER.info('Files already uploaded for %s, skipping',
+                                self._app_id)
+                    return self._app_id
+
         files = {}
 
         if ipa_file:
-            if not os.path.exists(ipa_file):
-                raise ValueError('File not found: %s' % ipa_file)
-            ipa = open(ipa_file, 'rb')
             ipa_file_name = os.path.split(ipa_file)[1]
-            files["ipa"] = (ipa_file_name, ipa)
+            files["ipa"] = (ipa_file_name, open(ipa_file, 'rb'))
 
         if dsym_file:
-            if not os.path.exists(dsym_file):
-                raise ValueError('File not found: %s' % dsym_file)
-            dsym_file_name = os.path.split(dsym_file)[1]
-            if "dSYM" in dsym_file and os.path.isdir(dsym_file):
-                dsym_zip = tempfile.NamedTemporaryFile(delete=False)
-                z = zipfile.ZipFile(dsym_zip, 'w')
-                rootlen = len(os.path.split(dsym_file)[0]) + 1
-                for base, dirs, list_files in os.walk(dsym_file):
-                    for f in list_files:
-                        fn = os.path.join(base, f)
-                        z.write(fn, fn[rootlen:])
-                z.close()
-                dsym_zip.seek(0)
-                files["dsym"] = (dsym_file_name + '.zip', dsym_zip)
-            else:
-                files["dsym"] = (dsym_file_name, dsym_file)
-
-        data = {}
-
-        validation_map = {
-            "notes": (notes, str, None),
-            "notes_type": (notes_type, int, [0, 1]),
-            "notify": (notify, int, [0, 1]),
-            "status": (status, int, [1, 2]),
-            "mandatory": (mandatory, int, [0, 1]),
-            "tags": (tags, list, None),
-            "commit_sha": (commit_sha, str, None),
-            "build_server_url": (build_server_url, str, None),
-            "repository_url": (repository_url, str, None),
-            "release_type": (release_type, int, [0, 1, 2]),
-        }
-
-        for key in validation_map:
-            val, t, valids = validation_map[key]
-            if val:
-                if type(val) is not t:
-                    ValueError('Invalid type for `%s`' % key)
-                if valids and val not in valids:
-                    ValueError('Invalid value for `%s`' % key)
-                data[key] = val
-
+            files["dsym"] = self._dsym_part(dsym_file, dsym_compress_level,
+                                            dsym_workers)
+
+        if index:
+            for kind in files:
+                if not digests[kind] and not isinstance(files[kind][1],
+                                                        dsym.ZipStream):
+                    files[kind] = (files[kind][0],
+                                   dedup.HashingReader(files[kind][1]))
+
+        data = self._version_data(notes, notes_type, notify, status,
+                                  mandatory, tags, commit_sha,
+                                  build_server_url, repository_url,
+                                  release_type)
+
+        body = multipart.MultipartEncoder(data, files, chunk_size, progress)
         try:
             response = self._post(uri_parts=['apps', 'upload'],
-                                  data=data,
-                                  files=files)
+                                  data=body,
+                                  headers={'Content-Type': body.content_type})
         except api.APIError as error:
             raise error
+        finally:
+            for value in files.values():
+                value[1].close()
 
         self._app_id = response['public_identifier']
+        if index:
+            for kind, value in files.items():
+                if isinstance(value[1], dedup.HashingReader):
+                    digests[kind] = value[1].digest.hexdigest()
+            for kind in files:
+                index.record(self._app_id, digests.get('ipa') or '', kind,
+                             digests[kind], signatures[kind], sizes[kind])
         return response['public_identifier']
 
+    def upload_dsym(self, version_id, dsym_file, progress=None,
+                    chunk_size=multipart.CHUNK_SIZE,
+                    dsym_compress_level=dsym.DEFAULT_COMPRESS_LEVEL,
+                    dsym_workers=1):
+        """Upload the .dSYM folder or mapping.txt for an existing version of
+        the app.
+
+        :param str version_id: The version to upload the symbols for
+        :param str dsym_file: File path of the .dSYM folder (iOS and Mac) or
+            mapping.txt (Android)
+        :param callable progress: Called with the number of bytes sent and the
+            total number of bytes as the upload progresses (optional)
+        :param int chunk_size: The number of bytes to read from the file at a
+            time while uploading
+        :param int dsym_compress_level: The deflate level used when zipping a
+            .dSYM folder, or 0 to store files without compressing them
+        :param int dsym_workers: The number of threads compressing a .dSYM
+            folder, or None for the number of CPUs
+        :rtype: bool
+        :raises: ValueError
+
+        """
+        if not os.path.exists(dsym_file):
+            raise ValueError('File not found: %s' % dsym_file)
+        files = {'dsym': self._dsym_part(dsym_file, dsym_compress_level,
+                                         dsym_workers)}
+        body = multipart.MultipartEncoder({}, files, chunk_size, progress)
+        try:
+            self._put(uri_parts=['apps', self._app_id,
+                                 'app_versions', str(version_id)],
+                      data=body,
+                      headers={'Content-Type': body.content_type})
+        finally:
+            files['dsym'][1].close()
+        return True
+
+    def upload_version(self, ipa_file, notes=None, notes_type=None,
+                       notify=False, status=1, mandatory=None, tags=None,
+                       commit_sha=None, build_server_url=None,
+                       repository_url=None, release_type=None,
+                       progress=None, chunk_size=multipart.CHUNK_SIZE):
+        """Upload an .ipa, .apk, or .zip file as a new version of the app and
+        return the version, whose id can be used to upload the symbols with
+        :meth:`upload_dsym`.
+
+        :param str ipa_file: Path to the ipa file
+        :param str notes: Notes for testers (optional)
+        :param int notes_type: The type of formatting for the notes (0, 1)
+        :param bool notify: Notify testers (optional)
+        :param int status: Download status (1, 2))
+        :param bool mandatory: Set version as mandatory (optional)
+        :param list tags: a list of tags to apply to the version (optional)
+        :param str commit_sha: The SCM commit sha for the version (optional)
+        :param str build_server_url: URL of the build job (optional)
+        :param str repository_url: URL to source repository (optional)
+        :param int release_type: 2 for alpha, 0 for beta, 1 for live (optional)
+        :param callable progress: Called with the number of bytes sent and the
+            total number of bytes as the upload progresses (optional)
+        :param int chunk_size: The number of bytes to read from the file at a
+            time while uploading
+        :rtype: dict
+        :raises: ValueError
+
+        """
+        if not os.path.exists(ipa_file):
+            raise ValueError('File not found: %s' % ipa_file)
+        files = {'ipa': (os.path.split(ipa_file)[1], open(ipa_file, 'rb'))}
+        data = self._version_data(notes, notes_type, notify, status,
+                                  mandatory, tags, commit_sha,
+                                  build_server_url, repository_url,
+                                  release_type)
+        body = multipart.MultipartEncoder(data, files, chunk_size, progress)
+        try:
+            response = self._post(uri_parts=['apps', self._app_id,
+                                             'app_versions', 'upload'],
+                                  data=body,
+                                  headers={'Content-Type': body.content_type})
+        finally:
+            files['ipa'][1].close()
+        return response
+
     def update_crash_reason(self, reason_id, status=None, ticket_url=None):
         """Update a crash reason grouping with an optional status flag and
         optional ticket URL.
@@ -476,17 +929,71 @@ class Application(api.APIRequest):
             raise error
         return True
 
-    def versions(self):
-        """Get statistics about downloads, installs, and crashes for all
-        versions for an application.
+    def users(self, as_records=False):
+        """Get the users of an application and their roles.
 
+        :param bool as_records: Return the users as
+            :class:`hockeyapp.records.User` records
         :rtype: list
         :raises: ValueError
 
         """
-        return self._get(uri_parts=['apps',
-                                    self._app_id,
-                                    'app_versions'])['app_versions']
+        response = self._get(uri_parts=['apps', self._app_id, 'app_users'])
+        if as_records:
+            return records.RecordList(records.User, response['app_users'])
+        return response['app_users']
+
+    def versions(self, stream=False, as_records=False):
+        """Get statistics about downloads, installs, and crashes for all
+        versions for an application. If stream is set, the versions are
+        yielded as they are read from the response instead.
+
+        :param bool stream: Stream the versions from the response
+        :param bool as_records: Return the versions as
+            :class:`hockeyapp.records.Version` records
+        :rtype: list or generator
+        :raises: ValueError
+
+        """
+        if stream:
+            values = self._stream(['apps', self._app_id, 'app_versions'],
+                                  'app_versions')
+            if not as_records:
+                return values
+            interned = {}
+            return (records.Version(value, interned) for value in values)
+        response = self._get(uri_parts=['apps', self._app_id,
+                                        'app_versions'])
+        if as_records:
+            return records.RecordList(records.Version,
+                                      response['app_versions'])
+        return response['app_versions']
+
+    def _skip_uploaded(self, index, digests, ipa_file, dsym_file):
+        """Return the ipa and dSYM paths, replacing the paths of files that
+        have already been uploaded for the app with None. The dSYM is only
+        skipped along with an ipa if it was uploaded for the same build.
+
+        :param hockeyapp.dedup.UploadIndex index: The upload index
+        :param dict digests: The known digests of the files
+        :param str ipa_file: The path to the ipa file
+        :param str dsym_file: The path to the dSYM
+        :rtype: tuple
+
+        """
+        ipa_digest, dsym_digest = digests.get('ipa'), digests.get('dsym')
+        if ipa_file:
+            if not ipa_digest or not index.uploaded(self._app_id, 'ipa',
+                                                    ipa_digest):
+                return ipa_file, dsym_file
+            ipa_file = None
+            if dsym_digest and index.uploaded(self._app_id, 'dsym',
+                                              dsym_digest, ipa_digest):
+                dsym_file = None
+        elif dsym_digest and index.uploaded(self._app_id, 'dsym',
+                                            dsym_digest):
+            dsym_file = None
+        return ipa_file, dsym_file
 
     def _check_app_id(self, value):
         """Check the public identifier value passed in and ensure it's the
@@ -503,6 +1010,81 @@ class Application(api.APIRequest):
             raise ValueError('public_identifier is a 32 character hex digest '
                              'hash value')
 
+    def _content_key(self, index, kind, path, size):
+        """Return the content key of a file to upload if it can be known
+        before the upload, or None if the file is hashed while it is
+        uploaded instead. A .dSYM bundle is keyed by the UUIDs in its
+        headers. Other files are only read before the upload if a file of
+        the same size was uploaded for the app, since only then can they be
+        a duplicate.
+
+        :param hockeyapp.dedup.UploadIndex index: The upload index
+        :param str kind: The upload field, ``ipa`` or ``dsym``
+        :param str path: The path to the file or bundle
+        :param int size: The size of the file or bundle
+        :rtype: str or None
+
+        """
+        if kind == 'dsym' and os.path.isdir(path):
+            return dedup.content_key(path)
+        if self._app_id and index.size_uploaded(self._app_id, kind, size):
+            return dedup.content_key(path)
+        return None
+
+    @staticmethod
+    def _dsym_part(dsym_file, compress_level, workers):
+        """Return the upload file name and a file-like object for a .dSYM
+        folder, which is zipped as it is read, or for a mapping.txt.
+
+        :param str dsym_file: The path to the .dSYM folder or mapping.txt
+        :param int compress_level: The deflate level used when zipping a
+            .dSYM folder
+        :param int workers: The number of threads compressing a .dSYM folder
+        :rtype: tuple
+
+        """
+        dsym_file_name = os.path.split(dsym_file)[1]
+        if "dSYM" in dsym_file and os.path.isdir(dsym_file):
+            return (dsym_file_name + '.zip',
+                    dsym.ZipStream(dsym_file, compress_level,
+                                   workers=workers))
+        return dsym_file_name, open(dsym_file, 'rb')
+
+    @staticmethod
+    def _version_data(notes, notes_type, notify, status, mandatory, tags,
+                      commit_sha, build_server_url, repository_url,
+                      release_type):
+        """Return the form fields for the metadata of an uploaded version
+
+        :rtype: dict
+        :raises: ValueError
+
+        """
+        data = {}
+
+        validation_map = {
+            "notes": (notes, TEXT_TYPES, None),
+            "notes_type": (notes_type, int, [0, 1]),
+            "notify": (notify, int, [0, 1]),
+            "status": (status, int, [1, 2]),
+            "mandatory": (mandatory, int, [0, 1]),
+            "tags": (tags, list, None),
+            "commit_sha": (commit_sha, TEXT_TYPES, None),
+            "build_server_url": (build_server_url, TEXT_TYPES, None),
+            "repository_url": (repository_url, TEXT_TYPES, None),
+            "release_type": (release_type, int, [0, 1, 2]),
+        }
+
+        for key in validation_map:
+            val, t, valids = validation_map[key]
+            if val:
+                if not isinstance(val, t):
+                    raise ValueError('Invalid type for `%s`' % key)
+                if valids and val not in valids:
+                    raise ValueError('Invalid value for `%s`' % key)
+                data[key] = val
+        return data
+
 
 # Deprecated classes for transitional support, to be removed in future versions
 
@@ -0,0 +1,221 @@
+"""
+Response caches for idempotent API GET requests. Entries expire after a TTL
+and the least recently used entries are evicted once the cache is full.
+Expired entries are kept so they can be revalidated with the server using
+their ETag or Last-Modified values.
+
+"""
+import collections
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+CacheEntry = collections.namedtuple('CacheEntry', 'content,content_type,'
+                                                  'etag,last_modified,'
+                                                  'expires')
+
+
+def cache_key(token, uri, data=None):
+    """Return the cache key for a request
+
+    :param str token: The API token used for the request
+    :param str uri: The request URI
+    :param dict data: The request parameters
+    :rtype: str
+
+    """
+    params = '&'.join('%s=%s' % (key, value)
+                      for key, value in sorted((data or {}).items()))
+    return hashlib.sha1(('%s %s?%s' % (token, uri, params))
+                        .encode('utf-8')).hexdigest()
+
+
+def new_entry(content, content_type, etag, last_modified, ttl):
+    """Return a new cache entry that is fresh for ttl seconds
+
+    :param bytes content: The response body
+    :param str content_type: The response content type
+    :param str etag: The response ETag header
+    :param str last_modified: The response Last-Modified header
+    :param int ttl: The number of seconds the response is considered fresh
+    :rtype: CacheEntry
+
+    """
+    return CacheEntry(content, content_type, etag, last_modified,
+                      time.time() + ttl)
+
+
+class MemoryCache(object):
+    """Thread-safe in-memory LRU response cache"""
+
+    def __init__(self, ttl=60, max_entries=1024):
+        """Create a new memory cache
+
+        :param int ttl: The number of seconds a response is considered fresh
+        :param int max_entries: The maximum number of cached responses
+
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """Remove all cached responses"""
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, key):
+        """Return the cached response for the key, which may have expired
+
+        :param str key: The cache key
+        :rtype: CacheEntry or None
+
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = entry
+            return entry
+
+    def set(self, key, entry):
+        """Cache a response, evicting the least recently used responses if
+        the cache is full.
+
+        :param str key: The cache key
+        :param CacheEntry entry: The response to cache
+
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class DiskCache(object):
+    """On-disk LRU response cache, storing one file per response. Can be
+    shared between threads and processes. Only files with the cache's own
+    suffix are read or removed, so other files in the directory are left
+    alone.
+
+    """
+    SUFFIX = '.response'
+
+    def __init__(self, path, ttl=60, max_entries=4096):
+        """Create a new disk cache
+
+        :param str path: The directory to store cached responses in
+        :param int ttl: The number of seconds a response is considered fresh
+        :param int max_entries: The maximum number of cached responses
+
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = None
+        self._lock = threading.Lock()
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def clear(self):
+        """Remove all cached responses"""
+        with self._lock:
+            for name in self._names():
+                self._remove(name)
+            self._entries = 0
+
+    def get(self, key):
+        """Return the cached response for the key, which may have expired
+
+        :param str key: The cache key
+        :rtype: CacheEntry or None
+
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as handle:
+                meta = json.loads(handle.readline().decode('utf-8'))
+                content = handle.read()
+            os.utime(path, None)
+        except (IOError, OSError, ValueError):
+            return None
+        return CacheEntry(content, meta['content_type'], meta['etag'],
+                          meta['last_modified'], meta['expires'])
+
+    def set(self, key, entry):
+        """Cache a response, evicting the least recently used responses if
+        the cache is full. The number of entries is counted when the cache
+        is first written to and tracked after that, so the directory is only
+        listed again when responses need to be evicted.
+
+        :param str key: The cache key
+        :param CacheEntry entry: The response to cache
+
+        """
+        meta = json.dumps({'content_type': entry.content_type,
+                           'etag': entry.etag,
+                           'last_modified': entry.last_modified,
+                           'expires': entry.expires})
+        path = self._path(key)
+        new = not os.path.exists(path)
+        handle, temp_path = tempfile.mkstemp(dir=self.path, prefix='.')
+        with os.fdopen(handle, 'wb') as temp:
+            temp.write(meta.encode('utf-8') + b'\n')
+            temp.write(entry.content)
+        getattr(os, 'replace', os.rename)(temp_path, path)
+        with self._lock:
+            if self._entries is None:
+                self._entries = len(self._names())
+            elif new:
+                self._entries += 1
+            if self._entries > self.max_entries:
+                names = self._names()
+                names.sort(key=self._mtime)
+                for name in names[:len(names) - self.max_entries]:
+                    self._remove(name)
+                self._entries = min(len(names), self.max_entries)
+
+    def _mtime(self, name):
+        """Return the last time a cached response was used
+
+        :param str name: The cache file name
+        :rtype: float
+
+        """
+        try:
+            return os.path.getmtime(os.path.join(self.path, name))
+        except OSError:
+            return 0
+
+    def _names(self):
+        """Return the file names of the cached responses
+
+        :rtype: list
+
+        """
+        return [name for name in os.listdir(self.path)
+                if name.endswith(self.SUFFIX) and not name.startswith('.')]
+
+    def _path(self, key):
+        """Return the path of the file for a cache key
+
+        :param str key: The cache key
+        :rtype: str
+
+        """
+        return os.path.join(self.path, key + self.SUFFIX)
+
+    def _remove(self, name):
+        """Remove a cached response, ignoring files removed concurrently
+
+        :param str name: The cache file name
+
+        """
+        try:
+            os.unlink(os.path.join(self.path, name))
+        except OSError:
+            pass
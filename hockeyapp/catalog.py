@@ -0,0 +1,312 @@
+"""
+Indexed, in-memory catalog of the versions of an app. The versions returned
+by :meth:`hockeyapp.Application.versions` are stored as
+:class:`hockeyapp.records.Version` records and indexed by id, short version,
+build number and status in hashes, and by upload time and semantic version in
+sorted arrays. Lookups are constant time or a binary search instead of a scan
+of every version. Refreshing the catalog only updates the indexes for
+versions that were added, removed or changed.
+
+"""
+import bisect
+import logging
+import re
+
+from hockeyapp import records
+from hockeyapp import retention
+
+LOGGER = logging.getLogger(__name__)
+
+SEMVER = re.compile(r'^\s*v?(\d+(?:\.\d+)*)(?:-([0-9A-Za-z.-]+))?'
+                    r'(?:\+[0-9A-Za-z.-]+)?\s*$')
+
+
+def catalogs(applications, app_ids=None, workers=10):
+    """Build the version catalogs of many apps, fetching their versions
+    concurrently. Apps whose versions could not be fetched are left out.
+
+    :param hockeyapp.Applications applications: The API object whose
+        connection pool, cache and rate limiter are used
+    :param list app_ids: The app public identifiers, defaults to every app
+        for the API token
+    :param int workers: The number of apps to request concurrently
+    :return dict: The :class:`VersionCatalog` of each app, by app id
+
+    """
+    results = applications.bulk_versions(app_ids, workers)
+    values = {}
+    for app_id, result in results.items():
+        if result.error:
+            LOGGER.warning('Error fetching versions for %s: %s', app_id,
+                           result.error)
+            continue
+        values[app_id] = VersionCatalog(applications.application(app_id),
+                                        result.result)
+    return values
+
+
+def semver_key(value):
+    """Return the sort key for a version string following the semantic
+    versioning precedence rules. Pre-releases sort before their release, and
+    strings that are not versions sort before every version.
+
+    :param str value: The version string, such as ``1.2.0-beta.1``
+    :rtype: tuple
+
+    """
+    match = SEMVER.match(value or '')
+    if not match:
+        return (0, (), 0, (), value or '')
+    numbers = [int(part) for part in match.group(1).split('.')]
+    numbers.extend([0] * (3 - len(numbers)))
+    if not match.group(2):
+        return (1, tuple(numbers), 1, (), '')
+    identifiers = tuple((0, int(part), '') if part.isdigit() else
+                        (1, 0, part) for part in match.group(2).split('.'))
+    return (1, tuple(numbers), 0, identifiers, '')
+
+
+class VersionCatalog(object):
+    """The versions of an app with indexes for fast lookups"""
+
+    def __init__(self, application, versions=None):
+        """Create the catalog, fetching the versions of the app unless they
+        are passed in.
+
+        :param hockeyapp.Application application: The app
+        :param list versions: The versions returned by
+            :meth:`hockeyapp.Application.versions` (optional)
+
+        """
+        self.application = application
+        self._records = {}
+        self._shortversions = {}
+        self._builds = {}
+        self._statuses = {}
+        self._timestamps = []
+        self._semvers = []
+        self.update(application.versions() if versions is None
+                    else versions)
+
+    def __contains__(self, version_id):
+        return version_id in self._records
+
+    def __iter__(self):
+        """Iterate over the versions, newest upload first"""
+        return self.newest()
+
+    def __len__(self):
+        return len(self._records)
+
+    def between(self, start, end):
+        """Return the versions uploaded between two times, oldest first
+
+        :param int start: The earliest upload timestamp, inclusive
+        :param int end: The latest upload timestamp, inclusive
+        :rtype: list
+
+        """
+        low = bisect.bisect_left(self._timestamps, (start,))
+        high = bisect.bisect_right(self._timestamps, (end, float('inf')))
+        return [self._records[key[1]] for key in self._timestamps[low:high]]
+
+    def build(self, version):
+        """Return the versions with a build number, newest first
+
+        :param str version: The build number
+        :rtype: list
+
+        """
+        return self._newest_first(self._builds.get(str(version), ()))
+
+    def get(self, version_id):
+        """Return the version with an id
+
+        :param int version_id: The version id
+        :rtype: hockeyapp.records.Version or None
+
+        """
+        return self._records.get(version_id)
+
+    def latest(self, status=None):
+        """Return the newest version by semantic version, optionally only
+        versions with a status.
+
+        :param int status: The version status (optional)
+        :rtype: hockeyapp.records.Version or None
+
+        """
+        if status is None:
+            return next(self.ordered(reverse=True), None)
+        version_ids = self._statuses.get(status)
+        if not version_ids:
+            return None
+        return max((self._records[key] for key in version_ids),
+                   key=self._semver_key)
+
+    def newer_than(self, shortversion):
+        """Return the versions with a higher semantic version than a short
+        version, lowest first.
+
+        :param str shortversion: The short version, such as ``1.2.0``
+        :rtype: list
+
+        """
+        key = semver_key(shortversion)
+        low, high = 0, len(self._semvers)
+        while low < high:
+            middle = (low + high) // 2
+            if self._semvers[middle][0] <= key:
+                low = middle + 1
+            else:
+                high = middle
+        return [self._records[value[-1]] for value in self._semvers[low:]]
+
+    def newest(self):
+        """Iterate over the versions, newest upload first
+
+        :rtype: generator
+
+        """
+        for key in reversed(self._timestamps):
+            yield self._records[key[1]]
+
+    def ordered(self, reverse=False):
+        """Iterate over the versions in semantic version order, with builds
+        of the same short version in build number order.
+
+        :param bool reverse: Highest version first
+        :rtype: generator
+
+        """
+        keys = reversed(self._semvers) if reverse else self._semvers
+        for key in keys:
+            yield self._records[key[-1]]
+
+    def refresh(self):
+        """Fetch the versions of the app again and update the catalog
+
+        :return tuple: The number of versions added, removed and changed
+
+        """
+        return self.update(self.application.versions())
+
+    def shortversion(self, shortversion):
+        """Return the versions with a short version, newest first
+
+        :param str shortversion: The short version, such as ``1.2.0``
+        :rtype: list
+
+        """
+        return self._newest_first(self._shortversions.get(shortversion, ()))
+
+    def status(self, status):
+        """Return the versions with a status, newest first
+
+        :param int status: The version status
+        :rtype: list
+
+        """
+        return self._newest_first(self._statuses.get(status, ()))
+
+    def update(self, versions):
+        """Update the catalog to match a list of versions, only changing the
+        indexes of versions that were added, removed or changed.
+
+        :param list versions: The versions returned by
+            :meth:`hockeyapp.Application.versions`
+        :return tuple: The number of versions added, removed and changed
+
+        """
+        interned = {}
+        values = dict((value['id'], value if isinstance(value, records.Version)
+                       else records.Version(value, interned))
+                      for value in versions)
+        removed = [key for key in self._records if key not in values]
+        added, changed = [], []
+        for key, record in values.items():
+            current = self._records.get(key)
+            if current is None:
+                added.append(record)
+            elif current != record:
+                changed.append(record)
+        for key in removed:
+            self._remove(self._records[key])
+        for record in changed:
+            self._remove(self._records[record['id']])
+            self._add(record)
+        for record in added:
+            self._add(record)
+        LOGGER.debug('Catalog updated with %i added, %i removed and %i '
+                     'changed versions', len(added), len(removed),
+                     len(changed))
+        return len(added), len(removed), len(changed)
+
+    def _add(self, record):
+        """Add a record to the indexes
+
+        :param hockeyapp.records.Version record: The record
+
+        """
+        self._records[record['id']] = record
+        for index, key in self._hash_keys(record):
+            index.setdefault(key, set()).add(record['id'])
+        bisect.insort(self._timestamps, self._timestamp_key(record))
+        bisect.insort(self._semvers, self._semver_key(record))
+
+    def _hash_keys(self, record):
+        """Return the hash indexes of a record and its key in each
+
+        :param hockeyapp.records.Version record: The record
+        :rtype: list
+
+        """
+        return [(self._shortversions, record.get('shortversion')),
+                (self._builds, str(record.get('version'))),
+                (self._statuses, record.get('status'))]
+
+    def _newest_first(self, version_ids):
+        """Return the records for version ids, newest upload first
+
+        :param iterable version_ids: The version ids
+        :rtype: list
+
+        """
+        return sorted((self._records[key] for key in version_ids),
+                      key=self._timestamp_key, reverse=True)
+
+    def _remove(self, record):
+        """Remove a record from the indexes
+
+        :param hockeyapp.records.Version record: The record
+
+        """
+        del self._records[record['id']]
+        for index, key in self._hash_keys(record):
+            index[key].discard(record['id'])
+            if not index[key]:
+                del index[key]
+        for keys, key in ((self._timestamps, self._timestamp_key(record)),
+                          (self._semvers, self._semver_key(record))):
+            del keys[bisect.bisect_left(keys, key)]
+
+    @staticmethod
+    def _semver_key(record):
+        """Return the key of a record in the semantic version array
+
+        :param hockeyapp.records.Version record: The record
+        :rtype: tuple
+
+        """
+        return (semver_key(record.get('shortversion')),
+                retention.version_key(record), record['id'])
+
+    @staticmethod
+    def _timestamp_key(record):
+        """Return the key of a record in the upload time array
+
+        :param hockeyapp.records.Version record: The record
+        :rtype: tuple
+
+        """
+        return record.get('timestamp') or 0, record['id']
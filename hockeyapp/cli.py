@@ -11,8 +11,10 @@ from hockeyapp import api
 from hockeyapp import app
 from hockeyapp import crashes
 from hockeyapp import crashlog
+from hockeyapp import export
 from hockeyapp import team
 from hockeyapp import version
+from hockeyapp import watch
 
 
 def print_api_error(error):
@@ -24,6 +26,68 @@ def print_api_error(error):
     sys.stderr.write('\nERROR: %s\n' % error)
 
 
+def export_crashes(args):
+    """Export the crash logs for an app, writing the throughput to stderr as
+    the export progresses.
+
+    :param argparse.Namespace args: The command line arguments
+
+    """
+    def report(stats, end='\r'):
+        seconds = stats.seconds or 1
+        sys.stderr.write('%i crashes exported, %i skipped, %i errors, '
+                         '%.1f crashes/s, %.2f MB/s%s' %
+                         (stats.crashes, stats.skipped, stats.errors,
+                          stats.crashes / seconds,
+                          stats.bytes / seconds / 1048576, end))
+
+    def progress(stats):
+        if not (stats.crashes + stats.errors) % 100:
+            report(stats)
+
+    exporter = export.Exporter(app.Application(args.api_key, args.app_id),
+                               args.destination, args.format or ['log'],
+                               args.gzip, args.workers)
+    report(exporter.export(progress), '\n')
+
+
+def prune_versions(args):
+    """Delete the old versions of an app, printing each version that is
+    deleted, or that would be deleted for a dry run.
+
+    :param argparse.Namespace args: The command line arguments
+
+    """
+    application = app.Application(args.api_key, args.app_id)
+    results = application.delete_multiple_versions(
+        args.version_id, args.purge, args.sort, args.number, args.keep,
+        args.storage, args.dry_run, args.workers)
+    for version_id, result in results.items():
+        if result.error:
+            sys.stderr.write('%s\terror\t%s\n' % (version_id, result.error))
+        else:
+            print('%s\t%s\t%s\t%s' % (
+                version_id, result.result.get('version'),
+                result.result.get('shortversion'),
+                'planned' if args.dry_run else 'deleted'))
+
+
+def watch_crashes(args):
+    """Watch apps for crash spikes, writing each event to stdout as a line of
+    JSON until interrupted.
+
+    :param argparse.Namespace args: The command line arguments
+
+    """
+    watcher = watch.Watcher(app.Applications(args.api_key),
+                            args.app_ids or None, args.threshold, args.rate,
+                            args.min_crashes, workers=args.workers)
+    try:
+        watcher.run(interval=args.interval)
+    except KeyboardInterrupt:
+        pass
+
+
 def parse_args():
     """Parse commandline arguments.
 
@@ -80,8 +144,10 @@ def parse_args():
     d = subparsers.add_parser('detail',
                               help='Get the detail for a crash ID')
     d.set_defaults(func=lambda a:
-                   show(crashlog.CrashLog(a.api_key, a.app_id,
-                                          a.crash_id, a.mode)))
+                   crashlog.CrashLog(a.api_key, a.app_id, a.crash_id,
+                                     a.mode).download(
+                       a.output or getattr(sys.stdout, 'buffer', sys.stdout),
+                       a.gzip))
 
     lv = subparsers.add_parser('list-versions',
                                help='List the versions of an app')
@@ -94,6 +160,10 @@ def parse_args():
                     show(version.AppVersionDelete(a.api_key, a.app_id,
                                                   a.version_id, a.purge)))
 
+    vp = subparsers.add_parser('version-prune',
+                               help='Delete old versions of an app')
+    vp.set_defaults(func=prune_versions)
+
     va = subparsers.add_parser('version-add',
                                help='Add a new version of an app')
     types = dict(textile=0, markdown=1)
@@ -108,8 +178,16 @@ def parse_args():
                                                not a.notdownloadable,
                                                a.tags)))
 
+    ex = subparsers.add_parser('export',
+                               help='Export the crash logs of an app')
+    ex.set_defaults(func=export_crashes)
+
+    w = subparsers.add_parser('watch',
+                              help='Watch apps for crash spikes')
+    w.set_defaults(func=watch_crashes)
+
     # Arguments common for many actions
-    for p in (lu, lc, aau, d, lv, vd, va):
+    for p in (lu, lc, aau, d, lv, vd, vp, va, ex):
         p.add_argument('app_id',
                        help='The application identifier at HockeyApp')
 
@@ -126,6 +204,11 @@ def parse_args():
     d.add_argument('-m', '--mode',
                    default='text', choices=['log', 'text'],
                    help='Set the mode for retreiving the detail for a crash')
+    d.add_argument('-o', '--output',
+                   help='Write the detail to a file instead of stdout')
+    d.add_argument('-z', '--gzip',
+                   action='store_true',
+                   help='Gzip compress the detail')
 
     vd.add_argument('version_id',
                     help='The version ID')
@@ -133,9 +216,35 @@ def parse_args():
                     action='store_true',
                     help='Remove permanentely')
 
-    va.add_argument('ipa', type=argparse.FileType('r'),
+    vp.add_argument('-k', '--keep',
+                    default=0, type=int,
+                    help='The number of newest versions to keep')
+    vp.add_argument('-n', '--number',
+                    default=0, type=int,
+                    help='The maximum number of versions to delete')
+    vp.add_argument('-s', '--storage',
+                    type=int,
+                    help='Delete the oldest versions until the rest use at '
+                         'most this percentage of the storage')
+    vp.add_argument('--before', dest='version_id',
+                    help='Only delete versions older than this version ID')
+    vp.add_argument('--sort',
+                    default='version', choices=['version', 'date'],
+                    help='Order versions by build number or upload date')
+    vp.add_argument('-p', '--purge',
+                    action='store_true',
+                    help='Remove permanentely')
+    vp.add_argument('--dry-run',
+                    action='store_true', dest='dry_run',
+                    help='Print the versions to delete without deleting '
+                         'them')
+    vp.add_argument('-w', '--workers',
+                    default=4, type=int,
+                    help='The number of concurrent deletes')
+
+    va.add_argument('ipa', type=argparse.FileType('rb'),
                     help='The ipa or apk to upload')
-    va.add_argument('--dsym', type=argparse.FileType('r'),
+    va.add_argument('--dsym', type=argparse.FileType('rb'),
                     help='The .dSYMzip or mapping.txt file')
     va.add_argument('notes', type=argparse.FileType('r'),
                     help='A file containing the release notes')
@@ -151,6 +260,38 @@ def parse_args():
     va.add_argument('--tags',
                     help='Restrict download to a comma separated list of tags')
 
+    ex.add_argument('destination',
+                    help='The directory, .zip or .tar file to export to')
+    ex.add_argument('-f', '--format',
+                    action='append', choices=['log', 'text'],
+                    help='Export crash logs and/or descriptions')
+    ex.add_argument('-w', '--workers',
+                    default=8, type=int,
+                    help='The number of concurrent downloads')
+    ex.add_argument('-z', '--gzip',
+                    action='store_true',
+                    help='Gzip compress each exported file')
+
+    w.add_argument('app_ids', nargs='*',
+                   help='The application identifiers to watch, defaults to '
+                        'every app')
+    w.add_argument('-i', '--interval',
+                   default=60, type=float,
+                   help='The number of seconds between polls')
+    w.add_argument('-t', '--threshold',
+                   default=100, type=int,
+                   help='The new crashes in a group that raise an event')
+    w.add_argument('-r', '--rate',
+                   default=5.0, type=float,
+                   help='How many times its average crash rate a group has '
+                        'to reach to raise an event')
+    w.add_argument('-m', '--min-crashes',
+                   default=10, type=int, dest='min_crashes',
+                   help='The fewest new crashes that raise a rate event')
+    w.add_argument('-w', '--workers',
+                   default=10, type=int,
+                   help='The number of apps polled concurrently')
+
     # Print help message when there's no subcommand
     if len(sys.argv) == 1:
         parser.print_help()
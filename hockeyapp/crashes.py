@@ -19,4 +19,5 @@ class CrashList(object):
     def execute(self):
         warnings.warn('Deprecated for hockeyapp.Applications',
                       DeprecationWarning)
-        return self.app.crash_groups(offset=self._page_id).reasons
+        return [dict(reason) for reason in
+                self.app.crash_groups(offset=self._page_id).reasons]
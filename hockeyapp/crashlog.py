@@ -6,45 +6,47 @@ __author__ = 'Gavin M. Roy'
 __email__ = 'gmr@myyearbook.com'
 __since__ = '2011-09-13'
 
-from . import api
+import io
 
-class CrashLog(api.APIRequest):
+from hockeyapp import app
+from hockeyapp import multipart
+
+
+class CrashLog(object):
     """This API lets you query a single crash log or description."""
 
     def __init__(self, api_key, app_id, crash_id, format='log'):
         """Create the CrashLog request object.
 
-        :param api_key: HockeyApp API key
-        :type api_key: str
-        :param app_id: The HockeyApp Application Identifier
-        :type api_key: str
-        :param crash_id: The HocketApp Crash ID
-        :type crash_id: str
-        :param format: The response format (log/text)
-        :type format: str
+        :param str api_key: HockeyApp API key
+        :param str app_id: The HockeyApp Application Identifier
+        :param str crash_id: The HockeyApp Crash ID
+        :param str format: The response format (log/text)
 
         """
-        api.APIRequest.__init__(self, api_key)
-        self._key = 'crash'
-        self._app_id = app_id
+        self.app = app.Application(api_key, app_id)
         self._crash_id = crash_id
         self._format = format
 
-    @property
-    def parameters(self):
-        """Returns the request parameters
+    def download(self, sink, compress=False, chunk_size=multipart.CHUNK_SIZE):
+        """Stream the crash log or description to a file
 
-        :returns: dict
+        :param sink: The path of the file to write to, or a writable
+            file-like object
+        :param bool compress: Gzip compress the crash log as it is written
+        :param int chunk_size: The number of bytes to read at a time
+        :return int: The number of bytes downloaded
 
         """
-        return {'format': self._format}
+        return self.app.download_crash(self._crash_id, sink, self._format,
+                                       compress, chunk_size)
 
-    @property
-    def path(self):
-        """Returns the request path
+    def execute(self):
+        """Return the crash log or description
 
-        :returns: str
+        :rtype: str
 
         """
-        return api.BASE_URI + 'apps/%s/crashes/%s' % \
-                              (self._app_id, self._crash_id)
+        sink = io.BytesIO()
+        self.download(sink)
+        return sink.getvalue().decode('utf-8', 'replace')
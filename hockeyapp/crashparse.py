@@ -0,0 +1,311 @@
+"""
+Streaming parser for the Apple and Android crash logs returned by
+:meth:`hockeyapp.Application.crash_log`. Logs are read a line at a time, so a
+log never has to be held in memory. Each line is dispatched on its first
+character and matched with precompiled expressions. The parser keeps only the
+exception, the frames of the crashing thread and the binary images. Stack
+signatures normalize away addresses, offsets, line numbers and generated
+symbol names, so the same crash groups together across builds, versions and
+apps.
+
+"""
+import collections
+import hashlib
+import io
+import re
+
+APPLE = 'apple'
+ANDROID = 'android'
+
+Frame = collections.namedtuple('Frame', 'module,symbol,address,offset,'
+                                        'file,line')
+
+BinaryImage = collections.namedtuple('BinaryImage', 'start,end,name,arch,'
+                                                    'uuid,path')
+
+CrashReport = collections.namedtuple('CrashReport', 'platform,headers,'
+                                                    'exception_type,'
+                                                    'exception_reason,'
+                                                    'crashed_thread,frames,'
+                                                    'binary_images')
+
+# Apple crash log lines
+APPLE_FRAME = re.compile(r'^\d+\s+(.+?)\s+(0x[0-9a-fA-F]+)\s+(.*?)\s*$')
+APPLE_SYMBOL = re.compile(r'^(.*?) \+ (\d+)(?: \((.+?)(?::(\d+))?\))?$')
+APPLE_IMAGE = re.compile(r'^\s*(0x[0-9a-fA-F]+)\s*-\s*(0x[0-9a-fA-F]+)\s+'
+                         r'\+?(.+?)\s+(\S+)\s+<([0-9a-fA-F-]+)>\s+(.*?)\s*$')
+APPLE_THREAD = re.compile(r'^Thread (\d+)( Crashed)?:')
+APPLE_ADDRESSES = re.compile(r'0x[0-9a-fA-F]+')
+APPLE_REASON = re.compile(r"uncaught exception '(.+?)', reason: '(.*)'")
+
+# Android (Java) stack trace lines
+ANDROID_EXCEPTION = re.compile(r'^(?:Caused by: )?'
+                               r'([A-Za-z_$][\w$]*(?:\.[\w$]+)+)'
+                               r'(?::\s?(.*))?$')
+ANDROID_FRAME = re.compile(r'^\s+at ([\w$.<>/-]+)\.([\w$<>-]+)'
+                           r'\(([^:)]*)(?::(\d+))?\)')
+
+HEADER = re.compile(r'^([A-Z][\w /]*?):\s*(.*?)\s*$')
+
+# Symbol normalization applied in order when computing signatures
+NORMALIZE = [(re.compile(pattern), replacement) for pattern, replacement in (
+    (r'0x[0-9a-fA-F]+', ''),
+    (r'\$\$Lambda\$[\w$]*', '$$Lambda'),
+    (r'lambda\$(\w+?)\$\d+', r'lambda$\1'),
+    (r'\$\d+', '$'),
+    (r'closure #\d+', 'closure'),
+    (r'\[inlined\]|\(\d+\)', ''),
+    (r'\s+', ' '))]
+
+# Frames that are part of raising or handling a crash, not its cause
+IGNORED_SYMBOLS = frozenset([
+    '__exceptionPreprocess', 'objc_exception_throw', '__pthread_kill',
+    'pthread_kill', 'abort', '__abort', '__cxa_throw', 'std::terminate()',
+    '_objc_terminate()', '__cxxabiv1::__terminate(void (*)())',
+    'java.lang.Thread.run', 'com.android.internal.os.ZygoteInit.main',
+    'com.android.internal.os.RuntimeInit$MethodAndArgsCaller.run'])
+
+# Headers kept in the report, other headers are discarded
+APPLE_HEADERS = frozenset([
+    'Incident Identifier', 'Hardware Model', 'Process', 'Identifier',
+    'Version', 'Code Type', 'OS Version', 'Date/Time', 'Exception Type',
+    'Exception Codes', 'Exception Subtype', 'Crashed Thread',
+    'Application Specific Information'])
+ANDROID_HEADERS = frozenset([
+    'Package', 'Version Code', 'Version Name', 'Android', 'Android Build',
+    'Manufacturer', 'Model', 'Thread', 'CrashReporter Key', 'Start Date',
+    'Date'])
+
+
+def parse(lines):
+    """Parse a crash log from an iterable of lines, such as an open file
+
+    :param iterable lines: The lines of the crash log, as str or bytes
+    :rtype: CrashReport
+
+    """
+    return _Parser().parse(lines)
+
+
+def parse_file(path):
+    """Parse a crash log file
+
+    :param str path: The path to the crash log
+    :rtype: CrashReport
+
+    """
+    with io.open(path, encoding='utf-8', errors='replace') as handle:
+        return parse(handle)
+
+
+def parse_string(value):
+    """Parse a crash log held in memory
+
+    :param value: The crash log
+    :type value: str or bytes
+    :rtype: CrashReport
+
+    """
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', 'replace')
+    return parse(value.splitlines())
+
+
+def frame_key(frame):
+    """Return the normalized key for a frame, independent of the build it
+    came from.
+
+    :param Frame frame: The frame
+    :rtype: str
+
+    """
+    if not frame.symbol:
+        return frame.module or '?'
+    symbol = frame.symbol
+    for pattern, replacement in NORMALIZE:
+        symbol = pattern.sub(replacement, symbol)
+    return '%s!%s' % (frame.module or '', symbol.strip())
+
+
+def signature(report, depth=5, ignored=IGNORED_SYMBOLS):
+    """Return a stack signature for a crash, made from the exception type and
+    the normalized keys of the top frames of the crashing thread. Crashes
+    with the same cause have the same signature across builds and apps.
+
+    :param CrashReport report: The parsed crash log
+    :param int depth: The number of frames included in the signature
+    :param frozenset ignored: Symbols of frames that are skipped
+    :rtype: str
+
+    """
+    keys = [report.exception_type or '']
+    for frame in report.frames:
+        if len(keys) > depth:
+            break
+        if frame.symbol in ignored:
+            continue
+        keys.append(frame_key(frame))
+    return hashlib.sha1('\n'.join(keys).encode('utf-8')).hexdigest()
+
+
+class _Parser(object):
+    """Single pass, line dispatching crash log parser"""
+
+    def __init__(self):
+        self.platform = None
+        self.headers = {}
+        self.exception_type = None
+        self.exception_reason = None
+        self.crashed_thread = None
+        self.frames = []
+        self.exception_frames = None
+        self.binary_images = []
+        self._section = None
+        self._exceptions = 0
+
+    def parse(self, lines):
+        """Parse the lines of a crash log
+
+        :param iterable lines: The lines of the crash log
+        :rtype: CrashReport
+
+        """
+        for line in lines:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8', 'replace')
+            line = line.rstrip('\r\n')
+            if not line:
+                if self._section in ('thread', 'exception'):
+                    self._section = None
+                continue
+            if self._section == 'images':
+                self._image(line)
+            elif line[0].isdigit():
+                if self._section:
+                    self._apple_frame(line)
+            elif line[0] in ' \t':
+                self._android_frame(line)
+            else:
+                self._line(line)
+        if self.exception_frames:
+            self.frames = self.exception_frames
+        if self.platform == APPLE and self.exception_type is None:
+            self.exception_type = self.headers.get('Exception Type')
+        return CrashReport(self.platform, self.headers, self.exception_type,
+                           self.exception_reason, self.crashed_thread,
+                           self.frames, self.binary_images)
+
+    def _android_frame(self, line):
+        """Parse an indented Java stack frame of the first exception
+
+        :param str line: The line to parse
+
+        """
+        if self._exceptions != 1:
+            return
+        match = ANDROID_FRAME.match(line)
+        if match:
+            self.frames.append(Frame(
+                match.group(1), '%s.%s' % (match.group(1), match.group(2)),
+                None, None, match.group(3) or None,
+                int(match.group(4)) if match.group(4) else None))
+
+    def _apple_frame(self, line):
+        """Parse an Apple stack frame in the crashed thread or the last
+        exception backtrace
+
+        :param str line: The line to parse
+
+        """
+        match = APPLE_FRAME.match(line)
+        if not match:
+            return
+        module, address, rest = match.groups()
+        symbol = offset = path = number = None
+        symbol_match = APPLE_SYMBOL.match(rest)
+        if symbol_match:
+            symbol, offset, path, number = symbol_match.groups()
+            offset = int(offset)
+            number = int(number) if number else None
+            if symbol.startswith('0x'):
+                symbol = None
+        frame = Frame(module, symbol, int(address, 16), offset, path, number)
+        if self._section == 'exception':
+            self.exception_frames.append(frame)
+        else:
+            self.frames.append(frame)
+
+    def _image(self, line):
+        """Parse a line of the binary images section
+
+        :param str line: The line to parse
+
+        """
+        match = APPLE_IMAGE.match(line)
+        if match:
+            start, end, name, arch, uuid, path = match.groups()
+            self.binary_images.append(BinaryImage(
+                int(start, 16), int(end, 16), name, arch,
+                uuid.replace('-', '').lower(), path))
+
+    def _line(self, line):
+        """Parse a line that starts a section, a header or an exception
+
+        :param str line: The line to parse
+
+        """
+        if line.startswith('Thread '):
+            match = APPLE_THREAD.match(line)
+            if match:
+                crashed = match.group(2) is not None or \
+                    match.group(1) == self.crashed_thread
+                self._section = 'thread' if crashed and not self.frames \
+                    else None
+                if crashed:
+                    self.crashed_thread = match.group(1)
+                return
+        if line.startswith('Last Exception Backtrace:'):
+            self._section = 'exception'
+            self.exception_frames = []
+            return
+        if line.startswith('Binary Images:'):
+            self._section = 'images'
+            return
+        if line.startswith('(0x') and self._section == 'exception':
+            self.exception_frames.extend(
+                Frame(None, None, int(address, 16), None, None, None)
+                for address in APPLE_ADDRESSES.findall(line))
+            return
+        self._section = None
+        match = HEADER.match(line)
+        if match and (match.group(1) in APPLE_HEADERS or
+                      match.group(1) in ANDROID_HEADERS):
+            self._header(match.group(1), match.group(2))
+            return
+        if self.platform == APPLE:
+            match = APPLE_REASON.search(line)
+            if match and self.exception_reason is None:
+                self.exception_reason = '%s: %s' % match.groups()
+            return
+        match = ANDROID_EXCEPTION.match(line)
+        if match:
+            self.platform = ANDROID
+            self._exceptions += 1
+            if self._exceptions == 1:
+                self.exception_type = match.group(1)
+                self.exception_reason = match.group(2)
+
+    def _header(self, name, value):
+        """Record a header, detecting the platform of the crash log
+
+        :param str name: The header name
+        :param str value: The header value
+
+        """
+        self.headers[name] = value
+        if name in APPLE_HEADERS and name not in ANDROID_HEADERS:
+            self.platform = APPLE
+            if name == 'Crashed Thread':
+                self.crashed_thread = value.split()[0] if value else None
+        elif self.platform is None:
+            self.platform = ANDROID
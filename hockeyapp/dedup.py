@@ -0,0 +1,299 @@
+"""
+Content-hash deduplication of artifact and dSYM uploads. An UploadIndex
+records a key for the contents of every file uploaded for each app and build,
+so that re-uploading identical files can be skipped.
+
+The SHA-256 digest of an .ipa/.apk or mapping.txt is computed while it is
+streamed to the API. A .dSYM bundle is identified by the UUIDs of its Mach-O
+files, which only needs their headers. Keys are cached against a signature
+of the file's path, size and modification time, so unchanged files are never
+read again.
+
+Skipping a rebuilt file with identical contents means knowing its digest
+before it is sent, which can only be done by reading it first. That read is
+limited to files that could be duplicates: a file is only hashed before the
+upload if a file of the same size was uploaded for the app before. Any other
+file is new, and is hashed in the same pass that uploads it.
+
+"""
+import hashlib
+import logging
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+
+from hockeyapp import dsym
+from hockeyapp import symbolicate
+
+LOGGER = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS digests (
+    signature TEXT NOT NULL PRIMARY KEY,
+    sha256 TEXT NOT NULL);
+
+CREATE TABLE IF NOT EXISTS uploads (
+    app_id TEXT NOT NULL,
+    version TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    uploaded_at REAL NOT NULL,
+    size INTEGER,
+    PRIMARY KEY (app_id, version, kind, sha256));
+CREATE INDEX IF NOT EXISTS uploads_sha256 ON uploads (app_id, kind, sha256);
+"""
+
+# Added to the uploads table of indexes created before sizes were recorded
+SIZE_COLUMN = 'ALTER TABLE uploads ADD COLUMN size INTEGER'
+
+
+BLOCK_SIZE = 1048576
+
+
+def content_key(path):
+    """Return a key for the contents of a .dSYM bundle or mapping file that
+    does not change when an identical file is rebuilt. A .dSYM bundle is
+    identified by the UUIDs of the Mach-O files in it, which only the
+    headers are read for. Other files, and bundles without Mach-O files, are
+    identified by the SHA-256 digest of their contents.
+
+    :param str path: The path to the file or bundle
+    :rtype: str
+
+    """
+    if not os.path.isdir(path):
+        digest = hashlib.sha256()
+        _hash_file(path, digest)
+        return digest.hexdigest()
+    uuids = _bundle_uuids(path)
+    if uuids:
+        return 'uuid:%s' % ','.join(sorted(uuids))
+    digest = hashlib.sha256()
+    for file_path, name in dsym.bundle_files(path):
+        digest.update(('%s\0%d\0' % (name, os.path.getsize(file_path)))
+                      .encode('utf-8'))
+        _hash_file(file_path, digest)
+    return digest.hexdigest()
+
+
+def file_size(path):
+    """Return the size of a file, or the total size of the files in a
+    bundle directory.
+
+    :param str path: The path to the file or bundle
+    :rtype: int
+
+    """
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(file_path)
+               for file_path, _name in dsym.bundle_files(path))
+
+
+def signature(path):
+    """Return a signature for a file or bundle directory made from the path,
+    size and modification time of each file, without reading any of them.
+
+    :param str path: The path to the file or bundle
+    :rtype: str
+
+    """
+    path = os.path.abspath(path)
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        return '%s:%d:%d' % (path, stat.st_size, int(stat.st_mtime * 1e6))
+    digest = hashlib.sha1(path.encode('utf-8'))
+    for base, _dirs, names in sorted(os.walk(path)):
+        for name in sorted(names):
+            stat = os.stat(os.path.join(base, name))
+            digest.update(('%s:%d:%d\n' % (
+                os.path.relpath(os.path.join(base, name), path),
+                stat.st_size, int(stat.st_mtime * 1e6))).encode('utf-8'))
+    return '%s:%s' % (path, digest.hexdigest())
+
+
+def _bundle_uuids(path):
+    """Return the UUIDs of the Mach-O files in the DWARF directory of a
+    .dSYM bundle, or an empty list if any of the files is not a Mach-O file.
+
+    :param str path: The path to the bundle
+    :rtype: list
+
+    """
+    uuids = []
+    for file_path, _name in dsym.bundle_files(path):
+        if os.sep + 'DWARF' + os.sep not in file_path:
+            continue
+        try:
+            with open(file_path, 'rb') as handle:
+                data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                uuids.extend(symbolicate.read_uuids(data))
+            finally:
+                data.close()
+        except (EnvironmentError, ValueError, struct.error) as error:
+            LOGGER.debug('Not reading UUIDs from %s: %s', file_path, error)
+            return []
+    return uuids
+
+
+def _hash_file(path, digest):
+    """Update a digest with the contents of a file
+
+    :param str path: The path to the file
+    :param digest: The :mod:`hashlib` object to update
+
+    """
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(BLOCK_SIZE), b''):
+            digest.update(block)
+
+
+class HashingReader(object):
+    """Wraps an open file, updating a SHA-256 digest with the data as it is
+    read.
+
+    """
+    def __init__(self, handle):
+        """Wrap the file
+
+        :param file handle: The open file
+
+        """
+        self.digest = hashlib.sha256()
+        self._handle = handle
+
+    def close(self):
+        """Close the wrapped file"""
+        self._handle.close()
+
+    def fileno(self):
+        """Return the file descriptor of the wrapped file
+
+        :rtype: int
+
+        """
+        return self._handle.fileno()
+
+    def read(self, size=-1):
+        """Read from the file and update the digest
+
+        :param int size: The maximum number of bytes to read
+        :rtype: bytes
+
+        """
+        data = self._handle.read(size)
+        self.digest.update(data)
+        return data
+
+    def tell(self):
+        """Return the position in the wrapped file
+
+        :rtype: int
+
+        """
+        return self._handle.tell()
+
+
+class UploadIndex(object):
+    """SQLite index of the files uploaded for each app. The index may be
+    shared between threads.
+
+    """
+    def __init__(self, path=':memory:'):
+        """Open or create the index
+
+        :param str path: The path to the SQLite database file
+
+        """
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.executescript(SCHEMA)
+            columns = [row[1] for row in self._connection.execute(
+                'PRAGMA table_info(uploads)')]
+            if 'size' not in columns:
+                self._connection.execute(SIZE_COLUMN)
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._connection.close()
+
+    def digest(self, file_signature):
+        """Return the cached digest or content key for a file signature
+
+        :param str file_signature: The signature from :func:`signature`
+        :rtype: str or None
+
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT sha256 FROM digests WHERE signature = ?',
+                (file_signature,)).fetchone()
+        return row[0] if row else None
+
+    def record(self, app_id, version, kind, sha256, file_signature=None,
+               size=None):
+        """Record an upload, caching the digest for the file signature
+
+        :param str app_id: The app public identifier
+        :param str version: The digest of the build the file belongs to, or
+            an empty string
+        :param str kind: The upload field, ``ipa`` or ``dsym``
+        :param str sha256: The file digest, or the :func:`content_key` of a
+            dSYM
+        :param str file_signature: The signature from :func:`signature`
+        :param int size: The size from :func:`file_size`
+
+        """
+        with self._lock:
+            with self._connection:
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO uploads (app_id, version, kind, '
+                    'sha256, uploaded_at, size) VALUES (?, ?, ?, ?, ?, ?)',
+                    (app_id, version, kind, sha256, time.time(), size))
+                if file_signature:
+                    self._connection.execute(
+                        'INSERT OR REPLACE INTO digests VALUES (?, ?)',
+                        (file_signature, sha256))
+
+    def size_uploaded(self, app_id, kind, size):
+        """Return True if a file of the same size has been uploaded for the
+        app, so a file may be a duplicate and is worth hashing before it is
+        uploaded.
+
+        :param str app_id: The app public identifier
+        :param str kind: The upload field, ``ipa`` or ``dsym``
+        :param int size: The size from :func:`file_size`
+        :rtype: bool
+
+        """
+        with self._lock:
+            return self._connection.execute(
+                'SELECT 1 FROM uploads WHERE app_id = ? AND kind = ? '
+                'AND size = ?', (app_id, kind, size)).fetchone() is not None
+
+    def uploaded(self, app_id, kind, sha256, version=None):
+        """Return True if a file has already been uploaded for the app,
+        for a specific build if version is specified.
+
+        :param str app_id: The app public identifier
+        :param str kind: The upload field, ``ipa`` or ``dsym``
+        :param str sha256: The file digest, or the :func:`content_key` of a
+            dSYM
+        :param str version: The digest of the build (optional)
+        :rtype: bool
+
+        """
+        query = ('SELECT 1 FROM uploads '
+                 'WHERE app_id = ? AND kind = ? AND sha256 = ?')
+        args = [app_id, kind, sha256]
+        if version is not None:
+            query += ' AND version = ?'
+            args.append(version)
+        with self._lock:
+            return self._connection.execute(query, args).fetchone() is not None
@@ -0,0 +1,432 @@
+"""
+Helpers for packaging .dSYM bundles for upload. The bundle is compressed on
+a background thread and streamed to the reader as it is produced, so the
+upload can start while the bundle is still being walked and compressed and
+no temporary file is written.
+
+"""
+import collections
+from concurrent import futures
+import itertools
+import logging
+import multiprocessing
+import os
+import struct
+import threading
+import time
+import zipfile
+import zlib
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+LOGGER = logging.getLogger(__name__)
+
+BLOCK_SIZE = 1048576
+CHUNK_SIZE = 65536
+DEFAULT_COMPRESS_LEVEL = 6
+QUEUE_SIZE = 16
+
+_MAX_16 = 0xFFFF
+_MAX_32 = 0xFFFFFFFF
+
+
+def bundle_files(path):
+    """Return the files in a bundle as a list of file path and archive name
+    tuples, with archive names relative to the bundle's parent directory.
+
+    :param str path: The path to the bundle
+    :rtype: list
+
+    """
+    root_length = len(os.path.split(path)[0]) + 1
+    files = []
+    for base, _dirs, names in os.walk(path):
+        for name in sorted(names):
+            file_path = os.path.join(base, name)
+            files.append((file_path, file_path[root_length:]))
+    return files
+
+
+def pack(path, destination, compress_level=DEFAULT_COMPRESS_LEVEL,
+         workers=None, block_size=BLOCK_SIZE):
+    """Write a zip archive of a bundle to a file, deflating the files in the
+    bundle on multiple cores.
+
+    :param str path: The path to the bundle
+    :param str destination: The path of the zip file to write
+    :param int compress_level: The deflate level from 1 to 9, or 0 to store
+        files without compressing them
+    :param int workers: The number of threads compressing, defaults to the
+        number of CPUs
+    :param int block_size: The size of the blocks compressed in parallel
+    :return: The size of the archive
+    :rtype: int
+
+    """
+    size = 0
+    with open(destination, 'wb') as handle:
+        for chunk in zip_chunks(path, compress_level, workers, block_size):
+            handle.write(chunk)
+            size += len(chunk)
+    return size
+
+
+def zip_chunks(path, compress_level=DEFAULT_COMPRESS_LEVEL, workers=None,
+               block_size=BLOCK_SIZE, digest=None):
+    """Yield a zip archive of a bundle in chunks. Each file is split into
+    blocks that are deflated independently on a pool of threads and joined
+    into a single deflate stream, so even a bundle holding one large DWARF
+    file is compressed on every core. At most ``2 * workers`` blocks are
+    held in memory at a time.
+
+    :param str path: The path to the bundle
+    :param int compress_level: The deflate level from 1 to 9, or 0 to store
+        files without compressing them
+    :param int workers: The number of threads compressing, defaults to the
+        number of CPUs
+    :param int block_size: The size of the blocks compressed in parallel
+    :param digest: A :mod:`hashlib` object updated with the name, size and
+        contents of each file as it is read (optional)
+    :rtype: generator
+
+    """
+    if not 0 <= compress_level <= 9:
+        raise ValueError('compress_level must be between 0 and 9')
+    workers = workers or multiprocessing.cpu_count()
+    executor = futures.ThreadPoolExecutor(workers)
+    window = collections.deque()
+    entries = []
+    offset = 0
+
+    def submit(job):
+        if job[0] == 'block' and compress_level:
+            return job + (executor.submit(_deflate, job[1], compress_level,
+                                          job[2]),)
+        return job
+
+    try:
+        jobs = _jobs(bundle_files(path), block_size, digest)
+        window.extend(submit(job) for job in
+                      itertools.islice(jobs, 2 * workers))
+        entry = None
+        while window:
+            job = window.popleft()
+            for next_job in itertools.islice(jobs, 1):
+                window.append(submit(next_job))
+            if job[0] == 'file':
+                entry = _Entry(job[1], job[2], offset, compress_level)
+                chunk = entry.local_header()
+            else:
+                chunk = job[3].result() if compress_level else job[1]
+                entry.add(job[1], chunk)
+                if job[2]:
+                    chunk += entry.data_descriptor()
+                    entries.append(entry)
+            offset += len(chunk)
+            yield chunk
+    finally:
+        for job in window:
+            if len(job) > 3:
+                job[3].cancel()
+        executor.shutdown(wait=False)
+    yield _central_directory(entries, offset)
+
+
+class ZipStream(object):
+    """Read-only file-like object producing a zip archive of a directory.
+    The archive is written by a background thread into a bounded queue of
+    chunks, so at most ``queue_size`` chunks are held in memory.
+
+    """
+    def __init__(self, path, compress_level=DEFAULT_COMPRESS_LEVEL,
+                 chunk_size=CHUNK_SIZE, queue_size=QUEUE_SIZE, workers=1,
+                 digest=None):
+        """Start compressing the directory
+
+        :param str path: The directory to compress
+        :param int compress_level: The deflate level from 1 to 9, or 0 to
+            store files without compressing them
+        :param int chunk_size: The size of the chunks produced
+        :param int queue_size: The maximum number of chunks buffered
+        :param int workers: The number of threads compressing, or None for
+            the number of CPUs
+        :param digest: A :mod:`hashlib` object updated with the name, size
+            and contents of each file as it is compressed (optional)
+
+        """
+        if not 0 <= compress_level <= 9:
+            raise ValueError('compress_level must be between 0 and 9')
+        self.path = path
+        self.compress_level = compress_level
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.digest = digest
+        self._buffer = b''
+        self._done = False
+        self._queue = queue.Queue(queue_size)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._produce)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        """Stop compressing and discard any buffered data"""
+        self._stopped.set()
+        self._done = True
+        while self._thread.is_alive():
+            try:
+                self._queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self._buffer = b''
+
+    def read(self, size=-1):
+        """Read up to size bytes of the archive, blocking until they have
+        been produced. Reads the whole archive if size is not specified.
+
+        :param int size: The maximum number of bytes to read
+        :rtype: bytes
+        :raises: IOError
+
+        """
+        while not self._done and (size is None or size < 0 or
+                                  len(self._buffer) < size):
+            item = self._queue.get()
+            if item is None:
+                self._done = True
+            elif isinstance(item, Exception):
+                self._done = True
+                raise item
+            else:
+                self._buffer += item
+        if size is None or size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+    def _put(self, item):
+        """Add an item to the queue, giving up if the stream is closed
+
+        :param item: The chunk, exception or end of stream marker
+        :rtype: bool
+
+        """
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _put_chunk(self, chunk):
+        """Add a chunk of the archive to the queue
+
+        :param bytes chunk: The chunk
+        :raises: IOError
+
+        """
+        if not self._put(chunk):
+            raise IOError('Stream closed')
+
+    def _produce(self):
+        """Write the archive into the queue"""
+        writer = _QueueWriter(self._put_chunk, self.chunk_size)
+        try:
+            for chunk in zip_chunks(self.path, self.compress_level,
+                                    self.workers, digest=self.digest):
+                writer.write(chunk)
+            writer.flush()
+        except Exception as error:
+            if self._stopped.is_set():
+                return
+            LOGGER.debug('Error compressing %s: %s', self.path, error)
+            self._put(IOError('Error compressing %s: %s' % (self.path, error)))
+        self._put(None)
+
+
+class _Entry(object):
+    """A file in a zip archive being written, written with a data descriptor
+    so the archive can be streamed.
+
+    """
+    def __init__(self, file_path, name, offset, compress_level):
+        stat = os.stat(file_path)
+        self.name = name.replace(os.sep, '/').encode('utf-8')
+        self.offset = offset
+        self.method = zipfile.ZIP_DEFLATED if compress_level else \
+            zipfile.ZIP_STORED
+        self.mode = stat.st_mode
+        self.time, self.date = _dos_date_time(stat.st_mtime)
+        self.zip64 = stat.st_size * 1.05 > zipfile.ZIP64_LIMIT
+        self.crc = 0
+        self.file_size = 0
+        self.compress_size = 0
+
+    def add(self, data, compressed):
+        """Account for a block of the file being written
+
+        :param bytes data: The uncompressed block
+        :param bytes compressed: The block as written to the archive
+
+        """
+        self.crc = zlib.crc32(data, self.crc) & _MAX_32
+        self.file_size += len(data)
+        self.compress_size += len(compressed)
+
+    def central_header(self):
+        """Return the central directory header for the file
+
+        :rtype: bytes
+
+        """
+        extra = []
+        file_size, compress_size, offset = (self.file_size,
+                                            self.compress_size, self.offset)
+        if self.zip64:
+            extra += [file_size, compress_size]
+            file_size = compress_size = _MAX_32
+        if offset > zipfile.ZIP64_LIMIT:
+            extra.append(offset)
+            offset = _MAX_32
+        extra = struct.pack('<HH%dQ' % len(extra), 1, 8 * len(extra),
+                            *extra) if extra else b''
+        version = 45 if extra else 20
+        return struct.pack('<IHHHHHHIIIHHHHHII', 0x02014b50,
+                           (3 << 8) | version, version, 0x08, self.method,
+                           self.time, self.date, self.crc, compress_size,
+                           file_size, len(self.name), len(extra), 0, 0, 0,
+                           (self.mode & _MAX_16) << 16,
+                           offset) + self.name + extra
+
+    def data_descriptor(self):
+        """Return the data descriptor written after the file data
+
+        :rtype: bytes
+
+        """
+        if self.zip64:
+            return struct.pack('<IIQQ', 0x08074b50, self.crc,
+                               self.compress_size, self.file_size)
+        return struct.pack('<IIII', 0x08074b50, self.crc,
+                           self.compress_size, self.file_size)
+
+    def local_header(self):
+        """Return the local file header written before the file data
+
+        :rtype: bytes
+
+        """
+        size, extra, version = 0, b'', 20
+        if self.zip64:
+            size, extra, version = _MAX_32, struct.pack('<HHQQ', 1, 16, 0,
+                                                        0), 45
+        return struct.pack('<IHHHHHIIIHH', 0x04034b50, version, 0x08,
+                           self.method, self.time, self.date, 0, size, size,
+                           len(self.name), len(extra)) + self.name + extra
+
+
+class _QueueWriter(object):
+    """Unseekable write-only file that hands fixed-size chunks to a callback"""
+
+    def __init__(self, callback, chunk_size):
+        self._callback = callback
+        self._chunk_size = chunk_size
+        self._chunks = []
+        self._size = 0
+
+    def flush(self):
+        if self._chunks:
+            self._callback(b''.join(self._chunks))
+            self._chunks = []
+            self._size = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._size += len(data)
+        if self._size >= self._chunk_size:
+            self.flush()
+        return len(data)
+
+
+def _central_directory(entries, offset):
+    """Return the central directory and end of central directory records
+    for the entries of an archive
+
+    :param list entries: The archive entries
+    :param int offset: The offset of the central directory
+    :rtype: bytes
+
+    """
+    directory = b''.join(entry.central_header() for entry in entries)
+    count, size = len(entries), len(directory)
+    if (count >= _MAX_16 or offset > zipfile.ZIP64_LIMIT or
+            size > zipfile.ZIP64_LIMIT):
+        directory += struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, 45, 45, 0, 0,
+                                 count, count, size, offset)
+        directory += struct.pack('<IIQI', 0x07064b50, 0, offset + size, 1)
+        count, size, offset = (min(count, _MAX_16), min(size, _MAX_32),
+                               min(offset, _MAX_32))
+    return directory + struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, count,
+                                   count, size, offset, 0)
+
+
+def _deflate(data, compress_level, final):
+    """Return a block of data as raw deflate data that can be concatenated
+    with the blocks that follow it.
+
+    :param bytes data: The block to compress
+    :param int compress_level: The deflate level
+    :param bool final: The block is the last block of the file
+    :rtype: bytes
+
+    """
+    compressor = zlib.compressobj(compress_level, zlib.DEFLATED,
+                                  -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(
+        zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def _dos_date_time(timestamp):
+    """Return the MS-DOS time and date values for a timestamp
+
+    :param float timestamp: The UNIX timestamp
+    :rtype: tuple(int, int)
+
+    """
+    value = time.localtime(timestamp)
+    if value.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    return ((value.tm_hour << 11) | (value.tm_min << 5) | (value.tm_sec // 2),
+            ((value.tm_year - 1980) << 9) | (value.tm_mon << 5) |
+            value.tm_mday)
+
+
+def _jobs(files, block_size, digest=None):
+    """Yield a ``file`` job for each file followed by a ``block`` job for
+    each block of the file, flagging the last block of each file.
+
+    :param list files: The file path and archive name of each file
+    :param int block_size: The size of the blocks
+    :param digest: A :mod:`hashlib` object to update with each file
+    :rtype: generator
+
+    """
+    for file_path, name in files:
+        yield ('file', file_path, name)
+        with open(file_path, 'rb') as handle:
+            if digest:
+                digest.update(name.encode('utf-8') + b'\0' + struct.pack(
+                    '<Q', os.fstat(handle.fileno()).st_size))
+            block = handle.read(block_size)
+            while True:
+                next_block = handle.read(block_size)
+                if digest:
+                    digest.update(block)
+                yield ('block', block, not next_block)
+                if not next_block:
+                    break
+                block = next_block
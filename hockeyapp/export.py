@@ -0,0 +1,392 @@
+"""
+Bulk export of the crash logs and descriptions for an app. Every crash in
+every crash reason group is downloaded concurrently into a directory tree
+sharded by crash id, or into a .zip or .tar archive. Crashes that were
+already exported are skipped, so an interrupted export can be run again to
+pick up where it stopped.
+
+"""
+import collections
+from concurrent import futures
+import hashlib
+import logging
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+
+import requests
+
+from hockeyapp import api
+from hockeyapp import multipart
+
+LOGGER = logging.getLogger(__name__)
+
+EXTENSIONS = {'log': '.log', 'text': '.txt'}
+ERRORS = (api.APIError, requests.exceptions.RequestException)
+SPOOL_SIZE = 1048576
+
+# ZipFile.open can write a member from a stream on Python 3.6 and later
+ZIP_STREAMING = sys.version_info >= (3, 6)
+
+ExportStats = collections.namedtuple('ExportStats', 'crashes,skipped,errors,'
+                                                    'bytes,seconds')
+
+
+def crash_path(crash_id, format='log', compress=False):
+    """Return the relative path a crash log or description is exported to,
+    sharded into two levels of directories by the hash of the crash id.
+
+    :param str crash_id: The crash id
+    :param str format: ``log`` or ``text``
+    :param bool compress: The file is gzip compressed
+    :rtype: str
+
+    """
+    digest = hashlib.sha1(str(crash_id).encode('utf-8')).hexdigest()
+    return '/'.join([digest[0:2], digest[2:4], '%s%s%s' % (
+        crash_id, EXTENSIONS[format], '.gz' if compress else '')])
+
+
+class Exporter(object):
+    """Export the crash logs and descriptions of an application"""
+
+    def __init__(self, application, destination, formats=('log',),
+                 compress=False, workers=8, chunk_size=multipart.CHUNK_SIZE):
+        """Create a new exporter
+
+        :param hockeyapp.app.Application application: The app to export
+        :param str destination: The directory to export to, or the path of
+            a .zip or .tar archive
+        :param tuple formats: The formats to download for each crash, ``log``
+            for the crash log and ``text`` for the description
+        :param bool compress: Gzip compress each file
+        :param int workers: The maximum number of concurrent downloads
+        :param int chunk_size: The number of bytes to read at a time
+
+        """
+        for value in formats:
+            if value not in EXTENSIONS:
+                raise ValueError('Invalid format: %s' % value)
+        self.application = application
+        self.destination = destination
+        self.formats = formats
+        self.compress = compress
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+    def export(self, progress=None):
+        """Export every crash that has not already been exported
+
+        :param callable progress: Called with the :class:`ExportStats` so far
+            each time a crash has been exported (optional)
+        :rtype: ExportStats
+
+        """
+        start = time.time()
+        counts = {'crashes': 0, 'skipped': 0, 'errors': 0, 'bytes': 0}
+
+        def stats():
+            return ExportStats(counts['crashes'], counts['skipped'],
+                               counts['errors'], counts['bytes'],
+                               time.time() - start)
+
+        writer = _writer(self.destination, self.compress)
+        executor = futures.ThreadPoolExecutor(self.workers)
+        pending = set()
+        try:
+            for crash_id in self._crash_ids(counts):
+                names = [(value, crash_path(crash_id, value, self.compress))
+                         for value in self.formats]
+                names = [(value, name) for value, name in names
+                         if not writer.exists(name)]
+                if not names:
+                    counts['skipped'] += 1
+                    continue
+                if len(pending) >= self.workers:
+                    done, pending = futures.wait(
+                        pending, return_when=futures.FIRST_COMPLETED)
+                    self._count(done, counts, stats, progress)
+                pending.add(executor.submit(self._download, writer, crash_id,
+                                            names))
+            self._count(futures.wait(pending)[0], counts, stats, progress)
+            pending = set()
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown()
+            writer.close()
+        result = stats()
+        LOGGER.info('Exported %i crashes (%i bytes) in %.1fs, %i skipped, '
+                    '%i errors', result.crashes, result.bytes, result.seconds,
+                    result.skipped, result.errors)
+        return result
+
+    def _count(self, done, counts, stats, progress):
+        """Add the results of completed downloads to the counts
+
+        :param set done: The completed download futures
+        :param dict counts: The export counts
+        :param callable stats: Returns the current ExportStats
+        :param callable progress: The progress callback
+
+        """
+        for future in done:
+            size = future.result()
+            if size is None:
+                counts['errors'] += 1
+            else:
+                counts['crashes'] += 1
+                counts['bytes'] += size
+            if progress:
+                progress(stats())
+
+    def _crash_ids(self, counts):
+        """Yield the id of every crash for the app. An error listing the
+        crash groups or the crashes of a group is logged and counted, and
+        the crashes listed so far are still exported.
+
+        :param dict counts: The export counts
+        :rtype: generator
+
+        """
+        try:
+            for reason in self.application.iter_crash_groups():
+                try:
+                    for crash in self.application.iter_crashes(reason['id']):
+                        yield crash['id']
+                except ERRORS as error:
+                    LOGGER.warning('Error listing the crashes of crash group '
+                                   '%s: %s', reason['id'], error)
+                    counts['errors'] += 1
+        except ERRORS as error:
+            LOGGER.warning('Error listing the crash groups of %s: %s',
+                           self.application.app_id, error)
+            counts['errors'] += 1
+
+    def _download(self, writer, crash_id, names):
+        """Download the files for a crash, returning the number of bytes
+        downloaded or None if a download failed. Errors are logged and
+        counted for the crash without stopping the export.
+
+        :param writer: The export writer
+        :param str crash_id: The crash id
+        :param list names: The formats and paths to download
+        :rtype: int or None
+
+        """
+        size = 0
+        for value, name in names:
+            try:
+                size += writer.write(name, lambda sink: (
+                    self.application.download_crash(
+                        crash_id, sink, value, self.compress,
+                        self.chunk_size)))
+            except ERRORS as error:
+                LOGGER.warning('Error exporting crash %s: %s', crash_id,
+                               error)
+                return None
+            except Exception:
+                LOGGER.exception('Unexpected error exporting crash %s',
+                                 crash_id)
+                return None
+        return size
+
+
+def _writer(destination, compress):
+    """Return the writer for an export destination
+
+    :param str destination: The directory or archive path
+    :param bool compress: The exported files are already gzip compressed
+    :rtype: _DirectoryWriter or _ZipWriter or _TarWriter
+
+    """
+    if destination.endswith('.zip'):
+        return _ZipWriter(destination, not compress)
+    if destination.endswith('.tar'):
+        return _TarWriter(destination)
+    return _DirectoryWriter(destination)
+
+
+class _DirectoryWriter(object):
+    """Writes exported files into a directory tree. Files are downloaded to
+    a temporary file and renamed when complete, so partial downloads are
+    never mistaken for exported crashes.
+
+    """
+    def __init__(self, path):
+        """Create the writer
+
+        :param str path: The export directory
+
+        """
+        self.path = path
+
+    def close(self):
+        """Nothing to close for a directory"""
+        pass
+
+    def exists(self, name):
+        """Return True if a file has already been exported
+
+        :param str name: The relative path of the file
+        :rtype: bool
+
+        """
+        return os.path.exists(os.path.join(self.path, name))
+
+    def write(self, name, download):
+        """Export a file
+
+        :param str name: The relative path of the file
+        :param callable download: Downloads the file to the sink passed to it
+            and returns the number of bytes downloaded
+        :rtype: int
+
+        """
+        path = os.path.join(self.path, name)
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+        handle, temp_path = tempfile.mkstemp(dir=directory, prefix='.')
+        try:
+            with os.fdopen(handle, 'wb') as sink:
+                size = download(sink)
+            getattr(os, 'replace', os.rename)(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return size
+
+
+class _ArchiveWriter(object):
+    """Base class for archive writers. Files are downloaded to a spooled
+    temporary file and added to the archive one at a time.
+
+    """
+    def __init__(self, path):
+        """Create the writer
+
+        :param str path: The archive path
+
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._names = set()
+
+    def exists(self, name):
+        """Return True if a file has already been exported
+
+        :param str name: The relative path of the file
+        :rtype: bool
+
+        """
+        return name in self._names
+
+    def write(self, name, download):
+        """Export a file
+
+        :param str name: The relative path of the file
+        :param callable download: Downloads the file to the sink passed to it
+            and returns the number of bytes downloaded
+        :rtype: int
+
+        """
+        with tempfile.SpooledTemporaryFile(SPOOL_SIZE) as sink:
+            size = download(sink)
+            length = sink.tell()
+            sink.seek(0)
+            with self._lock:
+                self._add(name, sink, length)
+                self._names.add(name)
+        return size
+
+
+class _ZipWriter(_ArchiveWriter):
+    """Writes exported files into a zip archive, appending to an existing
+    archive.
+
+    """
+    def __init__(self, path, compress=True):
+        """Open the archive
+
+        :param str path: The archive path
+        :param bool compress: Deflate the files added to the archive
+
+        """
+        super(_ZipWriter, self).__init__(path)
+        self._archive = zipfile.ZipFile(
+            path, 'a' if os.path.exists(path) else 'w',
+            zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED,
+            allowZip64=True)
+        self._names.update(self._archive.namelist())
+
+    def close(self):
+        """Close the archive"""
+        self._archive.close()
+
+    def _add(self, name, handle, size):
+        """Add a file to the archive, copying it in chunks rather than
+        reading it into memory. Before Python 3.6 the file is copied to a
+        temporary file that is added with :meth:`zipfile.ZipFile.write`.
+
+        :param str name: The relative path of the file
+        :param file handle: The downloaded file
+        :param int size: The size of the downloaded file
+
+        """
+        if ZIP_STREAMING:
+            info = zipfile.ZipInfo(name, time.localtime()[:6])
+            info.compress_type = self._archive.compression
+            info.file_size = size
+            with self._archive.open(info, 'w') as output:
+                shutil.copyfileobj(handle, output)
+            return
+        temp, temp_path = tempfile.mkstemp()
+        try:
+            with os.fdopen(temp, 'wb') as output:
+                shutil.copyfileobj(handle, output)
+            self._archive.write(temp_path, name)
+        finally:
+            os.unlink(temp_path)
+
+
+class _TarWriter(_ArchiveWriter):
+    """Writes exported files into an uncompressed tar archive, appending to
+    an existing archive.
+
+    """
+    def __init__(self, path):
+        """Open the archive
+
+        :param str path: The archive path
+
+        """
+        super(_TarWriter, self).__init__(path)
+        self._archive = tarfile.open(path,
+                                     'a' if os.path.exists(path) else 'w')
+        self._names.update(self._archive.getnames())
+
+    def close(self):
+        """Close the archive"""
+        self._archive.close()
+
+    def _add(self, name, handle, size):
+        """Add a file to the archive
+
+        :param str name: The relative path of the file
+        :param file handle: The downloaded file
+        :param int size: The size of the downloaded file
+
+        """
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = time.time()
+        self._archive.addfile(info, handle)
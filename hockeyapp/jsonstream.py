@@ -0,0 +1,254 @@
+"""
+Incremental parsing of the JSON arrays in large API responses, such as the
+``apps``, ``app_versions`` and ``crash_reasons`` lists. The response body is
+read a chunk at a time and scanned only for the boundaries of the items in
+the array. Each item is decoded as soon as its last byte arrives, with the
+JSON decoder of the request. Only the item being read is buffered, so memory
+stays bounded however long the list is, and the first item is available as
+soon as it has been received.
+
+"""
+import json
+import re
+
+CHUNK_SIZE = 16384
+
+STRUCTURE = re.compile(b'[{}\\[\\]"]')
+SCALAR_END = re.compile(b'[,\\]}\\s]')
+WHITESPACE = re.compile(b'[ \\t\\r\\n]*')
+
+BACKSLASH = ord('\\')
+
+
+def items(chunks, key=None, decode=None):
+    """Yield the items of a JSON array as they are parsed from a sequence of
+    chunks of a JSON document. The array is either the document itself, or
+    the value of a key of the top level object. If the object does not have
+    the key, nothing is yielded.
+
+    :param iterable chunks: The chunks of the document, as bytes
+    :param str key: The key of the array in the top level object, or None if
+        the document is the array
+    :param callable decode: Decodes an item from bytes, the standard library
+        decoder by default
+    :rtype: generator
+    :raises: ValueError
+
+    """
+    decode = decode or _decode
+    reader = _Reader(chunks)
+    if key is not None and not _find_key(reader, key):
+        return
+    reader.expect(b'[')
+    if reader.peek() == b']':
+        return
+    while True:
+        reader.skip_value()
+        yield decode(reader.value())
+        separator = reader.read()
+        if separator == b']':
+            return
+        if separator != b',':
+            raise ValueError('Expected "," or "]" at offset %i' %
+                             (reader.offset - 1))
+
+
+def _decode(content):
+    """Decode a UTF-8 JSON value with the standard library
+
+    :param bytes content: The JSON value
+    :rtype: list or dict or str or int or float or bool or None
+
+    """
+    return json.loads(content.decode('utf-8'))
+
+
+def _find_key(reader, key):
+    """Advance the reader to the value of a key of the top level object
+
+    :param _Reader reader: The reader at the start of the document
+    :param str key: The key to find
+    :return bool: The key was found
+
+    """
+    reader.expect(b'{')
+    if reader.peek() == b'}':
+        return False
+    while True:
+        reader.skip_value()
+        name = _decode(reader.value())
+        reader.expect(b':')
+        if name == key:
+            return True
+        reader.skip_value()
+        separator = reader.read()
+        if separator == b'}':
+            return False
+        if separator != b',':
+            raise ValueError('Expected "," or "}" at offset %i' %
+                             (reader.offset - 1))
+
+
+class _Reader(object):
+    """Buffers the chunks of a JSON document, discarding the bytes before
+    the value being read whenever another chunk is needed.
+
+    """
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = bytearray()
+        self._discarded = 0
+        self._mark = 0
+        self._position = 0
+
+    @property
+    def offset(self):
+        """Return the offset of the current position in the document
+
+        :rtype: int
+
+        """
+        return self._discarded + self._position
+
+    def expect(self, token):
+        """Read a structural character, raising ValueError if the next
+        character is a different one.
+
+        :param bytes token: The expected character
+        :raises: ValueError
+
+        """
+        if self.read() != token:
+            raise ValueError('Expected "%s" at offset %i' %
+                             (token.decode('ascii'), self.offset - 1))
+
+    def peek(self):
+        """Skip whitespace and return the next character without reading it
+
+        :rtype: bytes
+        :raises: ValueError
+
+        """
+        while True:
+            self._position = WHITESPACE.match(self._buffer,
+                                              self._position).end()
+            if self._position < len(self._buffer):
+                return bytes(self._buffer[self._position:
+                                          self._position + 1])
+            self._mark = self._position
+            self._more()
+
+    def read(self):
+        """Skip whitespace and read the next character
+
+        :rtype: bytes
+        :raises: ValueError
+
+        """
+        value = self.peek()
+        self._position += 1
+        return value
+
+    def skip_value(self):
+        """Advance past the next value without decoding it
+
+        :raises: ValueError
+
+        """
+        first = self.peek()
+        self._mark = self._position
+        self._position += 1
+        if first == b'"':
+            self._skip_string()
+        elif first in (b'{', b'['):
+            self._skip_container()
+        else:
+            self._skip_scalar()
+
+    def value(self):
+        """Return the bytes of the value skipped last
+
+        :rtype: bytes
+
+        """
+        return bytes(self._buffer[self._mark:self._position])
+
+    def _more(self):
+        """Discard the bytes before the mark and read the next chunk into
+        the buffer, raising ValueError at the end of the document.
+
+        :raises: ValueError
+
+        """
+        for chunk in self._chunks:
+            if chunk:
+                break
+        else:
+            raise ValueError('Unexpected end of JSON document at offset %i'
+                             % self.offset)
+        if self._mark:
+            del self._buffer[:self._mark]
+            self._discarded += self._mark
+            self._position -= self._mark
+            self._mark = 0
+        self._buffer.extend(chunk)
+
+    def _skip_container(self):
+        """Advance past an object or array, from a position after its
+        opening bracket.
+
+        :raises: ValueError
+
+        """
+        depth = 1
+        while True:
+            match = STRUCTURE.search(self._buffer, self._position)
+            if match is None:
+                self._position = len(self._buffer)
+                self._more()
+                continue
+            self._position = match.end()
+            character = match.group()
+            if character == b'"':
+                self._skip_string()
+            elif character in (b'{', b'['):
+                depth += 1
+            else:
+                depth -= 1
+                if not depth:
+                    return
+
+    def _skip_scalar(self):
+        """Advance past a number, true, false or null
+
+        :raises: ValueError
+
+        """
+        while True:
+            match = SCALAR_END.search(self._buffer, self._position)
+            if match is not None:
+                self._position = match.start()
+                return
+            self._position = len(self._buffer)
+            self._more()
+
+    def _skip_string(self):
+        """Advance past a string, from a position after its opening quote.
+        A quote ends the string unless it is escaped by an odd number of
+        backslashes.
+
+        :raises: ValueError
+
+        """
+        while True:
+            index = self._buffer.find(b'"', self._position)
+            if index < 0:
+                self._position = len(self._buffer)
+                self._more()
+                continue
+            self._position = index + 1
+            backslash = index - 1
+            while self._buffer[backslash] == BACKSLASH:
+                backslash -= 1
+            if (index - backslash) % 2:
+                return
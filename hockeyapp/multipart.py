@@ -0,0 +1,185 @@
+"""
+Streaming multipart/form-data encoder for file uploads. The request body is
+produced in fixed-size chunks as it is sent, so the memory used by an upload
+does not depend on the size of the files being uploaded.
+
+"""
+import os
+import uuid
+
+CHUNK_SIZE = 65536
+
+
+class MultipartEncoder(object):
+    """File-like multipart/form-data request body that reads the files being
+    uploaded in chunks as the body is consumed. When the size of every file
+    is known, ``len`` is set so the body is sent with a Content-Length,
+    otherwise it is sent with chunked transfer encoding.
+
+    """
+    def __init__(self, fields=None, files=None, chunk_size=CHUNK_SIZE,
+                 callback=None):
+        """Create a new encoder
+
+        :param dict fields: Form field names and values, list values are
+            sent as a repeated field
+        :param dict files: Form field names and a tuple of the file name and
+            an open file object, with an optional content type
+        :param int chunk_size: The maximum number of bytes read at a time
+        :param callable callback: Called with the number of bytes sent and
+            the total number of bytes, or None if it is not known, as the
+            body is consumed
+
+        """
+        self.boundary = uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self.callback = callback
+        self.sent = 0
+        self._parts = self._build_parts(fields or {}, files or {})
+        self._buffer = b''
+        self._index = 0
+
+    def __iter__(self):
+        """Iterate over the body in chunks
+
+        :rtype: generator
+
+        """
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    @property
+    def content_type(self):
+        """Return the Content-Type header value for the body
+
+        :rtype: str
+
+        """
+        return 'multipart/form-data; boundary=%s' % self.boundary
+
+    @property
+    def len(self):
+        """Return the total length of the body, or None if the size of a
+        file being uploaded is not known.
+
+        :rtype: int or None
+
+        """
+        total = 0
+        for part in self._parts:
+            if isinstance(part, bytes):
+                total += len(part)
+            elif part[1] is None:
+                return None
+            else:
+                total += part[1]
+        return total
+
+    def read(self, size=-1):
+        """Read up to size bytes of the body, or up to chunk_size bytes if
+        size is not specified.
+
+        :param int size: The maximum number of bytes to read
+        :rtype: bytes
+
+        """
+        if size is None or size < 0:
+            size = self.chunk_size
+        while len(self._buffer) < size and self._index < len(self._parts):
+            part = self._parts[self._index]
+            if isinstance(part, bytes):
+                self._buffer += part
+                self._index += 1
+                continue
+            data = part[0].read(min(size, self.chunk_size))
+            if not data:
+                self._index += 1
+                continue
+            if not isinstance(data, bytes):
+                data = data.encode('utf-8')
+            self._buffer += data
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        self.sent += len(chunk)
+        if chunk and self.callback:
+            self.callback(self.sent, self.len)
+        return chunk
+
+    def _build_parts(self, fields, files):
+        """Return the body as a list of byte strings and (file, size) tuples
+
+        :param dict fields: Form field names and values
+        :param dict files: Form field names and file tuples
+        :rtype: list
+
+        """
+        parts = []
+        for name, value in sorted(fields.items()):
+            for item in value if isinstance(value, list) else [value]:
+                parts.append(self._header(name) +
+                             _to_bytes(item) + b'\r\n')
+        for name, value in sorted(files.items()):
+            file_name, handle = value[0], value[1]
+            content_type = value[2] if len(value) > 2 else \
+                'application/octet-stream'
+            parts.append(self._header(name, file_name, content_type))
+            parts.append((handle, _remaining(handle)))
+            parts.append(b'\r\n')
+        parts.append(('--%s--\r\n' % self.boundary).encode('utf-8'))
+        return parts
+
+    def _header(self, name, file_name=None, content_type=None):
+        """Return the boundary and headers for a form field
+
+        :param str name: The form field name
+        :param str file_name: The name of the file being uploaded
+        :param str content_type: The content type of the file
+        :rtype: bytes
+
+        """
+        disposition = 'form-data; name="%s"' % name
+        if file_name:
+            disposition += '; filename="%s"' % file_name
+        header = '--%s\r\nContent-Disposition: %s\r\n' % (self.boundary,
+                                                          disposition)
+        if content_type:
+            header += 'Content-Type: %s\r\n' % content_type
+        return (header + '\r\n').encode('utf-8')
+
+
+def _remaining(handle):
+    """Return the number of bytes left to read from a file, or None if it
+    can not be determined.
+
+    :param file handle: The open file
+    :rtype: int or None
+
+    """
+    try:
+        return os.fstat(handle.fileno()).st_size - handle.tell()
+    except (AttributeError, IOError, OSError, ValueError):
+        pass
+    try:
+        position = handle.tell()
+        handle.seek(0, os.SEEK_END)
+        size = handle.tell()
+        handle.seek(position)
+        return size - position
+    except (AttributeError, IOError, OSError, ValueError):
+        return None
+
+
+def _to_bytes(value):
+    """Return a form field value as bytes
+
+    :param value: The form field value
+    :rtype: bytes
+
+    """
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, bool):
+        value = int(value)
+    return str(value).encode('utf-8')
@@ -0,0 +1,326 @@
+"""
+Retracing of obfuscated Android stack traces with the ProGuard or R8
+mapping.txt uploaded with :meth:`hockeyapp.Application.upload`. The mapping is
+parsed once into a compact binary index. The index holds a class table sorted
+by obfuscated name, a method table with the line ranges of each class sorted
+by obfuscated method name, and a deduplicated string table. It is
+memory-mapped and binary searched in place, so retracing does not reparse the
+mapping, and loading an index for a large app costs no more than opening a
+file.
+
+"""
+import array
+import io
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+
+from hockeyapp import crashparse
+
+LOGGER = logging.getLogger(__name__)
+
+INDEX_MAGIC = b'HAPG'
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct('<4sIII')
+CLASS_ENTRY = struct.Struct('<IIII')
+METHOD_ENTRY = struct.Struct('<IIIIII')
+
+CLASS_LINE = re.compile(r'^(\S+) -> (\S+):$')
+METHOD_LINE = re.compile(r'^\s+(?:(\d+):(\d+):)?\S+ ([^\s(]+)\([^)]*\)'
+                         r'(?::(\d+)(?::(\d+))?)? -> (\S+)$')
+
+
+def build_index(mapping_path, path):
+    """Parse a mapping.txt file and atomically write its index
+
+    :param str mapping_path: The path of the mapping.txt file
+    :param str path: The path of the index file to write
+
+    """
+    strings = _Strings()
+    classes, methods, pending = [], array.array('I'), []
+    current = None
+
+    def finish():
+        if current is not None:
+            pending.sort(key=lambda value: value[0])
+            classes.append((current[0], strings.add(current[1]),
+                            len(methods) // 6, len(pending)))
+            for entry in pending:
+                methods.extend((strings.add(entry[0]),) + entry[1:])
+            del pending[:]
+
+    with io.open(mapping_path, encoding='utf-8') as handle:
+        for line in handle:
+            if line.startswith('#') or not line.strip():
+                continue
+            if not line[0].isspace():
+                match = CLASS_LINE.match(line.rstrip())
+                if match:
+                    finish()
+                    current = (match.group(2), match.group(1))
+                continue
+            match = METHOD_LINE.match(line.rstrip())
+            if match and current is not None:
+                start, end, name, original_start, original_end, obfuscated \
+                    = match.groups()
+                pending.append((obfuscated, strings.add(name),
+                                int(start or 0), int(end or 0),
+                                int(original_start or 0),
+                                int(original_end or original_start or 0)))
+    finish()
+
+    classes.sort(key=lambda value: value[0])
+    class_table = array.array('I')
+    for obfuscated, original, first, count in classes:
+        class_table.extend((strings.add(obfuscated), original, first, count))
+    for table in (class_table, methods):
+        if sys.byteorder != 'little':
+            table.byteswap()
+
+    handle, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)), prefix='.')
+    with os.fdopen(handle, 'wb') as output:
+        output.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION,
+                                       len(classes), len(methods) // 6))
+        for table in (class_table, methods):
+            if hasattr(table, 'tobytes'):
+                output.write(table.tobytes())
+            else:
+                output.write(table.tostring())
+        output.write(strings.data())
+    getattr(os, 'replace', os.rename)(temp_path, path)
+    LOGGER.debug('Indexed %i classes and %i methods from %s', len(classes),
+                 len(methods) // 6, mapping_path)
+
+
+class MappingIndex(object):
+    """A memory-mapped mapping.txt index"""
+
+    def __init__(self, path):
+        """Open the index file
+
+        :param str path: The path of the index file
+        :raises: ValueError
+
+        """
+        with open(path, 'rb') as handle:
+            self._map = mmap.mmap(handle.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        magic, version, self.class_count, self.method_count = \
+            INDEX_HEADER.unpack_from(self._map)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self._map.close()
+            raise ValueError('Invalid mapping index: %s' % path)
+        self._methods = INDEX_HEADER.size + \
+            self.class_count * CLASS_ENTRY.size
+        self._strings = self._methods + self.method_count * METHOD_ENTRY.size
+
+    def close(self):
+        """Close the memory map"""
+        self._map.close()
+
+    def class_name(self, obfuscated):
+        """Return the original name of an obfuscated class
+
+        :param str obfuscated: The obfuscated class name
+        :rtype: str or None
+
+        """
+        entry = self._class(obfuscated)
+        return self._string(entry[1]) if entry else None
+
+    def methods(self, obfuscated_class, obfuscated_method, line=None):
+        """Return the original class, method and line of each frame a frame
+        of an obfuscated method maps to. A line maps to more than one frame
+        when methods were inlined, innermost first, and a method without a
+        line may map to more than one original method.
+
+        :param str obfuscated_class: The obfuscated class name
+        :param str obfuscated_method: The obfuscated method name
+        :param int line: The line number in the obfuscated frame (optional)
+        :rtype: list
+
+        """
+        entry = self._class(obfuscated_class)
+        if entry is None:
+            return []
+        class_name = self._string(entry[1])
+        key = obfuscated_method.encode('utf-8')
+        low = self._bisect(entry[2], entry[2] + entry[3], key,
+                           lambda index: self._string_bytes(
+                               self._method(index)[0]))
+        results = []
+        for index in range(low, entry[2] + entry[3]):
+            method = self._method(index)
+            if self._string_bytes(method[0]) != key:
+                break
+            _name, original, start, end, original_start, original_end = \
+                method
+            if line and start and not start <= line <= end:
+                continue
+            name = self._string(original)
+            owner = class_name
+            if '.' in name:
+                owner, name = name.rsplit('.', 1)
+            if not line:
+                result_line = None
+            elif original_start and original_end != original_start:
+                result_line = original_start + line - start
+            else:
+                result_line = original_start or line
+            result = (owner, name, result_line)
+            if line or result not in results:
+                results.append(result)
+        return results
+
+    def retrace(self, report):
+        """Return a parsed Android crash report with the obfuscated exception
+        class and frames replaced by the original names and lines. Frames of
+        inlined methods are expanded into a frame for each method.
+
+        :param hockeyapp.crashparse.CrashReport report: The parsed crash log
+        :rtype: hockeyapp.crashparse.CrashReport
+
+        """
+        frames = []
+        for frame in report.frames:
+            if not frame.symbol or not frame.module:
+                frames.append(frame)
+                continue
+            method = frame.symbol[len(frame.module) + 1:]
+            results = self.methods(frame.module, method, frame.line)
+            if not results:
+                frames.append(frame)
+                continue
+            for owner, name, line in results if frame.line else results[:1]:
+                frames.append(crashparse.Frame(
+                    owner, '%s.%s' % (owner, name), frame.address,
+                    frame.offset, frame.file, line))
+        exception_type = report.exception_type
+        if exception_type:
+            exception_type = self.class_name(exception_type) or \
+                exception_type
+        return report._replace(exception_type=exception_type, frames=frames)
+
+    def retrace_all(self, reports):
+        """Retrace each of a sequence of crash reports
+
+        :param iterable reports: The parsed crash logs
+        :rtype: generator
+
+        """
+        for report in reports:
+            yield self.retrace(report)
+
+    @staticmethod
+    def _bisect(low, high, key, value):
+        """Return the first index in a sorted range with a value that is not
+        less than the key.
+
+        :param int low: The first index in the range
+        :param int high: The index after the range
+        :param bytes key: The value to search for
+        :param callable value: Returns the value at an index
+        :rtype: int
+
+        """
+        while low < high:
+            middle = (low + high) // 2
+            if value(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _class(self, obfuscated):
+        """Return the class table entry for an obfuscated class name
+
+        :param str obfuscated: The obfuscated class name
+        :rtype: tuple or None
+
+        """
+        key = obfuscated.encode('utf-8')
+        index = self._bisect(0, self.class_count, key,
+                             lambda index: self._string_bytes(
+                                 self._class_entry(index)[0]))
+        if index < self.class_count:
+            entry = self._class_entry(index)
+            if self._string_bytes(entry[0]) == key:
+                return entry
+        return None
+
+    def _class_entry(self, index):
+        """Return the class table entry at an index
+
+        :param int index: The entry index
+        :rtype: tuple
+
+        """
+        return CLASS_ENTRY.unpack_from(
+            self._map, INDEX_HEADER.size + index * CLASS_ENTRY.size)
+
+    def _method(self, index):
+        """Return the method table entry at an index
+
+        :param int index: The entry index
+        :rtype: tuple
+
+        """
+        return METHOD_ENTRY.unpack_from(
+            self._map, self._methods + index * METHOD_ENTRY.size)
+
+    def _string(self, offset):
+        """Return the string at an offset in the string table
+
+        :param int offset: The string offset
+        :rtype: str
+
+        """
+        return self._string_bytes(offset).decode('utf-8')
+
+    def _string_bytes(self, offset):
+        """Return the encoded string at an offset in the string table
+
+        :param int offset: The string offset
+        :rtype: bytes
+
+        """
+        start = self._strings + offset
+        return self._map[start:self._map.find(b'\0', start)]
+
+
+class _Strings(object):
+    """Deduplicated, NUL-terminated string table"""
+
+    def __init__(self):
+        self._offsets = {}
+        self._values = []
+        self._size = 0
+
+    def add(self, value):
+        """Add a string if it is not already in the table
+
+        :param str value: The string
+        :return int: The offset of the string in the table
+
+        """
+        offset = self._offsets.get(value)
+        if offset is None:
+            encoded = value.encode('utf-8') + b'\0'
+            offset = self._offsets[value] = self._size
+            self._values.append(encoded)
+            self._size += len(encoded)
+        return offset
+
+    def data(self):
+        """Return the string table
+
+        :rtype: bytes
+
+        """
+        return b''.join(self._values)
@@ -0,0 +1,142 @@
+"""
+Token-bucket rate limiting for API requests. A RateLimiter can be shared by
+any number of API request objects and threads to keep their combined request
+rate under the API's limits. The rate adapts to throttling by the server:
+it is halved whenever a request is rejected with a 429 or 503 response and
+recovers gradually as requests succeed, and every thread sharing the limiter
+waits out a Retry-After delay instead of only the one that was throttled.
+
+"""
+import calendar
+from email import utils
+import logging
+import threading
+import time
+
+from hockeyapp import api
+
+LOGGER = logging.getLogger(__name__)
+
+
+def retry_after(value):
+    """Return the number of seconds to wait from a Retry-After header value,
+    which may be a number of seconds or a HTTP date.
+
+    :param str value: The Retry-After header value
+    :rtype: float or None
+
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    parsed = utils.parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(utils.mktime_tz(parsed) - calendar.timegm(time.gmtime()), 0)
+
+
+class RateLimiter(object):
+    """Thread-safe adaptive token bucket. Requests wait for a token before
+    they are sent, throttled requests are retried with jittered exponential
+    backoff.
+
+    """
+    # Response status codes of throttled requests
+    STATUS_CODES = (429, 503)
+
+    def __init__(self, rate=10.0, burst=None, retries=5, backoff=1.0,
+                 max_backoff=60.0, min_rate=0.1, recovery=0.05):
+        """Create a new rate limiter
+
+        :param float rate: The maximum number of requests per second
+        :param int burst: The number of requests that may be sent at once
+            after the limiter has been idle, defaults to one second of rate
+        :param int retries: The number of times to retry a throttled request
+        :param float backoff: The delay before jitter after the first
+            throttled attempt
+        :param float max_backoff: The maximum delay between attempts
+        :param float min_rate: The lowest rate throttling reduces the rate to
+        :param float recovery: The fraction of the maximum rate restored
+            after each request that is not throttled
+
+        """
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.burst = burst or max(int(rate), 1)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.min_rate = min_rate
+        self.recovery = recovery
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.time()
+
+    def acquire(self):
+        """Wait until a request may be sent
+
+        :return float: The number of seconds waited
+
+        """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def reserve(self):
+        """Take a token from the bucket without waiting for it, returning the
+        number of seconds until the request may be sent. Callers that can
+        not block, such as coroutines, should wait for the delay themselves.
+
+        :rtype: float
+
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            return max(-self._tokens / self.rate, 0)
+
+    def success(self):
+        """Record a request that was not throttled, increasing the rate
+        towards the maximum.
+
+        """
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill()
+                self.rate = min(self.max_rate,
+                                self.rate + self.max_rate * self.recovery)
+
+    def throttle(self, attempt, retry_after_value=None):
+        """Record a throttled request, halving the rate and holding back every
+        request until the Retry-After delay, or a backoff delay if the server
+        did not specify one, has passed.
+
+        :param int attempt: The number of attempts made for the request
+        :param str retry_after_value: The Retry-After header of the response
+        :return float: The number of seconds requests are held back for
+
+        """
+        delay = retry_after(retry_after_value)
+        if delay is None:
+            delay = api.backoff(attempt, self.backoff, self.max_backoff)
+        with self._lock:
+            self._refill()
+            self.rate = max(self.rate / 2, self.min_rate)
+            self._tokens = min(self._tokens, -delay * self.rate)
+        LOGGER.debug('Throttled, rate reduced to %.2f/s for %.1fs',
+                     self.rate, delay)
+        return delay
+
+    def _refill(self):
+        """Add the tokens accumulated since the bucket was last updated. Must
+        be called with the lock held.
+
+        """
+        now = time.time()
+        self._tokens = min(self.burst,
+                           self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
@@ -0,0 +1,565 @@
+"""
+Compact record types for the crash reasons, crashes, versions, feedback and
+users returned by the API. Each record stores the documented fields of its
+type in ``__slots__`` instead of a per-record dict, and repeated values such
+as device models and OS versions are shared between the records built from
+one response, so records use about 2.5 times less memory than the decoded
+JSON. Fields that are not documented are kept in a dict that is only created
+when a record has them.
+
+The API methods return the decoded JSON unless they are called with
+``as_records=True``, in which case the items of the response are returned as
+a :class:`RecordList` that builds each record when it is accessed. Records
+behave like read-only mappings, so code written against the decoded JSON
+keeps working. Use :meth:`Record.to_dict` to get a plain dict.
+
+A :class:`RecordTable` holds large numbers of records in columns instead:
+integers in arrays, repeated values dictionary encoded and fixed width strings
+such as timestamps packed into a byte array. Records are only built when a
+row is accessed, and a table uses about ten times less memory than the
+decoded JSON.
+
+"""
+import array
+
+_MISSING = object()
+
+# Integer column values reserved for missing fields and nulls
+INT_MISSING = -2 ** 63
+INT_NULL = INT_MISSING + 1
+
+# Number of distinct values a dictionary encoded column holds before it is
+# stored as fixed width strings or plain objects instead
+CODE_LIMIT = 4096
+
+
+class Record(object):
+    """Base class for records built from decoded JSON objects"""
+
+    __slots__ = ('_extra',)
+
+    FIELDS = ()
+    KEYS = frozenset()
+    INTERNED = frozenset()
+
+    def __init__(self, value, interned=None):
+        """Create the record from a decoded JSON object. Values of the
+        fields in INTERNED are shared with other records through the
+        interned dict, if one is passed.
+
+        :param dict value: The decoded JSON object
+        :param dict interned: The values shared by the records built from
+            the same response (optional)
+
+        """
+        extra = None
+        keys = self.KEYS
+        fields = self.INTERNED if interned is not None else ()
+        for key, item in value.items():
+            if key in keys:
+                if key in fields and item.__hash__:
+                    item = interned.setdefault(item, item)
+                setattr(self, key, item)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = item
+        self._extra = extra
+
+    def __contains__(self, key):
+        return self._value(key) is not _MISSING
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    def __getitem__(self, key):
+        value = self._value(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.to_dict())
+
+    def __setstate__(self, state):
+        self.__init__(state)
+
+    __hash__ = None
+
+    def get(self, key, default=None):
+        """Return the value of a field, or the default if the record does not
+        have the field.
+
+        :param str key: The field name
+        :param default: The value to return for a missing field
+
+        """
+        value = self._value(key)
+        return default if value is _MISSING else value
+
+    def items(self):
+        """Return the field names and values of the record
+
+        :rtype: list
+
+        """
+        return [(key, self[key]) for key in self.keys()]
+
+    def keys(self):
+        """Return the names of the fields the record has
+
+        :rtype: list
+
+        """
+        keys = [key for key in self.FIELDS
+                if getattr(self, key, _MISSING) is not _MISSING]
+        if self._extra:
+            keys.extend(self._extra)
+        return keys
+
+    def to_dict(self):
+        """Return the record as a dict, as it was decoded from the JSON
+
+        :rtype: dict
+
+        """
+        return dict(self.items())
+
+    def values(self):
+        """Return the field values of the record
+
+        :rtype: list
+
+        """
+        return [self[key] for key in self.keys()]
+
+    def _value(self, key):
+        """Return the value of a field, or _MISSING if the record does not
+        have the field.
+
+        :param str key: The field name
+
+        """
+        if key in self.KEYS:
+            return getattr(self, key, _MISSING)
+        if self._extra:
+            return self._extra.get(key, _MISSING)
+        return _MISSING
+
+
+class CrashReason(Record):
+    """A crash reason group"""
+
+    FIELDS = ('id', 'app_id', 'app_version_id', 'number_of_crashes',
+              'created_at', 'updated_at', 'last_crash_at',
+              'bundle_short_version', 'bundle_version', 'status', 'fixed',
+              'file', 'class', 'method', 'line', 'reason', 'exception_type',
+              'developer_mentioned')
+    INTERNED = frozenset(['app_id', 'bundle_short_version', 'bundle_version',
+                          'file', 'class', 'method', 'exception_type'])
+    KEYS = frozenset(FIELDS)
+    __slots__ = FIELDS
+
+
+class Crash(Record):
+    """A crash in a crash reason group"""
+
+    FIELDS = ('id', 'app_id', 'app_version_id', 'crash_reason_id',
+              'created_at', 'updated_at', 'oem', 'model', 'os_version',
+              'jail_break', 'contact_string', 'user_string', 'has_log',
+              'has_description', 'bundle_version', 'bundle_short_version')
+    INTERNED = frozenset(['app_id', 'oem', 'model', 'os_version',
+                          'bundle_version', 'bundle_short_version'])
+    KEYS = frozenset(FIELDS)
+    __slots__ = FIELDS
+
+
+class Version(Record):
+    """A version of an app"""
+
+    FIELDS = ('id', 'version', 'shortversion', 'title', 'timestamp',
+              'appsize', 'notes', 'mandatory', 'external', 'device_family',
+              'minimum_os_version', 'status', 'config_url', 'download_url',
+              'public_url', 'build_url', 'restricted_to_tags', 'tags',
+              'expired_at', 'created_at', 'updated_at', 'app_id', 'app_owner',
+              'block_crashes', 'sdk_version', 'uuids')
+    INTERNED = frozenset(['title', 'device_family', 'minimum_os_version',
+                          'app_owner', 'sdk_version'])
+    KEYS = frozenset(FIELDS)
+    __slots__ = FIELDS
+
+
+class Feedback(Record):
+    """A feedback thread"""
+
+    FIELDS = ('id', 'name', 'email', 'created_at', 'status', 'token',
+              'messages')
+    KEYS = frozenset(FIELDS)
+    __slots__ = FIELDS
+
+
+class User(Record):
+    """A user of an app"""
+
+    FIELDS = ('id', 'user_id', 'role', 'full_name', 'email', 'tags',
+              'created_at', 'updated_at')
+    KEYS = frozenset(FIELDS)
+    __slots__ = FIELDS
+
+
+def records(record_type, values, interned=None):
+    """Return a list of records built from decoded JSON objects, sharing
+    repeated values of their interned fields between the records.
+
+    :param type record_type: The record class
+    :param iterable values: The decoded JSON objects
+    :param dict interned: The values shared by the records, defaults to a
+        dict used only for this list
+    :rtype: list
+
+    """
+    interned = {} if interned is None else interned
+    return [record_type(value, interned) for value in values]
+
+
+class RecordList(object):
+    """A read-only list of records over the decoded JSON objects of a
+    response. Each record is built when its item is accessed, sharing
+    interned values with the other records of the list.
+
+    """
+    __hash__ = None
+
+    def __init__(self, record_type, values):
+        """Create the list
+
+        :param type record_type: The record class
+        :param list values: The decoded JSON objects
+
+        """
+        self.record_type = record_type
+        self._values = values
+        self._interned = {}
+
+    def __eq__(self, other):
+        if isinstance(other, (RecordList, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.record_type(value, self._interned)
+                    for value in self._values[index]]
+        return self.record_type(self._values[index], self._interned)
+
+    def __iter__(self):
+        for value in self._values:
+            yield self.record_type(value, self._interned)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __repr__(self):
+        return '%s(%s, %r)' % (self.__class__.__name__,
+                               self.record_type.__name__, self._values)
+
+    def to_list(self):
+        """Return the decoded JSON objects the records are built from
+
+        :rtype: list
+
+        """
+        return list(self._values)
+
+
+class RecordTable(object):
+    """A column oriented list of records of one type. Rows can be appended
+    as records or decoded JSON objects, and each row is returned as a new
+    record built from the columns when it is accessed.
+
+    """
+    def __init__(self, record_type, values=()):
+        """Create the table
+
+        :param type record_type: The record class
+        :param iterable values: Records or decoded JSON objects to add
+
+        """
+        self.record_type = record_type
+        self._columns = {}
+        self._length = 0
+        self.extend(values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[value] for value in range(*index.indices(
+                self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('RecordTable index out of range')
+        value = {}
+        for name, column in self._columns.items():
+            item = column.get(index)
+            if item is not _MISSING:
+                value[name] = item
+        return self.record_type(value)
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self[index]
+
+    def __len__(self):
+        return self._length
+
+    def append(self, value):
+        """Add a row
+
+        :param value: The record or decoded JSON object
+        :type value: Record or dict
+
+        """
+        for name in value.keys():
+            if name not in self._columns:
+                self._columns[name] = _Column(self._length)
+        for name, column in self._columns.items():
+            column.append(value.get(name, _MISSING) if name in value
+                          else _MISSING)
+        self._length += 1
+
+    def column(self, name):
+        """Return the values of a field for every row, with None for rows
+        without the field.
+
+        :param str name: The field name
+        :rtype: list
+
+        """
+        column = self._columns.get(name)
+        if column is None:
+            return [None] * self._length
+        return [None if value is _MISSING else value
+                for value in (column.get(index)
+                              for index in range(self._length))]
+
+    def extend(self, values):
+        """Add rows
+
+        :param iterable values: Records or decoded JSON objects
+
+        """
+        for value in values:
+            self.append(value)
+
+
+class _Column(object):
+    """The values of one field of a RecordTable. A column starts out as an
+    integer array or a dictionary encoded array, depending on its first
+    value, and is converted to fixed width strings or plain objects when a
+    value does not fit. Codes are stored in the smallest array type that
+    holds them.
+
+    """
+    INT = 'int'
+    CODE = 'code'
+    FIXED = 'fixed'
+    OBJECT = 'object'
+
+    # Flags of fixed width values
+    PRESENT = 0
+    NULL = 1
+    ABSENT = 2
+
+    def __init__(self, length):
+        """Create a column, filling the rows before it with missing values
+
+        :param int length: The number of rows already in the table
+
+        """
+        self.mode = None
+        self._backfill = length
+        self._data = None
+        self._values = None
+        self._codes = None
+        self._width = None
+
+    def append(self, value):
+        """Add a value, converting the column if the value does not fit
+
+        :param value: The value, or _MISSING if the row does not have it
+
+        """
+        if self.mode is None:
+            if value is _MISSING:
+                self._backfill += 1
+                return
+            self._start(value)
+        if not self._append(value):
+            self._convert(value)
+
+    def get(self, index):
+        """Return the value of a row
+
+        :param int index: The row
+        :return: The value, or _MISSING if the row does not have it
+
+        """
+        if self.mode is None:
+            return _MISSING
+        if self.mode == self.INT:
+            value = self._data[index]
+            if value == INT_MISSING:
+                return _MISSING
+            return None if value == INT_NULL else value
+        if self.mode == self.CODE:
+            return self._values[self._data[index]]
+        if self.mode == self.FIXED:
+            flag = self._values[index]
+            if flag != self.PRESENT:
+                return _MISSING if flag == self.ABSENT else None
+            start = index * self._width
+            return self._data[start:start + self._width].decode('ascii')
+        return self._data[index]
+
+    def _append(self, value):
+        """Add a value in the current mode
+
+        :param value: The value
+        :return bool: The value was added
+
+        """
+        if self.mode == self.INT:
+            if value is _MISSING:
+                self._data.append(INT_MISSING)
+            elif value is None:
+                self._data.append(INT_NULL)
+            elif _is_int(value):
+                self._data.append(value)
+            else:
+                return False
+            return True
+        if self.mode == self.CODE:
+            try:
+                key = (type(value), value)
+                code = self._codes.get(key)
+            except TypeError:
+                return False
+            if code is None:
+                if len(self._values) >= CODE_LIMIT and \
+                        len(self._values) * 2 > len(self._data):
+                    return False
+                code = self._codes[key] = len(self._values)
+                self._values.append(value)
+                if code == 256 or code == 65536:
+                    self._data = array.array('H' if code == 256 else 'I',
+                                             self._data)
+            self._data.append(code)
+            return True
+        if self.mode == self.FIXED:
+            if value is _MISSING or value is None:
+                self._values.append(self.ABSENT if value is _MISSING
+                                    else self.NULL)
+                self._data.extend(b' ' * self._width)
+                return True
+            encoded = _fixed(value)
+            if encoded is None or len(encoded) != self._width:
+                return False
+            self._values.append(self.PRESENT)
+            self._data.extend(encoded)
+            return True
+        self._data.append(value)
+        return True
+
+    def _convert(self, value):
+        """Convert the column to fixed width strings if all of its values and
+        the new value fit, or to plain objects, and add the value.
+
+        :param value: The value that did not fit
+
+        """
+        values = [self.get(index) for index in range(len(self._values)
+                                                      if self.mode ==
+                                                      self.FIXED else
+                                                      len(self._data))]
+        values.append(value)
+        widths = set(len(encoded) for encoded in (
+            _fixed(item) for item in values
+            if item is not _MISSING and item is not None)
+            if encoded is not None)
+        fixed = self.mode == self.CODE and len(widths) == 1 and all(
+            item is _MISSING or item is None or _fixed(item) is not None
+            for item in values)
+        self.mode = self.FIXED if fixed else self.OBJECT
+        self._codes = None
+        if fixed:
+            self._width = widths.pop()
+            self._data = bytearray()
+            self._values = bytearray()
+        else:
+            self._data = []
+            self._values = None
+        for item in values:
+            self._append(item)
+
+    def _start(self, value):
+        """Choose the mode of the column from its first value and fill in the
+        missing values of the rows before it.
+
+        :param value: The first value
+
+        """
+        if _is_int(value):
+            self.mode = self.INT
+            self._data = array.array('q', [INT_MISSING]) * self._backfill
+        else:
+            self.mode = self.CODE
+            self._values = [_MISSING]
+            self._codes = {(object, _MISSING): 0}
+            self._data = array.array('B', [0]) * self._backfill
+        self._backfill = 0
+
+
+def _fixed(value):
+    """Return a string value encoded as ASCII, or None if it is not an ASCII
+    string.
+
+    :param value: The value
+    :rtype: bytes or None
+
+    """
+    if not isinstance(value, type(u'')) or isinstance(value, bytes):
+        return None
+    try:
+        return value.encode('ascii')
+    except UnicodeError:
+        return None
+
+
+def _is_int(value):
+    """Return True if a value fits in an integer column
+
+    :param value: The value
+    :rtype: bool
+
+    """
+    return isinstance(value, int) and not isinstance(value, bool) and \
+        INT_NULL < value < 2 ** 63
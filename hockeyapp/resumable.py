@@ -0,0 +1,226 @@
+"""
+Retrying, resumable uploads for large artifacts. When the app's public
+identifier is known, an upload is split into parts that are sent separately:
+the .ipa/.apk with the version metadata is uploaded as a new version of the
+app, then the dSYM or mapping.txt is attached to that version. Otherwise the
+build and its symbols are sent together in a single part. Each part is
+retried with exponential backoff on network and server errors, and completed
+parts are checkpointed to a state file so an upload interrupted by a process
+restart only sends the parts that have not completed. The upload API has no
+byte range support, so a part that fails is sent again in full.
+
+A part that creates a version is not idempotent: a server error or a dropped
+connection may come after the version was created, and sending it again
+would create a duplicate. Those parts are only retried on errors that show
+the request was never processed, a throttled request or a connection that
+could not be opened.
+
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+
+import requests
+
+from hockeyapp import api
+from hockeyapp import dedup
+
+LOGGER = logging.getLogger(__name__)
+
+# Changed when the parts an upload is split into change
+STATE_VERSION = 2
+
+RETRY_EXCEPTIONS = (requests.exceptions.ConnectionError,
+                    requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.Timeout)
+
+# Raised before the request reached the server, so retrying can not repeat it
+UNSENT_EXCEPTIONS = (requests.exceptions.ConnectTimeout,)
+
+
+def retryable(error, idempotent=True):
+    """Return True if a failed request may succeed if it is retried. A
+    request that is not idempotent is only retryable if the error shows the
+    server did not process it.
+
+    :param Exception error: The exception raised by the request
+    :param bool idempotent: The request can safely be sent more than once
+    :rtype: bool
+
+    """
+    if isinstance(error, api.APIError):
+        if error.status_code == 429:
+            return True
+        return idempotent and error.status_code is not None and \
+            error.status_code >= 500
+    if not idempotent:
+        return isinstance(error, UNSENT_EXCEPTIONS)
+    return isinstance(error, RETRY_EXCEPTIONS)
+
+
+class ResumableUpload(object):
+    """Upload an artifact and its symbols with automatic retries, resuming
+    from a state file after a restart. The symbols are attached to the
+    uploaded version when the application has a public identifier.
+
+    """
+    def __init__(self, application, state_path, retries=5, backoff=1.0,
+                 max_backoff=60.0):
+        """Create the resumable upload
+
+        :param hockeyapp.app.Application application: The application to
+            upload to
+        :param str state_path: The path of the state file used to checkpoint
+            completed parts
+        :param int retries: The number of times to retry each part
+        :param float backoff: The delay before jitter after the first failure
+        :param float max_backoff: The maximum delay between attempts
+
+        """
+        self.application = application
+        self.state_path = state_path
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def upload(self, ipa_file=None, dsym_file=None, progress=None, **kwargs):
+        """Upload the files, skipping parts completed by a previous attempt
+        with the same files and arguments. The state file is removed once
+        every part has been uploaded.
+
+        :param str ipa_file: Path to the .ipa, .apk or .zip file (optional)
+        :param str dsym_file: Path to the .dSYM folder or mapping.txt
+            (optional)
+        :param callable progress: Called with the part being uploaded, the
+            number of bytes sent and the total number of bytes (optional)
+        :param dict kwargs: Keyword arguments for
+            :meth:`hockeyapp.app.Application.upload`
+        :return str: app_id public identifier
+        :raises: hockeyapp.api.APIError
+
+        """
+        key = self._key(ipa_file, dsym_file, kwargs)
+        state = self._load()
+        if state.get('key') != key:
+            state = {'key': key, 'parts': {}}
+
+        if self.application.app_id and ipa_file and dsym_file and \
+                kwargs.get('index') is None:
+            version_id = self._part(
+                state, 'ipa', self.application.upload_version, (ipa_file,),
+                dict((k, v) for k, v in kwargs.items()
+                     if not k.startswith('dsym_') and k != 'index'),
+                progress)
+            self._part(state, 'dsym', self.application.upload_dsym,
+                       (version_id, dsym_file),
+                       dict((k, v) for k, v in kwargs.items()
+                            if k.startswith('dsym_') or k == 'chunk_size'),
+                       progress)
+        else:
+            app_id = self._part(state, 'upload', self.application.upload,
+                                (ipa_file, dsym_file), kwargs, progress)
+            if not self.application.app_id:
+                self.application.app_id = app_id
+
+        if os.path.exists(self.state_path):
+            os.unlink(self.state_path)
+        return self.application.app_id
+
+    def _key(self, ipa_file, dsym_file, kwargs):
+        """Return a key identifying the files and arguments of an upload
+
+        :param str ipa_file: Path to the .ipa, .apk or .zip file
+        :param str dsym_file: Path to the .dSYM folder or mapping.txt
+        :param dict kwargs: The upload arguments
+        :rtype: str
+
+        """
+        values = [dedup.signature(path) if path else None
+                  for path in (ipa_file, dsym_file)]
+        values.append(dict((key, value) for key, value in kwargs.items()
+                           if key != 'index'))
+        values.append(STATE_VERSION)
+        return hashlib.sha1(json.dumps(values, sort_keys=True, default=str)
+                            .encode('utf-8')).hexdigest()
+
+    def _load(self):
+        """Return the saved state, or an empty state if there is none
+
+        :rtype: dict
+
+        """
+        try:
+            with open(self.state_path) as handle:
+                return json.load(handle)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _part(self, state, name, method, args, kwargs, progress):
+        """Upload a part unless a previous attempt completed it, saving the
+        result of the upload to the state file.
+
+        :param dict state: The upload state
+        :param str name: The part name
+        :param callable method: The application method that uploads the part
+        :param tuple args: The positional arguments for the method
+        :param dict kwargs: The keyword arguments for the method
+        :param callable progress: The progress callback
+        :return: The public identifier, or the id of the uploaded version
+        :raises: hockeyapp.api.APIError
+
+        """
+        if name in state['parts']:
+            LOGGER.info('Skipping %s, uploaded by a previous attempt', name)
+            return state['parts'][name]
+        result = self._upload_part(name, method, args, kwargs, progress,
+                                   name == 'dsym')
+        if name == 'ipa':
+            result = result['id']
+        state['parts'][name] = result
+        self._save(state)
+        return result
+
+    def _save(self, state):
+        """Atomically write the state file
+
+        :param dict state: The upload state
+
+        """
+        temp_path = '%s.%d.tmp' % (self.state_path, os.getpid())
+        with open(temp_path, 'w') as handle:
+            json.dump(state, handle)
+        getattr(os, 'replace', os.rename)(temp_path, self.state_path)
+
+    def _upload_part(self, name, method, args, kwargs, progress,
+                     idempotent):
+        """Upload one part, retrying with backoff on retryable errors
+
+        :param str name: The part name
+        :param callable method: The application method that uploads the part
+        :param tuple args: The positional arguments for the method
+        :param dict kwargs: The keyword arguments for the method
+        :param callable progress: The progress callback
+        :param bool idempotent: The part does not create a version, so it
+            can be retried after any transient error
+        :return: The result of the upload method
+        :raises: hockeyapp.api.APIError
+
+        """
+        callback = None
+        if progress:
+            callback = lambda sent, total: progress(name, sent, total)
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return method(*args, progress=callback, **kwargs)
+            except Exception as error:
+                if not retryable(error, idempotent) or \
+                        attempt > self.retries:
+                    raise
+                delay = api.backoff(attempt, self.backoff, self.max_backoff)
+                LOGGER.warning('Upload of %s failed (%s), retrying in %.1fs',
+                               name, error, delay)
+                time.sleep(delay)
@@ -0,0 +1,100 @@
+"""
+Retention planning for app versions. The versions of an app are fetched
+once and the versions to delete are chosen locally from the sort order, the
+number of versions to remove or keep, and the share of the app's storage
+they use. The plan can be reviewed before
+:meth:`hockeyapp.Application.delete_multiple_versions` runs the deletes
+concurrently.
+
+"""
+import re
+
+SORT_DATE = 'date'
+SORT_VERSION = 'version'
+SORTS = (SORT_DATE, SORT_VERSION)
+
+NUMBERS = re.compile(r'\d+')
+
+
+def plan(versions, sort=SORT_VERSION, number=0, keep=0,
+         storage_percentage=None, version_id=None):
+    """Return the versions to delete, oldest first. The newest ``keep``
+    versions are never deleted. If storage_percentage is set, the oldest
+    versions are deleted until the remaining versions use no more than that
+    percentage of the storage the app uses now. At most ``number`` versions
+    are deleted if number is set.
+
+    :param list versions: The versions returned by
+        :meth:`hockeyapp.Application.versions`
+    :param str sort: Either 'version' or 'date' for ordering for removal
+    :param int number: Number of build versions to remove
+    :param int keep: Number of build versions to keep
+    :param int storage_percentage: The percentage of storage the remaining
+        versions may use
+    :param str version_id: Only remove versions older than this version
+        (optional)
+    :rtype: list
+    :raises: ValueError
+
+    """
+    if sort not in SORTS:
+        raise ValueError('sort must either be "version" or "date"')
+    if not number and not keep and storage_percentage is None and \
+            version_id is None:
+        raise ValueError('One of number, keep, storage_percentage or '
+                         'version_id is required')
+    if storage_percentage is not None and \
+            not 0 <= storage_percentage <= 100:
+        raise ValueError('storage_percentage must be between 0 and 100')
+    ordered = sorted(versions, key=version_key if sort == SORT_VERSION
+                     else date_key)
+    candidates = ordered[:max(len(ordered) - keep, 0)]
+    if version_id is not None:
+        ids = [str(value['id']) for value in ordered]
+        if str(version_id) not in ids:
+            raise ValueError('Unknown version id: %s' % version_id)
+        candidates = candidates[:ids.index(str(version_id))]
+    if storage_percentage is not None:
+        total = sum(_size(value) for value in ordered)
+        excess = total - total * storage_percentage / 100.0
+        selected, freed = [], 0
+        for value in candidates:
+            if freed >= excess:
+                break
+            selected.append(value)
+            freed += _size(value)
+        candidates = selected
+    return candidates[:number] if number else candidates
+
+
+def date_key(version):
+    """Return the sort key for ordering a version by upload date
+
+    :param dict version: The version
+    :rtype: tuple
+
+    """
+    return version.get('timestamp') or 0, version_key(version)
+
+
+def version_key(version):
+    """Return the sort key for ordering a version by build number, comparing
+    the numbers in the build number numerically.
+
+    :param dict version: The version
+    :rtype: tuple
+
+    """
+    value = str(version.get('version') or '')
+    return ([int(part) for part in NUMBERS.findall(value)], value,
+            version.get('timestamp') or 0)
+
+
+def _size(version):
+    """Return the storage used by a version in bytes
+
+    :param dict version: The version
+    :rtype: int
+
+    """
+    return int(version.get('appsize') or 0)
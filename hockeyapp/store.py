@@ -0,0 +1,343 @@
+"""
+Local SQLite mirror of the crash reasons, crashes, versions and feedback for
+applications, keyed by the app public identifier and kept up to date with
+incremental synchronization.
+
+"""
+import json
+import logging
+import math
+import sqlite3
+import threading
+
+LOGGER = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS crash_reasons (
+    app_id TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    app_version_id INTEGER,
+    number_of_crashes INTEGER NOT NULL DEFAULT 0,
+    last_crash_at TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (app_id, id));
+CREATE INDEX IF NOT EXISTS crash_reasons_last_crash_at
+    ON crash_reasons (app_id, last_crash_at);
+
+CREATE TABLE IF NOT EXISTS crashes (
+    app_id TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    crash_reason_id INTEGER,
+    app_version_id INTEGER,
+    created_at TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (app_id, id));
+CREATE INDEX IF NOT EXISTS crashes_crash_reason_id
+    ON crashes (app_id, crash_reason_id);
+CREATE INDEX IF NOT EXISTS crashes_created_at
+    ON crashes (app_id, created_at);
+
+CREATE TABLE IF NOT EXISTS versions (
+    app_id TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    version TEXT,
+    shortversion TEXT,
+    timestamp INTEGER,
+    data TEXT NOT NULL,
+    PRIMARY KEY (app_id, id));
+CREATE INDEX IF NOT EXISTS versions_timestamp ON versions (app_id, timestamp);
+
+CREATE TABLE IF NOT EXISTS feedback (
+    app_id TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    created_at TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (app_id, id));
+CREATE INDEX IF NOT EXISTS feedback_created_at
+    ON feedback (app_id, created_at);
+
+CREATE TABLE IF NOT EXISTS checkpoints (
+    app_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (app_id, name));
+"""
+
+
+class Store(object):
+    """Persist crash data for one or more applications in a SQLite database.
+    The store may be shared between threads.
+
+    """
+    PAGE_SIZE = 100
+
+    def __init__(self, path=':memory:'):
+        """Open or create the store
+
+        :param str path: The path to the SQLite database file
+
+        """
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        with self._lock:
+            self._connection.executescript(SCHEMA)
+
+    def checkpoint(self, app_id, name):
+        """Return the value of a synchronization checkpoint for an app
+
+        :param str app_id: The app public identifier
+        :param str name: The checkpoint name
+        :rtype: str or None
+
+        """
+        row = self._fetch_one('SELECT value FROM checkpoints '
+                              'WHERE app_id = ? AND name = ?', app_id, name)
+        return row[0] if row else None
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._connection.close()
+
+    def crash_reasons(self, app_id):
+        """Return the stored crash reasons for an app, most recent crash
+        first.
+
+        :param str app_id: The app public identifier
+        :rtype: list
+
+        """
+        return self._fetch_data('SELECT data FROM crash_reasons '
+                                'WHERE app_id = ? '
+                                'ORDER BY last_crash_at DESC', app_id)
+
+    def crashes(self, app_id, reason_id=None):
+        """Return the stored crashes for an app, optionally restricted to a
+        single crash reason, oldest first.
+
+        :param str app_id: The app public identifier
+        :param int reason_id: The crash reason id (optional)
+        :rtype: list
+
+        """
+        if reason_id is None:
+            return self._fetch_data('SELECT data FROM crashes '
+                                    'WHERE app_id = ? '
+                                    'ORDER BY created_at, id', app_id)
+        return self._fetch_data('SELECT data FROM crashes '
+                                'WHERE app_id = ? AND crash_reason_id = ? '
+                                'ORDER BY created_at, id',
+                                app_id, int(reason_id))
+
+    def feedback(self, app_id):
+        """Return the stored feedback for an app, newest first.
+
+        :param str app_id: The app public identifier
+        :rtype: list
+
+        """
+        return self._fetch_data('SELECT data FROM feedback WHERE app_id = ? '
+                                'ORDER BY created_at DESC, id DESC', app_id)
+
+    def versions(self, app_id):
+        """Return the stored versions for an app, newest first.
+
+        :param str app_id: The app public identifier
+        :rtype: list
+
+        """
+        return self._fetch_data('SELECT data FROM versions WHERE app_id = ? '
+                                'ORDER BY timestamp DESC, id DESC', app_id)
+
+    def sync(self, application, crashes=True, feedback=True):
+        """Fetch everything that is new for the application since the last
+        sync and store it. Crash reasons are walked by ``last_crash_at``,
+        newest first, stopping at the last checkpoint; crashes are only
+        fetched for reasons whose crash count has grown. Crashes have their
+        own checkpoint, so a sync without crashes does not cause a later sync
+        with crashes to miss them. Returns the number of new or updated
+        records of each type.
+
+        :param hockeyapp.app.Application application: The application to sync
+        :param bool crashes: Sync the crashes for changed crash reasons
+        :param bool feedback: Sync the application feedback
+        :rtype: dict
+
+        """
+        app_id = application.app_id
+        counts = {'crash_reasons': 0, 'crashes': 0,
+                  'versions': self._sync_versions(application)}
+
+        checkpoints = {'last_crash_at': self.checkpoint(app_id,
+                                                        'last_crash_at')}
+        if crashes:
+            checkpoints['crashes_last_crash_at'] = self.checkpoint(
+                app_id, 'crashes_last_crash_at')
+        values = list(checkpoints.values())
+        checkpoint = None if None in values else min(values)
+        latest = None
+        for reason in application.iter_crash_groups(
+                limit=self.PAGE_SIZE, order='desc',
+                sort=application.CRASH_SORT_LAST_CRASH):
+            last_crash_at = reason.get('last_crash_at')
+            if checkpoint and last_crash_at and last_crash_at < checkpoint:
+                break
+            row = self._fetch_one('SELECT number_of_crashes '
+                                  'FROM crash_reasons '
+                                  'WHERE app_id = ? AND id = ?',
+                                  app_id, reason['id'])
+            number = reason.get('number_of_crashes') or 0
+            if not row or row[0] != number:
+                self._execute('INSERT OR REPLACE INTO crash_reasons VALUES '
+                              '(?, ?, ?, ?, ?, ?)',
+                              app_id, reason['id'],
+                              reason.get('app_version_id'), number,
+                              last_crash_at, json.dumps(dict(reason)))
+                counts['crash_reasons'] += 1
+            if crashes:
+                known = self._fetch_one('SELECT COUNT(*) FROM crashes '
+                                        'WHERE app_id = ? '
+                                        'AND crash_reason_id = ?',
+                                        app_id, reason['id'])[0]
+                if number > known:
+                    counts['crashes'] += self._sync_crashes(
+                        application, reason, number - known)
+            if last_crash_at and (not latest or last_crash_at > latest):
+                latest = last_crash_at
+
+        for name, value in checkpoints.items():
+            if latest and (not value or latest > value):
+                self._execute('INSERT OR REPLACE INTO checkpoints VALUES '
+                              '(?, ?, ?)', app_id, name, latest)
+        if feedback:
+            counts['feedback'] = self._sync_feedback(application)
+        LOGGER.debug('Synchronized %s: %r', app_id, counts)
+        return counts
+
+    def _execute(self, query, *args):
+        """Execute and commit a statement
+
+        :param str query: The SQL statement
+        :param list args: The statement parameters
+
+        """
+        with self._lock:
+            with self._connection:
+                self._connection.execute(query, args)
+
+    def _execute_many(self, query, rows):
+        """Execute and commit a statement for each row of parameters
+
+        :param str query: The SQL statement
+        :param list rows: The parameters for each statement
+
+        """
+        with self._lock:
+            with self._connection:
+                self._connection.executemany(query, rows)
+
+    def _fetch_all(self, query, *args):
+        """Return all of the rows of a query
+
+        :param str query: The SQL query
+        :param list args: The query parameters
+        :rtype: list
+
+        """
+        with self._lock:
+            return self._connection.execute(query, args).fetchall()
+
+    def _fetch_data(self, query, *args):
+        """Return the decoded JSON data column for each row of a query
+
+        :param str query: The SQL query
+        :param list args: The query parameters
+        :rtype: list
+
+        """
+        return [json.loads(row[0]) for row in self._fetch_all(query, *args)]
+
+    def _fetch_one(self, query, *args):
+        """Return the first row of a query
+
+        :param str query: The SQL query
+        :param list args: The query parameters
+        :rtype: tuple or None
+
+        """
+        with self._lock:
+            return self._connection.execute(query, args).fetchone()
+
+    def _sync_crashes(self, application, reason, new):
+        """Store the newest crashes for a crash reason, walking the pages of
+        crashes from the last page back until the expected number of new
+        crashes has been found.
+
+        :param hockeyapp.app.Application application: The application
+        :param dict reason: The crash reason
+        :param int new: The number of new crashes to expect
+        :rtype: int
+
+        """
+        app_id = application.app_id
+        known = set(row[0] for row in self._fetch_all(
+            'SELECT id FROM crashes WHERE app_id = ? AND crash_reason_id = ?',
+            app_id, reason['id']))
+        pages = int(math.ceil(reason['number_of_crashes'] /
+                              float(self.PAGE_SIZE)))
+        stored = 0
+        for number in range(pages, 0, -1):
+            page = application.crashes(reason['id'], offset=number,
+                                       limit=self.PAGE_SIZE)
+            rows = [(app_id, crash['id'],
+                     crash.get('crash_reason_id', reason['id']),
+                     crash.get('app_version_id'), crash.get('created_at'),
+                     json.dumps(dict(crash)))
+                    for crash in page.crashes if crash['id'] not in known]
+            self._execute_many('INSERT OR REPLACE INTO crashes VALUES '
+                               '(?, ?, ?, ?, ?, ?)', rows)
+            stored += len(rows)
+            if stored >= new:
+                break
+        return stored
+
+    def _sync_feedback(self, application):
+        """Store feedback newer than the newest stored feedback
+
+        :param hockeyapp.app.Application application: The application
+        :rtype: int
+
+        """
+        app_id = application.app_id
+        stored = 0
+        for item in application.iter_feedback(limit=self.PAGE_SIZE,
+                                              order='desc'):
+            if self._fetch_one('SELECT 1 FROM feedback '
+                               'WHERE app_id = ? AND id = ?',
+                               app_id, item['id']):
+                break
+            self._execute('INSERT INTO feedback VALUES (?, ?, ?, ?)',
+                          app_id, item['id'], item.get('created_at'),
+                          json.dumps(dict(item)))
+            stored += 1
+        return stored
+
+    def _sync_versions(self, application):
+        """Store the versions for the application that are new or have
+        changed since the last sync
+
+        :param hockeyapp.app.Application application: The application
+        :rtype: int
+
+        """
+        app_id = application.app_id
+        stored = dict((row[0], json.loads(row[1])) for row in self._fetch_all(
+            'SELECT id, data FROM versions WHERE app_id = ?', app_id))
+        rows = [(app_id, version['id'], version.get('version'),
+                 version.get('shortversion'), version.get('timestamp'),
+                 json.dumps(dict(version)))
+                for version in application.versions()
+                if stored.get(version['id']) != dict(version)]
+        self._execute_many('INSERT OR REPLACE INTO versions VALUES '
+                           '(?, ?, ?, ?, ?, ?)', rows)
+        return len(rows)
@@ -0,0 +1,400 @@
+"""
+Offline symbolication of Apple crash logs parsed with
+:mod:`hockeyapp.crashparse`. The symbol tables of the Mach-O files in a .dSYM
+bundle are converted into one index file per build UUID. An index file holds
+a sorted array of symbol addresses, the offsets of their names and a string
+table. Index files are memory-mapped and searched in place, so loading one
+costs no parsing and only the pages that are searched are read. Recently used
+indexes stay open in an LRU cache, so symbolicating many crashes from the same
+build is almost free.
+
+"""
+import bisect
+import collections
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+from hockeyapp import crashparse
+from hockeyapp import dsym
+
+LOGGER = logging.getLogger(__name__)
+
+INDEX_MAGIC = b'HASY'
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct('<4sIIQ')
+INDEX_SUFFIX = '.symidx'
+
+# Mach-O constants
+FAT_MAGIC = 0xcafebabe
+FAT_MAGIC_64 = 0xcafebabf
+MH_MAGIC = 0xfeedface
+MH_MAGIC_64 = 0xfeedfacf
+LC_SEGMENT = 0x1
+LC_SYMTAB = 0x2
+LC_SEGMENT_64 = 0x19
+LC_UUID = 0x1b
+N_STAB = 0xe0
+N_TYPE = 0x0e
+N_SECT = 0x0e
+
+MachO = collections.namedtuple('MachO', 'uuid,text_address,symbols')
+
+
+def build_index(path, destination):
+    """Write an index file for each Mach-O slice in a .dSYM bundle or Mach-O
+    file, named for the UUID of the slice.
+
+    :param str path: The .dSYM bundle or Mach-O file
+    :param str destination: The directory to write the index files to
+    :return list: The UUIDs of the indexed slices
+
+    """
+    if not os.path.isdir(destination):
+        os.makedirs(destination)
+    if os.path.isdir(path):
+        paths = [file_path for file_path, _name in dsym.bundle_files(path)
+                 if os.sep + 'DWARF' + os.sep in file_path]
+    else:
+        paths = [path]
+    uuids = []
+    for file_path in paths:
+        with open(file_path, 'rb') as handle:
+            data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            slices = read_macho(data)
+        finally:
+            data.close()
+        for slice_ in slices:
+            write_index(slice_, os.path.join(destination,
+                                             slice_.uuid + INDEX_SUFFIX))
+            uuids.append(slice_.uuid)
+    return uuids
+
+
+def read_macho(data):
+    """Return the UUID, __TEXT address and function symbols of each slice in
+    a thin or universal Mach-O file.
+
+    :param bytes data: The contents of the Mach-O file
+    :rtype: list
+    :raises: ValueError
+
+    """
+    slices = []
+    for value in _slices(data):
+        wide, commands = _load_commands(value)
+        uuid, text_address, symtab = None, 0, None
+        for cmd, offset in commands:
+            if cmd == LC_UUID:
+                uuid = _uuid(value, offset)
+            elif cmd in (LC_SEGMENT, LC_SEGMENT_64):
+                name = bytes(value[offset + 8:offset + 24]).rstrip(b'\0')
+                if name == b'__TEXT':
+                    text_address = struct.unpack_from(
+                        '<Q' if cmd == LC_SEGMENT_64 else '<I', value,
+                        offset + 24)[0]
+            elif cmd == LC_SYMTAB:
+                symtab = struct.unpack_from('<IIII', value, offset + 8)
+        if uuid is None:
+            raise ValueError('Mach-O file has no UUID')
+        slices.append(MachO(uuid, text_address,
+                            _symbols(value, symtab, wide) if symtab else []))
+    return slices
+
+
+def read_uuids(data):
+    """Return the UUID of each slice in a thin or universal Mach-O file,
+    reading only the load commands.
+
+    :param bytes data: The contents of the Mach-O file
+    :rtype: list
+    :raises: ValueError
+
+    """
+    uuids = []
+    for value in _slices(data):
+        uuids.extend(_uuid(value, offset)
+                     for cmd, offset in _load_commands(value)[1]
+                     if cmd == LC_UUID)
+    return uuids
+
+
+def write_index(slice_, path):
+    """Atomically write the index file for a Mach-O slice
+
+    :param MachO slice_: The Mach-O slice
+    :param str path: The path of the index file
+
+    """
+    symbols = sorted(slice_.symbols)
+    names, offsets, position = [], [], 0
+    for _address, name in symbols:
+        encoded = name.encode('utf-8') + b'\0'
+        offsets.append(position)
+        names.append(encoded)
+        position += len(encoded)
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                         prefix='.')
+    with os.fdopen(handle, 'wb') as output:
+        output.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION,
+                                       len(symbols), slice_.text_address))
+        output.write(struct.pack('<%dQ' % len(symbols),
+                                 *[address for address, _name in symbols]))
+        output.write(struct.pack('<%dI' % len(symbols), *offsets))
+        output.write(b''.join(names))
+    getattr(os, 'replace', os.rename)(temp_path, path)
+
+
+class SymbolIndex(object):
+    """A memory-mapped symbol index for one build UUID"""
+
+    def __init__(self, path):
+        """Open the index file
+
+        :param str path: The path of the index file
+        :raises: ValueError
+
+        """
+        with open(path, 'rb') as handle:
+            self._map = mmap.mmap(handle.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        magic, version, self.count, self.text_address = \
+            INDEX_HEADER.unpack_from(self._map)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self._map.close()
+            raise ValueError('Invalid symbol index: %s' % path)
+        self._names = INDEX_HEADER.size + self.count * 8
+        self._strings = self._names + self.count * 4
+
+    def __getitem__(self, index):
+        """Return the address of the symbol at an index, so the index can be
+        searched with :mod:`bisect`.
+
+        :param int index: The symbol index
+        :rtype: int
+
+        """
+        return struct.unpack_from('<Q', self._map,
+                                  INDEX_HEADER.size + index * 8)[0]
+
+    def __len__(self):
+        """Return the number of symbols
+
+        :rtype: int
+
+        """
+        return self.count
+
+    def close(self):
+        """Close the memory map"""
+        self._map.close()
+
+    def lookup(self, address):
+        """Return the name of the symbol containing an address and the
+        offset of the address in the symbol.
+
+        :param int address: The offset of the address from the load address
+            of the image
+        :rtype: tuple(str, int) or None
+
+        """
+        index = bisect.bisect_right(self, self.text_address + address) - 1
+        if index < 0:
+            return None
+        start = self._strings + struct.unpack_from(
+            '<I', self._map, self._names + index * 4)[0]
+        end = self._map.find(b'\0', start)
+        return (self._map[start:end].decode('utf-8', 'replace'),
+                self.text_address + address - self[index])
+
+
+class Symbolicator(object):
+    """Symbolicates parsed crash logs using a directory of symbol indexes,
+    keeping up to ``max_indexes`` indexes open. A symbolicator may be shared
+    between threads: indexes that are evicted or replaced are not closed
+    explicitly, so threads still using them are not affected, and are
+    unmapped once they are no longer referenced.
+
+    """
+    def __init__(self, path, max_indexes=16):
+        """Create a new symbolicator
+
+        :param str path: The directory containing the symbol indexes
+        :param int max_indexes: The number of indexes kept open
+
+        """
+        self.path = path
+        self.max_indexes = max_indexes
+        self._indexes = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, path):
+        """Index the symbols of a .dSYM bundle or Mach-O file
+
+        :param str path: The .dSYM bundle or Mach-O file
+        :return list: The UUIDs of the indexed slices
+
+        """
+        uuids = build_index(path, self.path)
+        with self._lock:
+            for uuid in uuids:
+                self._indexes.pop(uuid, None)
+        return uuids
+
+    def close(self):
+        """Close the open indexes"""
+        with self._lock:
+            for index in self._indexes.values():
+                if index:
+                    index.close()
+            self._indexes.clear()
+
+    def index(self, uuid):
+        """Return the symbol index for a build UUID, or None if the build has
+        not been indexed.
+
+        :param str uuid: The build UUID
+        :rtype: SymbolIndex or None
+
+        """
+        uuid = uuid.replace('-', '').lower()
+        with self._lock:
+            if uuid in self._indexes:
+                index = self._indexes.pop(uuid)
+            else:
+                path = os.path.join(self.path, uuid + INDEX_SUFFIX)
+                index = SymbolIndex(path) if os.path.exists(path) else None
+            self._indexes[uuid] = index
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+            return index
+
+    def symbolicate(self, report):
+        """Return the crash report with the symbol, and offset in the symbol,
+        of each unsymbolicated frame in an indexed binary image.
+
+        :param hockeyapp.crashparse.CrashReport report: The parsed crash log
+        :rtype: hockeyapp.crashparse.CrashReport
+
+        """
+        images = sorted(report.binary_images)
+        starts = [image.start for image in images]
+        frames = []
+        for frame in report.frames:
+            if frame.symbol is None and frame.address is not None:
+                position = bisect.bisect_right(starts, frame.address) - 1
+                if position >= 0 and frame.address <= images[position].end:
+                    frame = self._symbolicate_frame(frame, images[position])
+            frames.append(frame)
+        return report._replace(frames=frames)
+
+    def symbolicate_all(self, reports):
+        """Symbolicate each of a sequence of crash reports
+
+        :param iterable reports: The parsed crash logs
+        :rtype: generator
+
+        """
+        for report in reports:
+            yield self.symbolicate(report)
+
+    def _symbolicate_frame(self, frame, image):
+        """Return a frame with the symbol looked up in the image's index
+
+        :param hockeyapp.crashparse.Frame frame: The unsymbolicated frame
+        :param hockeyapp.crashparse.BinaryImage image: The frame's image
+        :rtype: hockeyapp.crashparse.Frame
+
+        """
+        index = self.index(image.uuid)
+        result = index.lookup(frame.address - image.start) if index else None
+        if result is None:
+            return frame
+        return crashparse.Frame(frame.module or image.name, result[0],
+                                frame.address, result[1], frame.file,
+                                frame.line)
+
+
+def _load_commands(data):
+    """Return whether a thin Mach-O slice is 64-bit, and the type and offset
+    of each of its load commands.
+
+    :param bytes data: The contents of the Mach-O slice
+    :rtype: tuple(bool, list)
+    :raises: ValueError
+
+    """
+    magic = struct.unpack_from('<I', data)[0]
+    if magic not in (MH_MAGIC, MH_MAGIC_64):
+        raise ValueError('Not a Mach-O file')
+    wide = magic == MH_MAGIC_64
+    ncmds = struct.unpack_from('<I', data, 16)[0]
+    offset = 32 if wide else 28
+    commands = []
+    for _ignore in range(ncmds):
+        cmd, size = struct.unpack_from('<II', data, offset)
+        commands.append((cmd, offset))
+        offset += size
+    return wide, commands
+
+
+def _slices(data):
+    """Yield the thin slices of a thin or universal Mach-O file. A thin file
+    is yielded as is, so a memory mapped file is read in place, and the
+    slices of a universal file are copied one at a time.
+
+    :param bytes data: The contents of the Mach-O file
+    :rtype: iterator
+
+    """
+    magic = struct.unpack_from('>I', data)[0]
+    if magic != FAT_MAGIC and magic != FAT_MAGIC_64:
+        yield data
+        return
+    count = struct.unpack_from('>I', data, 4)[0]
+    arch = struct.Struct('>iiIII' if magic == FAT_MAGIC else '>iiQQII')
+    for index in range(count):
+        fields = arch.unpack_from(data, 8 + index * arch.size)
+        yield data[fields[2]:fields[2] + fields[3]]
+
+
+def _symbols(data, symtab, wide):
+    """Return the address and name of each symbol defined in a section of
+    the slice, without the leading underscore the compiler adds to C names.
+
+    :param bytes data: The contents of the Mach-O slice
+    :param tuple symtab: The symbol table offset, count, string table offset
+        and string table size
+    :param bool wide: The slice is 64-bit
+    :rtype: list
+
+    """
+    symoff, nsyms, stroff, strsize = symtab
+    entry = struct.Struct('<IBBHQ' if wide else '<IBBhI')
+    strings = data[stroff:stroff + strsize]
+    symbols = {}
+    for index in range(nsyms):
+        strx, type_, _sect, _desc, value = entry.unpack_from(
+            data, symoff + index * entry.size)
+        if type_ & N_STAB or type_ & N_TYPE != N_SECT or not strx:
+            continue
+        name = strings[strx:strings.index(b'\0', strx)].decode('utf-8',
+                                                                'replace')
+        symbols.setdefault(value, name[1:] if name.startswith('_') else name)
+    return list(symbols.items())
+
+
+def _uuid(data, offset):
+    """Return the UUID in an LC_UUID load command as a hex string
+
+    :param bytes data: The contents of the Mach-O slice
+    :param int offset: The offset of the load command
+    :rtype: str
+
+    """
+    return ''.join('%02x' % value for value in bytearray(
+        data[offset + 8:offset + 24]))
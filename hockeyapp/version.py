@@ -7,8 +7,10 @@ __author__ = 'Don Thorp'
 __email__ = 'don@donthorp.net'
 __since__ = '2012-03-23'
 
+import os
 import sys
 from . import api
+from . import multipart
 
 
 class AppVersions(api.APIRequest):
@@ -77,6 +79,17 @@ class AppVersionDelete(api.APIRequest):
         """
         return api.BASE_URI + 'apps/%s/app_versions/%s' % (self._app_id, self._version_id)
 
+    def execute(self):
+        """Delete the version
+
+        :returns: bool
+
+        """
+        self._delete(['apps', self._app_id, 'app_versions',
+                      str(self._version_id)],
+                     data=self.parameters or None)
+        return True
+
 class AppVersionAdd(api.APIRequest):
 
     NOTE_TYPE_MARKDOWN = 1
@@ -152,6 +165,29 @@ class AppVersionAdd(api.APIRequest):
         """
         return api.BASE_URI + 'apps/%s/app_versions' % self._app_id
 
+    def execute(self, progress=None, chunk_size=multipart.CHUNK_SIZE):
+        """Upload the new version, streaming the files in chunks instead of
+        reading them into memory.
+
+        :param progress: Called with the bytes sent and total bytes (optional)
+        :type progress: callable
+        :param chunk_size: The number of bytes to read at a time
+        :type chunk_size: int
+        :returns: dict
+
+        """
+        fields = self.parameters
+        files = {}
+        for key in ('ipa', 'dsym'):
+            if key in fields:
+                handle = fields.pop(key)
+                name = os.path.basename(getattr(handle, 'name', key))
+                files[key] = (name, handle)
+        body = multipart.MultipartEncoder(fields, files, chunk_size, progress)
+        return self._post(['apps', self._app_id, 'app_versions', 'upload'],
+                          data=body,
+                          headers={'Content-Type': body.content_type})
+
     @property
     def dsym(self):
         return self._dsym
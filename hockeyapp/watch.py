@@ -0,0 +1,306 @@
+"""
+Crash spike detection for many apps. Each poll fetches the crash groups of
+every app sorted by the time of their last crash, newest first, and stops
+paging at the first group that has not crashed since the previous poll, so
+the cost of a poll scales with the groups that have new crashes instead of
+the total number of crashes. The crash count and crash rate of each group
+are kept in compact per-app arrays, and an event is emitted when a new crash
+group appears, a group gets more new crashes than a threshold, or the crash
+rate of a group jumps above its moving average.
+
+"""
+import array
+import calendar
+import collections
+from concurrent import futures
+import json
+import logging
+import sys
+import threading
+import time
+
+import requests
+
+from hockeyapp import api
+
+LOGGER = logging.getLogger(__name__)
+
+NEW = 'new'
+THRESHOLD = 'threshold'
+RATE = 'rate'
+
+PAGE_SIZE = 100
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+Event = collections.namedtuple('Event', 'kind,app_id,group_id,reason,'
+                                        'crashes,new_crashes,rate,'
+                                        'expected_rate,last_crash_at,time')
+
+
+def json_lines(event, output=None):
+    """Write an event to a file as a line of JSON, standard output by default
+
+    :param Event event: The event
+    :param file output: The file to write to (optional)
+
+    """
+    output = output or sys.stdout
+    output.write(json.dumps(dict(zip(event._fields, event)),
+                            sort_keys=True) + '\n')
+    output.flush()
+
+
+class Watcher(object):
+    """Poll the crash groups of many apps and emit events for crash spikes.
+    The first poll of an app records the current count of every crash group
+    as the baseline without emitting events.
+
+    """
+    def __init__(self, applications, app_ids=None, threshold=100,
+                 rate_factor=5.0, min_crashes=10, alpha=0.3, workers=10):
+        """Create a new watcher
+
+        :param hockeyapp.Applications applications: The API object whose
+            connection pool, cache and rate limiter are used
+        :param list app_ids: The app public identifiers, defaults to every
+            app for the API token
+        :param int threshold: The number of new crashes in a group between
+            two polls that emits a ``threshold`` event
+        :param float rate_factor: How many times its moving average the crash
+            rate of a group has to be to emit a ``rate`` event
+        :param int min_crashes: The fewest new crashes that emit a ``rate``
+            event
+        :param float alpha: The smoothing factor of the moving average crash
+            rate, between 0 and 1
+        :param int workers: The number of apps polled concurrently
+
+        """
+        self.applications = applications
+        self.app_ids = list(app_ids) if app_ids is not None else None
+        self.threshold = threshold
+        self.rate_factor = rate_factor
+        self.min_crashes = min_crashes
+        self.alpha = alpha
+        self.workers = workers
+        self._groups = {}
+        self._stop = threading.Event()
+
+    def poll(self):
+        """Poll every app once, returning the events for the crash groups
+        that changed since the previous poll.
+
+        :rtype: list
+
+        """
+        if self.app_ids is None:
+            self.app_ids = [value['public_identifier']
+                            for value in self.applications.list()]
+        for app_id in self.app_ids:
+            if app_id not in self._groups:
+                self._groups[app_id] = _Groups()
+        events = []
+        executor = futures.ThreadPoolExecutor(
+            max(min(self.workers, len(self.app_ids)), 1))
+        try:
+            for result in executor.map(self._poll_app, self.app_ids):
+                events.extend(result)
+        finally:
+            executor.shutdown()
+        return events
+
+    def run(self, callback=json_lines, interval=60, polls=None):
+        """Poll every app at an interval until stopped, passing each event to
+        a callback.
+
+        :param callable callback: Called with each :class:`Event`, writes the
+            events to standard output as JSON lines by default
+        :param float interval: The number of seconds between polls
+        :param int polls: The number of polls to run, forever by default
+
+        """
+        self._stop.clear()
+        count = 0
+        while not self._stop.is_set():
+            started = time.time()
+            for event in self.poll():
+                callback(event)
+            count += 1
+            if polls is not None and count >= polls:
+                break
+            self._stop.wait(max(interval - (time.time() - started), 0))
+
+    def stop(self):
+        """Stop :meth:`run` after the current poll"""
+        self._stop.set()
+
+    def _poll_app(self, app_id):
+        """Fetch the crash groups of an app that changed since its previous
+        poll and return their events. Errors are logged and polled again next
+        time.
+
+        :param str app_id: The app public identifier
+        :rtype: list
+
+        """
+        groups = self._groups[app_id]
+        now = time.time()
+        try:
+            changed = list(self._changed(app_id, groups.watermark))
+        except (api.APIError, ValueError,
+                requests.exceptions.RequestException) as error:
+            LOGGER.warning('Error polling crash groups for %s: %s', app_id,
+                           error)
+            return []
+        events = []
+        for group in changed:
+            event = self._update(app_id, groups, group, now)
+            if event:
+                events.append(event)
+        if changed:
+            groups.watermark = max(groups.watermark or '',
+                                   changed[0].get('last_crash_at') or '')
+        groups.polled = True
+        return events
+
+    def _changed(self, app_id, watermark):
+        """Yield the crash groups of an app that crashed at or after the
+        watermark, newest first, fetching only the pages that are needed.
+
+        :param str app_id: The app public identifier
+        :param str watermark: The newest last crash time of the previous
+            poll, or None to yield every group
+        :rtype: generator
+
+        """
+        application = self.applications.application(app_id)
+        offset = 1
+        while True:
+            page = application.crash_groups(
+                offset=offset, limit=PAGE_SIZE, order='desc',
+                sort=application.CRASH_SORT_LAST_CRASH)
+            for group in page.reasons:
+                if watermark and (group.get('last_crash_at') or '') < \
+                        watermark:
+                    return
+                yield group
+            if not page.reasons or offset >= (page.total_pages or 0):
+                return
+            offset += 1
+
+    def _update(self, app_id, groups, group, now):
+        """Update the counters of a crash group, returning an event if the
+        group is new or its new crashes are anomalous.
+
+        :param str app_id: The app public identifier
+        :param _Groups groups: The counters of the app's crash groups
+        :param dict group: The crash group returned by the API
+        :param float now: The time of the poll
+        :rtype: Event or None
+
+        """
+        crashes = int(group.get('number_of_crashes') or 0)
+        slot = groups.slot(group['id'])
+        if slot is None:
+            slot = groups.add(group['id'], crashes,
+                              _initial_rate(group, crashes), now)
+            if groups.polled:
+                return self._event(NEW, app_id, group, crashes, crashes,
+                                   None, None, now)
+            return None
+        new_crashes = crashes - groups.counts[slot]
+        if new_crashes <= 0:
+            return None
+        elapsed = max(now - groups.updated[slot], 1.0) / 60.0
+        rate = new_crashes / elapsed
+        expected = groups.rates[slot]
+        groups.counts[slot] = crashes
+        groups.updated[slot] = now
+        groups.rates[slot] = self.alpha * rate + (1 - self.alpha) * expected
+        if new_crashes >= self.threshold:
+            return self._event(THRESHOLD, app_id, group, crashes,
+                               new_crashes, rate, expected, now)
+        if new_crashes >= self.min_crashes and \
+                rate > self.rate_factor * expected:
+            return self._event(RATE, app_id, group, crashes, new_crashes,
+                               rate, expected, now)
+        return None
+
+    @staticmethod
+    def _event(kind, app_id, group, crashes, new_crashes, rate, expected,
+               now):
+        """Return an event for a crash group
+
+        :rtype: Event
+
+        """
+        return Event(kind, app_id, group['id'], group.get('reason'), crashes,
+                     new_crashes, rate, expected, group.get('last_crash_at'),
+                     now)
+
+
+class _Groups(object):
+    """The counters of the crash groups of one app, stored in parallel arrays
+    indexed by a slot for each group.
+
+    """
+    def __init__(self):
+        self.slots = {}
+        self.counts = array.array('l')
+        self.rates = array.array('d')
+        self.updated = array.array('d')
+        self.watermark = None
+        self.polled = False
+
+    def add(self, group_id, count, rate, now):
+        """Add a crash group, returning its slot
+
+        :param int group_id: The crash group id
+        :param int count: The number of crashes in the group
+        :param float rate: The initial crash rate per minute
+        :param float now: The time the group was seen
+        :rtype: int
+
+        """
+        slot = self.slots[group_id] = len(self.counts)
+        self.counts.append(count)
+        self.rates.append(rate)
+        self.updated.append(now)
+        return slot
+
+    def slot(self, group_id):
+        """Return the slot of a crash group, or None if it is new
+
+        :param int group_id: The crash group id
+        :rtype: int or None
+
+        """
+        return self.slots.get(group_id)
+
+
+def _initial_rate(group, crashes):
+    """Estimate the crash rate per minute of a group from its crash count and
+    the time between its first and last crash.
+
+    :param dict group: The crash group returned by the API
+    :param int crashes: The number of crashes in the group
+    :rtype: float
+
+    """
+    first = _timestamp(group.get('created_at'))
+    last = _timestamp(group.get('last_crash_at'))
+    if first is None or last is None:
+        return 0.0
+    return crashes / (max(last - first, 60.0) / 60.0)
+
+
+def _timestamp(value):
+    """Return the seconds since the epoch for an API timestamp
+
+    :param str value: The timestamp, such as ``2015-01-01T12:00:00Z``
+    :rtype: float or None
+
+    """
+    try:
+        return float(calendar.timegm(time.strptime(value, TIMESTAMP_FORMAT)))
+    except (TypeError, ValueError):
+        return None
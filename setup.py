@@ -5,6 +5,9 @@ from hockeyapp import __version__
 
 requirements = ['requests']
 tests_require = ['nose', 'mock', 'httmock']
+extras_require = {'aio': ['aiohttp'], 'analytics': ['numpy']}
+if sys.version_info < (3, 2, 0):
+    requirements.append('futures')
 if sys.version_info < (2, 7, 0):
     requirements.append('argparse')
     tests_require.append('unittest2')
@@ -25,6 +28,7 @@ setuptools.setup(name='hockeyapp',
                  package_data={'': ['LICENSE', 'README.md']},
                  include_package_data=True,
                  install_requires=requirements,
+                 extras_require=extras_require,
                  tests_require=tests_require,
                  test_suite='nose.collector',
                  license=open('LICENSE').read(),
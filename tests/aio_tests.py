@@ -0,0 +1,175 @@
+"""
+Test the asyncio Application classes
+
+"""
+import asyncio
+import json
+import unittest
+from urllib import parse
+
+import httmock
+
+from aiohttp import test_utils
+from aiohttp import web
+
+from hockeyapp import aio
+from hockeyapp import api
+from hockeyapp import app
+from hockeyapp import records
+
+
+class FakePool(object):
+
+    def __init__(self, status=200, body=None,
+                 content_type='application/json; charset=utf-8'):
+        self.requests = []
+        self.status = status
+        self.body = json.dumps(body or {}).encode('utf-8')
+        self.content_type = content_type
+
+    async def request(self, method, uri, **kwargs):
+        self.requests.append((method, uri, kwargs))
+        return self.status, self.content_type, uri, self.body
+
+
+class AsyncApplicationTestCase(unittest.IsolatedAsyncioTestCase):
+    TOKEN = 'abcdef0123456789abcdef0123456789'
+    APP_ID = '0123456789abcdef0123456789abcdef'
+
+    def application(self, pool):
+        return aio.AsyncApplication(self.TOKEN, self.APP_ID, pool)
+
+    def test_invalid_identifier_format(self):
+        self.assertRaises(ValueError, aio.AsyncApplication, self.TOKEN, 'foo')
+
+    async def test_list(self):
+        pool = FakePool(body={'apps': ['foo']})
+        applications = aio.AsyncApplications(self.TOKEN, pool)
+        self.assertEqual(await applications.list(), ['foo'])
+        self.assertEqual(pool.requests[0][1],
+                         'https://rink.hockeyapp.net/api/2/apps')
+
+    async def test_crash_groups(self):
+        pool = FakePool(body={'crash_reasons': [{'id': 1}],
+                              'total_entries': 1, 'total_pages': 1,
+                              'current_page': 1, 'per_page': 25})
+        result = await self.application(pool).crash_groups(offset=1)
+        self.assertEqual(result, app.CrashGroups([{'id': 1}], 1, 1, 1, 25))
+        method, uri, kwargs = pool.requests[0]
+        self.assertEqual(method, 'GET')
+        self.assertEqual(uri, 'https://rink.hockeyapp.net/api/2/apps/%s/'
+                              'crash_reasons' % self.APP_ID)
+        self.assertEqual(kwargs['data'], {'symbolication': '0',
+                                            'page': '1',
+                                            'per_page': '25',
+                                            'order': 'asc'})
+
+    async def test_crash_groups_sort(self):
+        pool = FakePool(body={'crash_reasons': []})
+        await self.application(pool).crash_groups(sort='last_crash_at',
+                                                  order='desc')
+        self.assertEqual(pool.requests[0][2]['data']['sort'],
+                         'last_crash_at')
+
+    async def test_get_encoding_matches_sync_client(self):
+        sent = {}
+
+        @httmock.all_requests
+        def response_content(url, request):
+            sent['sync'] = (url.query, request.body)
+            headers = {'content-type': 'application/json'}
+            return httmock.response(200, {'crash_reasons': []}, headers,
+                                    None, 5, request)
+
+        with httmock.HTTMock(response_content):
+            app.Application(self.TOKEN, self.APP_ID).crash_groups(offset=1)
+
+        async def handler(request):
+            sent['async'] = (request.query_string, await request.text())
+            return web.json_response({'crash_reasons': []})
+
+        server_app = web.Application()
+        server_app.router.add_get('/{tail:.*}', handler)
+        async with test_utils.TestServer(server_app) as server:
+            async with aio.AsyncConnectionPool() as pool:
+                application = self.application(pool)
+                application._build_uri = lambda parts: str(
+                    server.make_url('/' + '/'.join(parts)))
+                await application.crash_groups(offset=1)
+        self.assertEqual(sent['async'][0], sent['sync'][0])
+        self.assertEqual(parse.parse_qs(sent['async'][1]),
+                         parse.parse_qs(sent['sync'][1]))
+        self.assertIn('symbolication=0', sent['async'][1])
+
+    async def test_crash_groups_invalid_sort(self):
+        with self.assertRaises(ValueError):
+            await self.application(FakePool()).crash_groups(sort='foo')
+
+    async def test_crashes(self):
+        pool = FakePool(body={'crashes': [{'id': 2}], 'total_pages': 3})
+        result = await self.application(pool).crashes(10)
+        self.assertIsInstance(result, app.Crashes)
+        self.assertEqual(result.total_pages, 3)
+
+    async def test_records(self):
+        pool = FakePool(body={'crashes': [{'id': 2}],
+                              'app_versions': [{'id': 3}]})
+        application = self.application(pool)
+        self.assertEqual((await application.crashes(10)).crashes,
+                         [{'id': 2}])
+        self.assertIs(type((await application.versions())[0]), dict)
+        page = await application.crashes(10, as_records=True)
+        self.assertIsInstance(page.crashes[0], records.Crash)
+        versions = await application.versions(as_records=True)
+        self.assertEqual(versions[0].id, 3)
+
+    async def test_not_found_raises_api_error(self):
+        pool = FakePool(status=404, content_type='text/html')
+        with self.assertRaises(api.APIError):
+            await self.application(pool).statistics()
+
+    async def test_json_error_raises_api_error(self):
+        pool = FakePool(status=422, body={'errors': {'token': 'invalid'}})
+        with self.assertRaises(api.APIError) as context:
+            await self.application(pool).versions()
+        self.assertEqual(str(context.exception), '[token]: invalid')
+
+
+class AsyncPoolOwnershipTestCase(unittest.IsolatedAsyncioTestCase):
+    TOKEN = 'abcdef0123456789abcdef0123456789'
+
+    async def test_own_pool_closed(self):
+        async with aio.AsyncApplications(self.TOKEN) as applications:
+            session = applications.pool.session
+        self.assertTrue(session.closed)
+        self.assertIsNone(applications.pool._session)
+
+    async def test_shared_pool_left_open(self):
+        async with aio.AsyncConnectionPool() as pool:
+            async with aio.AsyncApplications(self.TOKEN, pool):
+                session = pool.session
+            self.assertFalse(session.closed)
+
+
+class AsyncConnectionPoolTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrency_is_bounded(self):
+        state = {'active': 0, 'peak': 0}
+
+        async def handler(request):
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+            await asyncio.sleep(0.01)
+            state['active'] -= 1
+            return web.json_response({'apps': []})
+
+        application = web.Application()
+        application.router.add_get('/', handler)
+        async with test_utils.TestServer(application) as server:
+            async with aio.AsyncConnectionPool(concurrency=2) as pool:
+                responses = await asyncio.gather(
+                    *[pool.request('GET', str(server.make_url('/')))
+                      for _ignore in range(10)])
+        self.assertEqual(state['peak'], 2)
+        self.assertEqual(responses[0][0], 200)
+        self.assertEqual(responses[0][3], b'{"apps": []}')
@@ -0,0 +1,197 @@
+"""
+Test the crash analytics
+
+"""
+import datetime
+
+import httmock
+import numpy
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from hockeyapp import analytics
+from hockeyapp import app
+
+
+class DateChunksTestCase(unittest.TestCase):
+
+    def test_chunks_cover_range(self):
+        chunks = analytics.date_chunks(datetime.date(2015, 1, 1),
+                                       datetime.date(2015, 3, 5), 31)
+        self.assertEqual(chunks, [
+            (datetime.date(2015, 1, 1), datetime.date(2015, 1, 31)),
+            (datetime.date(2015, 2, 1), datetime.date(2015, 3, 3)),
+            (datetime.date(2015, 3, 4), datetime.date(2015, 3, 5))])
+
+    def test_single_day(self):
+        day = datetime.date(2015, 1, 1)
+        self.assertEqual(analytics.date_chunks(day, day), [(day, day)])
+
+    def test_empty_range(self):
+        self.assertEqual(analytics.date_chunks(datetime.date(2015, 1, 2),
+                                               datetime.date(2015, 1, 1)), [])
+
+
+class FetchTestCase(unittest.TestCase):
+    TOKEN = 'abcdef0123456789abcdef0123456789'
+    APP_IDS = ['0123456789abcdef0123456789abcdef',
+               'fedcba9876543210fedcba9876543210',
+               '00000000000000000000000000000abc']
+
+    def setUp(self):
+        self.applications = app.Applications(self.TOKEN)
+        self.requests = []
+        self.failing = set()
+
+        @httmock.all_requests
+        def response_content(url, request):
+            self.requests.append(url)
+            headers = {'content-type': 'application/json'}
+            if url.path == '/api/2/apps':
+                content = {'apps': [{'public_identifier': app_id}
+                                    for app_id in self.APP_IDS]}
+                return httmock.response(200, content, headers, None, 5,
+                                        request)
+            app_id = url.path.split('/')[4]
+            if app_id == self.APP_IDS[2] or \
+                    (app_id, request.body) in self.failing:
+                return httmock.response(422, {'errors': {'app': 'invalid'}},
+                                        headers, None, 5, request)
+            if url.path.endswith('/histogram'):
+                query = dict(value.split('=') for value in
+                             request.body.split('&'))
+                start = datetime.datetime.strptime(query['start_date'],
+                                                   '%Y-%m-%d').date()
+                end = datetime.datetime.strptime(query['end_date'],
+                                                 '%Y-%m-%d').date()
+                days = (end - start).days + 1
+                content = {'histogram': [
+                    [(start + datetime.timedelta(days=day)).isoformat(),
+                     self.APP_IDS.index(app_id) + 1] for day in range(days)]}
+                return httmock.response(200, content, headers, None, 5,
+                                        request)
+            content = {'app_versions': [
+                {'id': 1, 'statistics': {'downloads': 10, 'installs': 8,
+                                         'crashes': 2}},
+                {'id': 2, 'statistics': {'downloads': 5, 'installs': 0,
+                                         'crashes': 0}}]}
+            return httmock.response(200, content, headers, None, 5, request)
+        self.mock = httmock.HTTMock(response_content)
+        self.mock.__enter__()
+        self.addCleanup(self.mock.__exit__, None, None, None)
+
+    def test_histograms_chunks_requests(self):
+        histogram = analytics.histograms(
+            self.applications, datetime.date(2015, 1, 1),
+            datetime.date(2015, 2, 9), self.APP_IDS[:2], chunk_days=10)
+        self.assertEqual(len(self.requests), 8)
+        self.assertEqual(len(histogram.days), 80)
+        self.assertEqual(histogram.per_app().tolist(), [40, 80])
+        self.assertEqual(histogram.errors, {})
+
+    def test_histograms_defaults_to_all_apps(self):
+        day = datetime.date(2015, 1, 1)
+        histogram = analytics.histograms(self.applications, day, day)
+        self.assertEqual(histogram.app_ids, self.APP_IDS)
+        self.assertEqual(histogram.per_app().tolist(), [1, 2, 0])
+
+    def test_histograms_errors_are_captured(self):
+        day = datetime.date(2015, 1, 1)
+        histogram = analytics.histograms(self.applications, day, day,
+                                         self.APP_IDS[1:])
+        self.assertEqual(list(histogram.errors), [self.APP_IDS[2]])
+        self.assertEqual(histogram.errors[self.APP_IDS[2]].status_code, 422)
+
+    def test_histograms_drop_apps_with_failed_chunks(self):
+        self.failing.add((self.APP_IDS[0],
+                          'start_date=2015-01-11&end_date=2015-01-20'))
+        histogram = analytics.histograms(
+            self.applications, datetime.date(2015, 1, 1),
+            datetime.date(2015, 1, 30), self.APP_IDS[:2], chunk_days=10)
+        self.assertEqual(list(histogram.errors), [self.APP_IDS[0]])
+        self.assertEqual(histogram.per_app().tolist(), [0, 60])
+        self.assertEqual(set(histogram.apps.tolist()), {1})
+
+    def test_statistics(self):
+        statistics = analytics.statistics(self.applications, self.APP_IDS)
+        self.assertEqual(statistics.versions.tolist(), [1, 2, 1, 2])
+        self.assertEqual(statistics.apps.tolist(), [0, 0, 1, 1])
+        self.assertEqual(list(statistics.errors), [self.APP_IDS[2]])
+        totals = statistics.per_app()
+        self.assertEqual(totals['downloads'].tolist(), [15, 15, 0])
+        self.assertEqual(totals['crash_free_rate'][0], 0.75)
+        self.assertTrue(numpy.isnan(totals['crash_free_rate'][2]))
+
+
+class CrashHistogramTestCase(unittest.TestCase):
+
+    def setUp(self):
+        days = numpy.arange(numpy.datetime64('2015-01-01'),
+                            numpy.datetime64('2015-01-22'))
+        crashes = numpy.full(len(days), 10, dtype=numpy.int64)
+        crashes[20] = 100
+        self.histogram = analytics.CrashHistogram(
+            ['a', 'b'], numpy.array([0] * len(days) + [1], dtype=numpy.int32),
+            numpy.concatenate([days, days[5:6]]),
+            numpy.concatenate([crashes, [3]]))
+
+    def test_matrix(self):
+        days, matrix = self.histogram.matrix()
+        self.assertEqual(matrix.shape, (2, 21))
+        self.assertEqual(days[0], numpy.datetime64('2015-01-01'))
+        self.assertEqual(matrix[1].tolist(), [0] * 5 + [3] + [0] * 15)
+
+    def test_duplicate_days_are_summed(self):
+        histogram = analytics.CrashHistogram(
+            ['a'], numpy.array([0, 0], dtype=numpy.int32),
+            numpy.array(['2015-01-01', '2015-01-01'], dtype='datetime64[D]'),
+            numpy.array([1, 2]))
+        self.assertEqual(histogram.matrix()[1].tolist(), [[3]])
+
+    def test_empty(self):
+        histogram = analytics.CrashHistogram(
+            ['a'], numpy.array([], dtype=numpy.int32),
+            numpy.array([], dtype='datetime64[D]'), numpy.array([]))
+        self.assertEqual(histogram.matrix()[1].shape, (1, 0))
+        self.assertEqual(histogram.anomalies(), [])
+        self.assertEqual(histogram.rolling_mean()[1].shape, (1, 0))
+
+    def test_per_day(self):
+        days, totals = self.histogram.per_day()
+        self.assertEqual(totals[5], 13)
+        self.assertEqual(totals.sum(), 303)
+
+    def test_rolling_mean(self):
+        days, means = self.histogram.rolling_mean(7)
+        self.assertEqual(days[0], numpy.datetime64('2015-01-07'))
+        self.assertEqual(means.shape, (2, 15))
+        self.assertEqual(means[0, 0], 10.0)
+        self.assertAlmostEqual(means[0, -1], 160 / 7.0)
+
+    def test_week_over_week(self):
+        days, change = self.histogram.week_over_week()
+        self.assertEqual(days[0], numpy.datetime64('2015-01-08'))
+        self.assertEqual(change[0, -1], 9.0)
+        self.assertEqual(change[0, 0], 0.0)
+        self.assertTrue(numpy.isnan(change[1, 0]))
+
+    def test_anomalies(self):
+        self.assertEqual(self.histogram.anomalies(), [
+            ('a', datetime.date(2015, 1, 21), 100, 90.0)])
+
+    def test_anomalies_minimum(self):
+        self.assertEqual(self.histogram.anomalies(minimum=101), [])
+
+
+class VersionStatisticsTestCase(unittest.TestCase):
+
+    def test_crash_free_rate(self):
+        statistics = analytics.VersionStatistics(
+            ['a'], numpy.zeros(3, dtype=numpy.int32), numpy.arange(3),
+            numpy.array([10, 10, 10]), numpy.array([10, 4, 0]),
+            numpy.array([1, 8, 0]))
+        rate = statistics.crash_free_rate()
+        self.assertEqual(rate[:2].tolist(), [0.9, 0.0])
+        self.assertTrue(numpy.isnan(rate[2]))
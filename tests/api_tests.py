@@ -2,6 +2,8 @@
 Test the base API classes
 
 """
+import threading
+
 import mock
 import httmock
 try:
@@ -38,6 +40,44 @@ class APIErrorTestCase(unittest.TestCase):
         self.assertEqual(str(value), expectation)
 
 
+class ConnectionPoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = api.ConnectionPool(size=2, per_host=4)
+
+    def test_session_is_reused_in_thread(self):
+        self.assertIs(self.pool.session, self.pool.session)
+
+    def test_session_per_thread(self):
+        sessions = []
+        thread = threading.Thread(
+            target=lambda: sessions.append(self.pool.session))
+        thread.start()
+        thread.join()
+        self.assertIsNot(sessions[0], self.pool.session)
+
+    def test_sessions_share_adapter(self):
+        sessions = []
+        thread = threading.Thread(
+            target=lambda: sessions.append(self.pool.session))
+        thread.start()
+        thread.join()
+        self.assertIs(sessions[0].get_adapter('https://rink.hockeyapp.net'),
+                      self.pool.session.get_adapter(
+                          'https://rink.hockeyapp.net'))
+
+    def test_per_host_limit(self):
+        adapter = self.pool.session.get_adapter('https://rink.hockeyapp.net')
+        self.assertEqual(adapter._pool_maxsize, 4)
+
+    def test_keep_alive_disabled(self):
+        pool = api.ConnectionPool(keep_alive=False)
+        self.assertEqual(pool.session.headers['Connection'], 'close')
+
+    def test_default_pool(self):
+        self.assertIs(api.default_pool(), api.default_pool())
+
+
 class APIRequestTestCase(unittest.TestCase):
 
     def setUp(self):
@@ -67,5 +107,61 @@ class APIRequestTestCase(unittest.TestCase):
         with httmock.HTTMock(response_content):
             self.assertEqual(self.api._get(['app_versions']), expectation)
 
+    def test_default_pool_is_shared(self):
+        other = api.APIRequest('abcdef0123456789abcdef0123456789')
+        self.assertIs(self.api.pool, other.pool)
 
+    def test_explicit_pool(self):
+        pool = api.ConnectionPool()
+        request = api.APIRequest('abcdef0123456789abcdef0123456789', pool)
+        self.assertIs(request.pool, pool)
 
+    def test_json_decoder_override(self):
+        @httmock.all_requests
+        def response_content(url, request):
+            return httmock.response(200, b'{"id": 1}',
+                                    {'content-type': 'application/json'},
+                                    None, 5, request)
+        self.api.json_decoder = mock.Mock(return_value={'id': 2})
+        with httmock.HTTMock(response_content):
+            self.assertEqual(self.api._get(['apps']), {'id': 2})
+        self.api.json_decoder.assert_called_once_with(b'{"id": 1}')
+
+
+class JSONDecoderTestCase(unittest.TestCase):
+    CONTENT = u'{"reason": "caf\u00e9", "ids": [1, 2]}'.encode('utf-8')
+
+    def tearDown(self):
+        api.set_json_decoder(api.json_decoder())
+
+    def test_installed_decoders(self):
+        for name in api.JSON_DECODERS:
+            try:
+                decoder = api.json_decoder(name)
+            except ValueError:
+                continue
+            self.assertEqual(decoder(self.CONTENT),
+                             {'reason': u'caf\u00e9', 'ids': [1, 2]})
+
+    def test_default_decoder(self):
+        self.assertEqual(api.json_decoder()(self.CONTENT)['ids'], [1, 2])
+
+    def test_unknown_decoder(self):
+        self.assertRaises(ValueError, api.json_decoder, 'yaml')
+
+    def test_missing_decoder(self):
+        with mock.patch('importlib.import_module', side_effect=ImportError):
+            self.assertRaises(ValueError, api.json_decoder, 'orjson')
+            self.assertIs(api.json_decoder(), api._stdlib_decode)
+
+    def test_invalid_json(self):
+        self.assertRaises(ValueError, api.json_decoder(), b'{"id":')
+        self.assertRaises(ValueError, api.json_decoder('json'), b'{"id":')
+
+    def test_set_json_decoder(self):
+        decoder = mock.Mock(return_value=[])
+        api.set_json_decoder(decoder)
+        request = api.APIRequest('abcdef0123456789abcdef0123456789')
+        self.assertEqual(request._decode(b'[1]'), [])
+        api.set_json_decoder('json')
+        self.assertEqual(request._decode(b'[1]'), [1])
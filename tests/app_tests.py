@@ -2,6 +2,16 @@
 Test the Application class
 
 """
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import warnings
+
 import mock
 import httmock
 try:
@@ -10,6 +20,8 @@ except ImportError:
     import unittest
 
 from hockeyapp import app
+from hockeyapp import crashes
+from hockeyapp import records
 
 
 class ApplicationTestCase(unittest.TestCase):
@@ -26,6 +38,26 @@ class ApplicationTestCase(unittest.TestCase):
     def test_invalid_identifier_format(self):
         self.assertRaises(ValueError, self.app._check_app_id, 'foo')
 
+    def version_data(self, **kwargs):
+        values = dict(notes=None, notes_type=None, notify=False, status=1,
+                      mandatory=None, tags=None, commit_sha=None,
+                      build_server_url=None, repository_url=None,
+                      release_type=None)
+        values.update(kwargs)
+        return self.app._version_data(**values)
+
+    def test_version_data(self):
+        self.assertEqual(self.version_data(notes='Notes', notify=True,
+                                           tags=['beta']),
+                         {'notes': 'Notes', 'notify': True, 'status': 1,
+                          'tags': ['beta']})
+
+    def test_version_data_invalid_value(self):
+        self.assertRaises(ValueError, self.version_data, status=3)
+
+    def test_version_data_invalid_type(self):
+        self.assertRaises(ValueError, self.version_data, tags='beta')
+
     @mock.patch.object(app.Applications, '_get')
     def test_list(self, get):
         self.applications.list()
@@ -39,9 +71,327 @@ class ApplicationTestCase(unittest.TestCase):
         application.statistics()
         get.assert_called_with(uri_parts=['apps', self.APP_IDENTIFIER, 'statistics'])
 
+    @mock.patch.object(app.Application, '_check_app_id')
+    @mock.patch.object(app.Application, '_get')
+    def test_users(self, get, _):
+        get.return_value = {'app_users': [{'id': 1, 'role': 0}]}
+        application = app.Application(self.TOKEN, app_id=self.APP_IDENTIFIER)
+        users = application.users()
+        get.assert_called_with(uri_parts=['apps', self.APP_IDENTIFIER,
+                                          'app_users'])
+        self.assertEqual(users, [{'id': 1, 'role': 0}])
+        users = application.users(as_records=True)
+        self.assertIsInstance(users[0], records.User)
+        self.assertEqual(users[0].role, 0)
+
+    @mock.patch.object(app.Application, '_check_app_id')
+    @mock.patch.object(app.Application, '_get')
+    def test_crash_groups_records(self, get, _):
+        get.return_value = {'crash_reasons': [{'id': 1, 'class': 'A'}],
+                            'total_entries': 1}
+        application = app.Application(self.TOKEN, app_id=self.APP_IDENTIFIER)
+        page = application.crash_groups(as_records=True)
+        self.assertIsInstance(page.reasons[0], records.CrashReason)
+        self.assertEqual(page.reasons, [{'id': 1, 'class': 'A'}])
+        self.assertEqual(page.total_entries, 1)
+
+    @mock.patch.object(app.Application, '_check_app_id')
+    @mock.patch.object(app.Application, '_get')
+    def test_crash_groups_dicts(self, get, _):
+        get.return_value = {'crash_reasons': [{'id': 1, 'class': 'A'}],
+                            'total_entries': 1}
+        application = app.Application(self.TOKEN, app_id=self.APP_IDENTIFIER)
+        page = application.crash_groups()
+        self.assertIs(page.reasons, get.return_value['crash_reasons'])
+        self.assertEqual(json.loads(json.dumps(page.reasons)),
+                         [{'id': 1, 'class': 'A'}])
+
+    @mock.patch.object(app.Application, '_check_app_id')
+    @mock.patch.object(app.Application, '_get')
+    def test_versions_dicts(self, get, _):
+        get.return_value = {'app_versions': [{'id': 1, 'version': '2'}]}
+        application = app.Application(self.TOKEN, app_id=self.APP_IDENTIFIER)
+        versions = application.versions()
+        versions[0]['title'] = 'App'
+        self.assertEqual(json.dumps(versions),
+                         json.dumps([{'id': 1, 'version': '2',
+                                      'title': 'App'}]))
+        self.assertIsInstance(application.versions(as_records=True)[0],
+                              records.Version)
+
+    @mock.patch.object(app.Application, '_get')
+    def test_crash_list_returns_dicts(self, get):
+        get.return_value = {'crash_reasons': [{'id': 1, 'class': 'A'}]}
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            reasons = crashes.CrashList(self.TOKEN, 'e' * 32, 1).execute()
+        self.assertEqual(str(reasons), str([{'id': 1, 'class': 'A'}]))
+
+    @mock.patch.object(app.Application, '_check_app_id')
+    @mock.patch.object(app.Application, '_get')
+    def test_iter_crashes_records(self, get, _):
+        get.return_value = {'crashes': [{'id': 1, 'model': 'iPhone'}],
+                            'total_pages': 1}
+        application = app.Application(self.TOKEN, app_id=self.APP_IDENTIFIER)
+        crashes = list(application.iter_crashes(1, prefetch=False,
+                                                as_records=True))
+        self.assertIsInstance(crashes[0], records.Crash)
+        self.assertEqual(crashes[0].model, 'iPhone')
+
     @mock.patch.object(app.Application, '_check_app_id')
     @mock.patch.object(app.Application, '_get')
     def test_verions(self, get, _):
         application = app.Application(self.TOKEN, app_id=self.APP_IDENTIFIER)
         application.versions()
         get.assert_called_with(uri_parts=['apps', self.APP_IDENTIFIER, 'app_versions'])
+
+
+class BulkTestCase(unittest.TestCase):
+    TOKEN = 'abcdef0123456789abcdef0123456789'
+    APP_IDS = ['0123456789abcdef0123456789abcdef',
+               'fedcba9876543210fedcba9876543210']
+
+    def setUp(self):
+        self.applications = app.Applications(self.TOKEN)
+
+        @httmock.all_requests
+        def response_content(url, request):
+            headers = {'content-type': 'application/json'}
+            if url.path == '/api/2/apps':
+                content = {'apps': [{'public_identifier': app_id}
+                                    for app_id in self.APP_IDS]}
+                return httmock.response(200, content, headers, None, 5,
+                                        request)
+            app_id = url.path.split('/')[4]
+            if app_id == self.APP_IDS[1]:
+                return httmock.response(422, {'errors': {'app': 'invalid'}},
+                                        headers, None, 5, request)
+            content = {'app_versions': [{'id': 1}],
+                       'app_version_statistics': [app_id]}
+            return httmock.response(200, content, headers, None, 5, request)
+        self.mock = httmock.HTTMock(response_content)
+        self.mock.__enter__()
+        self.addCleanup(self.mock.__exit__, None, None, None)
+
+    def test_bulk_versions(self):
+        results = self.applications.bulk_versions(self.APP_IDS[:1])
+        self.assertEqual(results, {self.APP_IDS[0]: app.BulkResult(
+            [{'id': 1}], None)})
+
+    def test_bulk_statistics_defaults_to_all_apps(self):
+        results = self.applications.bulk_statistics(workers=2)
+        self.assertEqual(sorted(results), sorted(self.APP_IDS))
+
+    def test_bulk_errors_are_captured(self):
+        results = self.applications.bulk_statistics(self.APP_IDS)
+        self.assertIsNone(results[self.APP_IDS[0]].error)
+        self.assertIsNone(results[self.APP_IDS[1]].result)
+        self.assertEqual(results[self.APP_IDS[1]].error.status_code, 422)
+
+    def test_bulk_invalid_app_id_is_captured(self):
+        results = self.applications.bulk_versions(['foo'])
+        self.assertIsInstance(results['foo'].error, ValueError)
+
+    def test_bulk_crash_groups_arguments(self):
+        with mock.patch.object(app.Application, 'crash_groups') as method:
+            self.applications.bulk_crash_groups(self.APP_IDS[:1], limit=100)
+        method.assert_called_once_with(limit=100)
+
+    def test_bulk_shares_connection_pool(self):
+        with mock.patch.object(app.Application, 'versions',
+                               autospec=True) as method:
+            self.applications.bulk_versions(self.APP_IDS)
+        for call in method.call_args_list:
+            self.assertIs(call[0][0].pool, self.applications.pool)
+
+    def test_bulk_empty(self):
+        self.assertEqual(self.applications.bulk_versions([]), {})
+
+
+class DeleteVersionsTestCase(unittest.TestCase):
+    TOKEN = 'abcdef0123456789abcdef0123456789'
+    APP_ID = '0123456789abcdef0123456789abcdef'
+    VERSIONS = [{'id': id_, 'version': str(id_), 'timestamp': id_,
+                 'appsize': 100} for id_ in range(1, 11)]
+
+    def setUp(self):
+        self.app = app.Application(self.TOKEN, self.APP_ID)
+        self.deleted = []
+
+        @httmock.all_requests
+        def response_content(url, request):
+            headers = {'content-type': 'application/json'}
+            if request.method == 'GET':
+                return httmock.response(200, {'app_versions': self.VERSIONS},
+                                        headers, None, 5, request)
+            version_id = url.path.split('/')[-1]
+            if version_id == '3':
+                return httmock.response(422, {'errors': {'id': 'invalid'}},
+                                        headers, None, 5, request)
+            self.deleted.append((version_id, request.body))
+            return httmock.response(200, {}, headers, None, 5, request)
+        self.mock = httmock.HTTMock(response_content)
+        self.mock.__enter__()
+        self.addCleanup(self.mock.__exit__, None, None, None)
+
+    def test_delete_version(self):
+        self.assertTrue(self.app.delete_version(5))
+        self.assertEqual(self.deleted, [('5', None)])
+
+    def test_delete_version_purge(self):
+        self.app.delete_version(5, purge=True)
+        self.assertEqual(self.deleted, [('5', 'strategy=purge')])
+
+    def test_delete_multiple_versions(self):
+        results = self.app.delete_multiple_versions(keep=6, workers=2)
+        self.assertEqual(list(results), [1, 2, 3, 4])
+        self.assertEqual(sorted(value for value, _body in self.deleted),
+                         ['1', '2', '4'])
+        self.assertEqual(results[1].result['id'], 1)
+        self.assertEqual(results[3].error.status_code, 422)
+
+    def test_delete_multiple_versions_dry_run(self):
+        results = self.app.delete_multiple_versions(number=3, dry_run=True)
+        self.assertEqual(list(results), [1, 2, 3])
+        self.assertEqual(self.deleted, [])
+
+    def test_delete_multiple_versions_storage(self):
+        results = self.app.delete_multiple_versions(storage_percentage=75,
+                                                    sort='date')
+        self.assertEqual(list(results), [1, 2, 3])
+
+
+class DownloadCrashTestCase(unittest.TestCase):
+    TOKEN = 'abcdef0123456789abcdef0123456789'
+    APP_ID = '0123456789abcdef0123456789abcdef'
+    LOG = b'Incident Identifier: 1\n' * 1000
+
+    def setUp(self):
+        self.app = app.Application(self.TOKEN, self.APP_ID)
+        self.requests = []
+
+        @httmock.all_requests
+        def response_content(url, request):
+            self.requests.append(request)
+            if url.path.endswith('/404'):
+                return httmock.response(404, b'', {}, None, 5, request)
+            return httmock.response(200, self.LOG,
+                                    {'content-type': 'text/plain'},
+                                    None, 5, request)
+        self.mock = httmock.HTTMock(response_content)
+        self.mock.__enter__()
+        self.addCleanup(self.mock.__exit__, None, None, None)
+
+    def test_download_to_file_object(self):
+        sink = io.BytesIO()
+        self.assertEqual(self.app.download_crash(1, sink, chunk_size=100),
+                         len(self.LOG))
+        self.assertEqual(sink.getvalue(), self.LOG)
+        self.assertEqual(self.requests[0].url,
+                         'https://rink.hockeyapp.net/api/2/apps/%s/crashes/1'
+                         % self.APP_ID)
+
+    def test_download_to_path(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        path = os.path.join(root, 'crash.log')
+        self.app.download_crash(1, path)
+        with open(path, 'rb') as handle:
+            self.assertEqual(handle.read(), self.LOG)
+
+    def test_download_compressed(self):
+        sink = io.BytesIO()
+        self.app.download_crash(1, sink, compress=True)
+        self.assertLess(len(sink.getvalue()), len(self.LOG))
+        self.assertEqual(gzip.GzipFile(fileobj=io.BytesIO(
+            sink.getvalue())).read(), self.LOG)
+
+    def test_download_description_format(self):
+        self.app.download_crash(1, io.BytesIO(), format='text')
+        self.assertEqual(self.requests[0].body, 'format=text')
+
+    def test_download_invalid_format(self):
+        self.assertRaises(ValueError, self.app.download_crash, 1,
+                          io.BytesIO(), format='json')
+
+    def test_download_error(self):
+        sink = io.BytesIO()
+        self.assertRaises(app.api.APIError, self.app.download_crash,
+                          404, sink)
+        self.assertEqual(sink.getvalue(), b'')
+
+
+class IterPagesTestCase(unittest.TestCase):
+    TOKEN = 'abcdef0123456789abcdef0123456789'
+    APP_ID = '0123456789abcdef0123456789abcdef'
+
+    def setUp(self):
+        self.app = app.Application(self.TOKEN, self.APP_ID)
+
+    def crash_groups(self, total_pages, per_page=2):
+        def side_effect(offset, limit, **kwargs):
+            return app.CrashGroups(
+                [offset * 10 + i for i in range(per_page)],
+                total_pages * per_page, total_pages, offset, limit)
+        return mock.Mock(side_effect=side_effect)
+
+    def test_iter_crash_groups_all_pages(self):
+        for prefetch in (True, False):
+            with mock.patch.object(self.app, 'crash_groups',
+                                   self.crash_groups(3)) as method:
+                self.assertEqual(list(self.app.iter_crash_groups(
+                    limit=2, prefetch=prefetch)), [10, 11, 20, 21, 30, 31])
+                self.assertEqual(method.call_count, 3)
+                method.assert_called_with(offset=3, limit=2, version_id=None,
+                                          symbolicated=False, order='asc',
+                                          sort=None)
+
+    def test_iter_crash_groups_parallel_ordered(self):
+        with mock.patch.object(self.app, 'crash_groups',
+                               self.crash_groups(10)) as method:
+            self.assertEqual(list(self.app.iter_crash_groups(limit=2,
+                                                             workers=4)),
+                             [p * 10 + i for p in range(1, 11)
+                              for i in range(2)])
+            self.assertEqual(method.call_count, 10)
+
+    def test_iter_crash_groups_parallel_unordered(self):
+        with mock.patch.object(self.app, 'crash_groups',
+                               self.crash_groups(10)):
+            self.assertEqual(sorted(self.app.iter_crash_groups(
+                limit=2, workers=4, ordered=False)),
+                [p * 10 + i for p in range(1, 11) for i in range(2)])
+
+    def test_iter_crashes_parallel_fetches_concurrently(self):
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+
+        def crashes(offset, limit, reason_id):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.02)
+            with lock:
+                state['active'] -= 1
+            return app.Crashes([offset], 8, 8, offset, limit)
+
+        with mock.patch.object(self.app, 'crashes', side_effect=crashes):
+            self.assertEqual(list(self.app.iter_crashes('1', workers=4)),
+                             list(range(1, 9)))
+        self.assertEqual(state['peak'], 4)
+
+    def test_iter_crashes_early_termination(self):
+        with mock.patch.object(self.app, 'crashes') as method:
+            method.side_effect = lambda offset, limit, reason_id: app.Crashes(
+                [offset], 100, 100, offset, limit)
+            iterator = self.app.iter_crashes('1', prefetch=False)
+            self.assertEqual(next(iterator), 1)
+            self.assertEqual(next(iterator), 2)
+            iterator.close()
+            self.assertEqual(method.call_count, 2)
+
+    def test_iter_feedback_empty(self):
+        with mock.patch.object(self.app, 'feedback') as method:
+            method.return_value = app.Feedback([], 0, 0, 0, 0)
+            self.assertEqual(list(self.app.iter_feedback()), [])
+            method.assert_called_once_with(offset=1, limit=100, order='asc')
@@ -0,0 +1,153 @@
+"""
+Test the response caches
+
+"""
+import os
+import shutil
+import tempfile
+import time
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import httmock
+import mock
+
+from hockeyapp import api
+from hockeyapp import cache
+
+
+class CacheKeyTestCase(unittest.TestCase):
+
+    def test_parameter_order_is_ignored(self):
+        self.assertEqual(cache.cache_key('t', 'u', {'a': 1, 'b': 2}),
+                         cache.cache_key('t', 'u', {'b': 2, 'a': 1}))
+
+    def test_token_is_part_of_key(self):
+        self.assertNotEqual(cache.cache_key('t1', 'u'),
+                            cache.cache_key('t2', 'u'))
+
+
+class MemoryCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = self.new_cache()
+
+    def new_cache(self):
+        return cache.MemoryCache(ttl=10, max_entries=2)
+
+    def entry(self, content=b'{}'):
+        return cache.new_entry(content, 'application/json', '"etag"',
+                               None, self.cache.ttl)
+
+    def test_get_missing(self):
+        self.assertIsNone(self.cache.get('missing'))
+
+    def test_set_and_get(self):
+        entry = self.entry(b'{"apps": []}')
+        self.cache.set('key', entry)
+        self.assertEqual(self.cache.get('key'), entry)
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.set('a', self.entry())
+        time.sleep(0.01)
+        self.cache.set('b', self.entry())
+        time.sleep(0.01)
+        self.cache.get('a')
+        time.sleep(0.01)
+        self.cache.set('c', self.entry())
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('c'))
+
+    def test_clear(self):
+        self.cache.set('a', self.entry())
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('a'))
+
+
+class DiskCacheTestCase(MemoryCacheTestCase):
+
+    def new_cache(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        return cache.DiskCache(self.path, ttl=10, max_entries=2)
+
+    def test_shared_between_instances(self):
+        entry = self.entry(b'{"apps": []}')
+        self.cache.set('key', entry)
+        self.assertEqual(cache.DiskCache(self.path).get('key'), entry)
+
+    def test_clear_keeps_other_files(self):
+        other = os.path.join(self.path, 'notes.txt')
+        with open(other, 'w') as handle:
+            handle.write('keep')
+        self.cache.set('a', self.entry())
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('a'))
+        self.assertTrue(os.path.exists(other))
+
+    def test_other_files_are_not_evicted(self):
+        other = os.path.join(self.path, 'notes.txt')
+        with open(other, 'w') as handle:
+            handle.write('keep')
+        for key in ('a', 'b', 'c'):
+            self.cache.set(key, self.entry())
+        self.assertTrue(os.path.exists(other))
+
+    def test_directory_listed_only_to_count_and_evict(self):
+        with mock.patch('os.listdir', side_effect=os.listdir) as listdir:
+            self.cache.set('a', self.entry())
+            self.cache.set('a', self.entry())
+            self.cache.set('b', self.entry())
+            self.assertEqual(listdir.call_count, 1)
+            self.cache.set('c', self.entry())
+            self.assertEqual(listdir.call_count, 2)
+
+
+class CachedRequestTestCase(unittest.TestCase):
+    TOKEN = 'abcdef0123456789abcdef0123456789'
+
+    def setUp(self):
+        self.cache = cache.MemoryCache(ttl=60)
+        self.request = api.APIRequest(self.TOKEN, cache=self.cache)
+        self.calls = []
+
+    def server(self, status=200, etag='"v1"'):
+        @httmock.all_requests
+        def response(url, request):
+            self.calls.append(request)
+            headers = {'content-type': 'application/json; charset=utf-8',
+                       'etag': etag}
+            content = {'apps': ['foo']} if status == 200 else None
+            return httmock.response(status, content, headers, None, 5,
+                                    request)
+        return httmock.HTTMock(response)
+
+    def test_fresh_response_is_served_from_cache(self):
+        with self.server():
+            self.assertEqual(self.request._get(['apps']), {'apps': ['foo']})
+            self.assertEqual(self.request._get(['apps']), {'apps': ['foo']})
+        self.assertEqual(len(self.calls), 1)
+
+    def test_parameters_are_cached_separately(self):
+        with self.server():
+            self.request._get(['apps'], {'page': 1})
+            self.request._get(['apps'], {'page': 2})
+        self.assertEqual(len(self.calls), 2)
+
+    def test_expired_response_is_revalidated(self):
+        with self.server():
+            self.request._get(['apps'])
+        key = list(self.cache._entries)[0]
+        self.cache.set(key, self.cache.get(key)._replace(expires=0))
+        with self.server(status=304):
+            self.assertEqual(self.request._get(['apps']), {'apps': ['foo']})
+        self.assertEqual(self.calls[-1].headers['If-None-Match'], '"v1"')
+        self.assertGreater(self.cache.get(key).expires, time.time())
+
+    def test_errors_are_not_cached(self):
+        with self.server(status=404):
+            self.assertRaises(api.APIError, self.request._get, ['apps'])
+        self.assertEqual(len(self.cache._entries), 0)
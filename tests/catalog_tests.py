@@ -0,0 +1,135 @@
+"""
+Test the version catalog
+
+"""
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import mock
+
+from hockeyapp import app
+from hockeyapp import catalog
+from hockeyapp import records
+
+
+class SemverKeyTestCase(unittest.TestCase):
+
+    def test_ordering(self):
+        values = ['1.10.0', '1.2.0', '1.2.0-beta.2', '1.2.0-beta.10',
+                  '1.2.0-alpha', '1.2', 'v2.0.0', 'nightly', '1.2.1+5']
+        self.assertEqual(sorted(values, key=catalog.semver_key), [
+            'nightly', '1.2.0-alpha', '1.2.0-beta.2', '1.2.0-beta.10',
+            '1.2.0', '1.2', '1.2.1+5', '1.10.0', 'v2.0.0'])
+
+    def test_missing(self):
+        self.assertLess(catalog.semver_key(None), catalog.semver_key('0.0.1'))
+
+
+class VersionCatalogTestCase(unittest.TestCase):
+    VERSIONS = [
+        {'id': 1, 'version': '100', 'shortversion': '1.0.0', 'timestamp': 10,
+         'status': 2},
+        {'id': 2, 'version': '101', 'shortversion': '1.0.0', 'timestamp': 20,
+         'status': 2},
+        {'id': 3, 'version': '120', 'shortversion': '1.2.0-beta.1',
+         'timestamp': 30, 'status': 1},
+        {'id': 4, 'version': '110', 'shortversion': '1.1.0', 'timestamp': 40,
+         'status': 2},
+        {'id': 5, 'version': '130', 'shortversion': '1.10.0',
+         'timestamp': 50, 'status': 1}]
+
+    def setUp(self):
+        self.application = mock.Mock(spec=app.Application)
+        self.application.versions.return_value = [
+            dict(value) for value in self.VERSIONS]
+        self.catalog = catalog.VersionCatalog(self.application)
+
+    @staticmethod
+    def ids(records):
+        return [record.id for record in records]
+
+    def test_fetches_versions(self):
+        self.application.versions.assert_called_once_with()
+        self.assertEqual(len(self.catalog), 5)
+
+    def test_get(self):
+        self.assertEqual(self.catalog.get(3).shortversion, '1.2.0-beta.1')
+        self.assertIsNone(self.catalog.get(42))
+        self.assertIn(3, self.catalog)
+
+    def test_shortversion(self):
+        self.assertEqual(self.ids(self.catalog.shortversion('1.0.0')), [2, 1])
+
+    def test_build(self):
+        self.assertEqual(self.ids(self.catalog.build(110)), [4])
+
+    def test_status(self):
+        self.assertEqual(self.ids(self.catalog.status(1)), [5, 3])
+
+    def test_between(self):
+        self.assertEqual(self.ids(self.catalog.between(20, 40)), [2, 3, 4])
+        self.assertEqual(self.catalog.between(60, 70), [])
+
+    def test_newest(self):
+        self.assertEqual(self.ids(self.catalog), [5, 4, 3, 2, 1])
+
+    def test_ordered(self):
+        self.assertEqual(self.ids(self.catalog.ordered()), [1, 2, 4, 3, 5])
+
+    def test_latest(self):
+        self.assertEqual(self.catalog.latest().id, 5)
+        self.assertEqual(self.catalog.latest(status=2).id, 4)
+        self.assertIsNone(self.catalog.latest(status=3))
+
+    def test_newer_than(self):
+        self.assertEqual(self.ids(self.catalog.newer_than('1.1.0')), [3, 5])
+        self.assertEqual(self.ids(self.catalog.newer_than('0.1')),
+                         [1, 2, 4, 3, 5])
+
+    def test_records_use_slots(self):
+        self.assertIsInstance(self.catalog.get(1), records.Version)
+        self.assertFalse(hasattr(self.catalog.get(1), '__dict__'))
+
+    def test_keeps_version_records(self):
+        versions = records.records(records.Version, self.VERSIONS)
+        self.application.versions.return_value = versions
+        self.assertEqual(self.catalog.refresh(), (0, 0, 0))
+        catalog_ = catalog.VersionCatalog(self.application)
+        self.assertIs(catalog_.get(1), versions[0])
+
+    def test_refresh(self):
+        versions = [dict(value) for value in self.VERSIONS[1:]]
+        versions[0]['status'] = 1
+        versions.append({'id': 6, 'version': '140', 'shortversion': '2.0.0',
+                         'timestamp': 60, 'status': 2})
+        self.application.versions.return_value = versions
+        self.assertEqual(self.catalog.refresh(), (1, 1, 1))
+        self.assertNotIn(1, self.catalog)
+        self.assertEqual(self.ids(self.catalog.status(1)), [5, 3, 2])
+        self.assertEqual(self.ids(self.catalog.shortversion('1.0.0')), [2])
+        self.assertEqual(self.catalog.latest().id, 6)
+        self.assertEqual(self.ids(self.catalog), [6, 5, 4, 3, 2])
+
+    def test_refresh_unchanged(self):
+        self.assertEqual(self.catalog.refresh(), (0, 0, 0))
+
+
+class CatalogsTestCase(unittest.TestCase):
+    TOKEN = 'abcdef0123456789abcdef0123456789'
+    APP_IDS = ['0123456789abcdef0123456789abcdef',
+               'fedcba9876543210fedcba9876543210']
+
+    def test_catalogs(self):
+        applications = app.Applications(self.TOKEN)
+        results = {self.APP_IDS[0]: app.BulkResult(
+                       VersionCatalogTestCase.VERSIONS, None),
+                   self.APP_IDS[1]: app.BulkResult(None, ValueError())}
+        with mock.patch.object(applications, 'bulk_versions',
+                               return_value=results):
+            values = catalog.catalogs(applications)
+        self.assertEqual(list(values), [self.APP_IDS[0]])
+        self.assertEqual(len(values[self.APP_IDS[0]]), 5)
+        self.assertEqual(values[self.APP_IDS[0]].application._app_id,
+                         self.APP_IDS[0])
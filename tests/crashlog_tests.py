@@ -0,0 +1,34 @@
+"""
+Test the CrashLog request object
+
+"""
+import io
+
+import mock
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from hockeyapp import app
+from hockeyapp import crashlog
+
+
+class CrashLogTestCase(unittest.TestCase):
+    TOKEN = 'abcdef0123456789abcdef0123456789'
+    APP_ID = '0123456789abcdef0123456789abcdef'
+
+    def setUp(self):
+        self.crash_log = crashlog.CrashLog(self.TOKEN, self.APP_ID, 42, 'text')
+
+    @mock.patch.object(app.Application, 'download_crash')
+    def test_download(self, download):
+        sink = io.BytesIO()
+        self.crash_log.download(sink, True)
+        download.assert_called_once_with(42, sink, 'text', True, 65536)
+
+    @mock.patch.object(app.Application, 'download_crash')
+    def test_execute(self, download):
+        download.side_effect = \
+            lambda crash_id, sink, *args: sink.write(b'Crash \xe2\x9c\x97')
+        self.assertEqual(self.crash_log.execute(), u'Crash \u2717')
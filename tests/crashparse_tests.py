@@ -0,0 +1,188 @@
+"""
+Test crash log parsing
+
+"""
+import io
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from hockeyapp import crashparse
+
+APPLE_LOG = """Incident Identifier: 6156848E-344E-4D9E-84E0-87AFD0D0AE7B
+CrashReporter Key:   76f2fb60060d6a7f814973377cbdc866fffd521f
+Hardware Model:      iPhone10,3
+Process:         MyApp [3596]
+Parent Process:  launchd [1]
+Identifier:      net.hockeyapp.MyApp
+Version:         1.0 (12)
+Code Type:       ARM-64
+OS Version:      iPhone OS 13.3 (17C54)
+Exception Type:  EXC_CRASH (SIGABRT)
+Exception Codes: 0x0000000000000000, 0x0000000000000000
+Crashed Thread:  0
+
+Application Specific Information:
+*** Terminating app due to uncaught exception 'NSInvalidArgumentException', \
+reason: '-[Foo bar]: unrecognized selector sent to instance 0x281a6c000'
+
+Last Exception Backtrace:
+0   CoreFoundation                	0x1a2b3c4d5 __exceptionPreprocess + 224
+1   libobjc.A.dylib               	0x1a2b3c4d6 objc_exception_throw + 56
+2   MyApp                         	0x100f1c2a4 -[ViewController tap:] \
++ 123 (ViewController.m:42)
+3   MyApp                         	0x100f1c2a8 0x100ef0000 + 180904
+4   UIKitCore                     	0x1a6d1e2c4 -[UIApplication \
+sendAction:to:from:forEvent:] + 96
+
+Thread 0 name:  Dispatch queue: com.apple.main-thread
+Thread 0 Crashed:
+0   libsystem_kernel.dylib        	0x00000001b9c2fec4 __pthread_kill + 8
+1   libsystem_pthread.dylib       	0x00000001b9b4f724 pthread_kill + 216
+
+Thread 1:
+0   libsystem_kernel.dylib        	0x00000001b9c0b000 mach_msg_trap + 8
+
+Binary Images:
+0x100ef0000 - 0x100fbffff MyApp arm64  <a1b2c3d4e5f60718293a4b5c6d7e8f90> \
+/var/containers/Bundle/Application/MyApp.app/MyApp
+0x1b9c0b000 - 0x1b9c33fff libsystem_kernel.dylib arm64e  \
+<A0B1C2D3-E4F5-0617-2839-4A5B6C7D8E9F> /usr/lib/system/libsystem_kernel.dylib
+""".replace('\\\n', '')
+
+ANDROID_LOG = """Package: net.hockeyapp.myapp
+Version Code: 12
+Version Name: 1.0
+Android: 9
+Manufacturer: Google
+Model: Pixel 3
+Date: Mon Jan 06 10:00:00 GMT 2020
+
+java.lang.IllegalStateException: Could not execute method for android:onClick
+	at android.view.View$DeclaredOnClickListener.onClick(View.java:5610)
+	at com.example.MainActivity.lambda$onCreate$0(MainActivity.java:42)
+	at com.example.MainActivity$1.run(Unknown Source)
+	at java.lang.Thread.run(Thread.java:764)
+Caused by: java.lang.NullPointerException
+	at com.example.Foo.bar(Foo.java:10)
+	... 3 more
+"""
+
+
+class AppleTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.report = crashparse.parse_string(APPLE_LOG)
+
+    def test_platform(self):
+        self.assertEqual(self.report.platform, crashparse.APPLE)
+
+    def test_headers(self):
+        self.assertEqual(self.report.headers['Identifier'],
+                         'net.hockeyapp.MyApp')
+        self.assertNotIn('Parent Process', self.report.headers)
+
+    def test_exception(self):
+        self.assertEqual(self.report.exception_type, 'EXC_CRASH (SIGABRT)')
+        self.assertTrue(self.report.exception_reason.startswith(
+            'NSInvalidArgumentException: -[Foo bar]'))
+        self.assertEqual(self.report.crashed_thread, '0')
+
+    def test_last_exception_backtrace_frames(self):
+        self.assertEqual(len(self.report.frames), 5)
+        self.assertEqual(self.report.frames[2], crashparse.Frame(
+            'MyApp', '-[ViewController tap:]', 0x100f1c2a4, 123,
+            'ViewController.m', 42))
+
+    def test_unsymbolicated_frame(self):
+        frame = self.report.frames[3]
+        self.assertIsNone(frame.symbol)
+        self.assertEqual(frame.offset, 180904)
+
+    def test_crashed_thread_frames_without_backtrace(self):
+        report = crashparse.parse_string(
+            APPLE_LOG.replace('Last Exception Backtrace:', 'Other:'))
+        self.assertEqual([frame.symbol for frame in report.frames],
+                         ['__pthread_kill', 'pthread_kill'])
+
+    def test_compact_backtrace(self):
+        report = crashparse.parse_string(
+            'Exception Type:  EXC_CRASH (SIGABRT)\n\n'
+            'Last Exception Backtrace:\n(0x1a2b 0x1a2c 0x1a2d)\n')
+        self.assertEqual([frame.address for frame in report.frames],
+                         [0x1a2b, 0x1a2c, 0x1a2d])
+
+    def test_binary_images(self):
+        self.assertEqual(len(self.report.binary_images), 2)
+        image = self.report.binary_images[1]
+        self.assertEqual(image.start, 0x1b9c0b000)
+        self.assertEqual(image.arch, 'arm64e')
+        self.assertEqual(image.uuid, 'a0b1c2d3e4f5061728394a5b6c7d8e9f')
+
+    def test_parse_bytes_lines(self):
+        report = crashparse.parse(
+            io.BytesIO(APPLE_LOG.encode('utf-8')))
+        self.assertEqual(report, self.report)
+
+
+class AndroidTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.report = crashparse.parse_string(ANDROID_LOG)
+
+    def test_platform(self):
+        self.assertEqual(self.report.platform, crashparse.ANDROID)
+        self.assertEqual(self.report.headers['Version Code'], '12')
+
+    def test_exception(self):
+        self.assertEqual(self.report.exception_type,
+                         'java.lang.IllegalStateException')
+        self.assertEqual(self.report.exception_reason,
+                         'Could not execute method for android:onClick')
+
+    def test_frames_of_first_exception(self):
+        self.assertEqual(len(self.report.frames), 4)
+        self.assertEqual(self.report.frames[1], crashparse.Frame(
+            'com.example.MainActivity',
+            'com.example.MainActivity.lambda$onCreate$0', None, None,
+            'MainActivity.java', 42))
+
+    def test_frame_without_line(self):
+        self.assertIsNone(self.report.frames[2].line)
+
+
+class SignatureTestCase(unittest.TestCase):
+
+    def test_stable_across_builds(self):
+        first = crashparse.parse_string(APPLE_LOG)
+        second = crashparse.parse_string(
+            APPLE_LOG.replace('0x100f1c2a4', '0x100f2d3b5')
+                     .replace('tap:] + 123 (ViewController.m:42)',
+                              'tap:] + 140 (ViewController.m:45)'))
+        self.assertEqual(crashparse.signature(first),
+                         crashparse.signature(second))
+
+    def test_differs_by_frames(self):
+        first = crashparse.parse_string(APPLE_LOG)
+        second = crashparse.parse_string(APPLE_LOG.replace('tap:', 'press:'))
+        self.assertNotEqual(crashparse.signature(first),
+                            crashparse.signature(second))
+
+    def test_ignored_frames_are_skipped(self):
+        report = crashparse.parse_string(APPLE_LOG)
+        self.assertEqual(crashparse.signature(report, depth=1),
+                         crashparse.signature(report._replace(
+                             frames=report.frames[2:]), depth=1))
+
+    def test_frame_key_normalizes_generated_names(self):
+        key = crashparse.frame_key(crashparse.Frame(
+            'com.example.MainActivity$1',
+            'com.example.MainActivity$1.lambda$onCreate$12', None, None,
+            None, None))
+        self.assertEqual(key, 'com.example.MainActivity$1!'
+                              'com.example.MainActivity$.lambda$onCreate')
+
+    def test_frame_key_unsymbolicated(self):
+        self.assertEqual(crashparse.frame_key(crashparse.Frame(
+            'MyApp', None, 0x100f1c2a8, 180904, None, None)), 'MyApp')
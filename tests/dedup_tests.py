@@ -0,0 +1,260 @@
+"""
+Test upload deduplication
+
+"""
+import hashlib
+import io
+import os
+import shutil
+import sqlite3
+import struct
+import tempfile
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import httmock
+import mock
+
+from hockeyapp import app
+from hockeyapp import dedup
+
+
+def macho(uuid, padding=b''):
+    """Return a 64-bit Mach-O file with only an LC_UUID load command"""
+    command = struct.pack('<II', 0x1b, 24) + bytes(bytearray.fromhex(uuid))
+    return struct.pack('<IiiIIIII', 0xfeedfacf, 0x0100000c, 0, 0xa, 1,
+                       len(command), 0, 0) + command + padding
+
+
+def touch_later(path):
+    """Move the modification time of a file forward, as a rebuild would"""
+    stamp = os.path.getmtime(path) + 10
+    os.utime(path, (stamp, stamp))
+
+
+class ContentKeyTestCase(unittest.TestCase):
+    UUID = 'a1b2c3d4e5f60718293a4b5c6d7e8f90'
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def bundle(self, name, data):
+        path = os.path.join(self.root, name, 'Contents', 'Resources',
+                            'DWARF')
+        os.makedirs(path)
+        with open(os.path.join(path, 'App'), 'wb') as handle:
+            handle.write(data)
+        return os.path.join(self.root, name)
+
+    def test_bundle_key_is_uuids(self):
+        self.assertEqual(dedup.content_key(self.bundle('App.app.dSYM',
+                                                       macho(self.UUID))),
+                         'uuid:' + self.UUID)
+
+    def test_bundle_key_ignores_other_contents(self):
+        first = self.bundle('A.dSYM', macho(self.UUID, b'one'))
+        second = self.bundle('B.dSYM', macho(self.UUID, b'two'))
+        self.assertEqual(dedup.content_key(first),
+                         dedup.content_key(second))
+
+    def test_bundle_without_macho_is_hashed(self):
+        first = self.bundle('A.dSYM', b'dwarf')
+        second = self.bundle('B.dSYM', b'other')
+        self.assertNotEqual(dedup.content_key(first),
+                            dedup.content_key(second))
+        self.assertEqual(len(dedup.content_key(first)), 64)
+
+    def test_file_key_is_digest(self):
+        path = os.path.join(self.root, 'mapping.txt')
+        with open(path, 'wb') as handle:
+            handle.write(b'mapping')
+        self.assertEqual(dedup.content_key(path),
+                         hashlib.sha256(b'mapping').hexdigest())
+
+
+class SignatureTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.path = os.path.join(self.root, 'App.ipa')
+        with open(self.path, 'wb') as handle:
+            handle.write(b'ipa')
+
+    def test_file_signature_is_stable(self):
+        self.assertEqual(dedup.signature(self.path),
+                         dedup.signature(self.path))
+
+    def test_file_signature_changes_with_file(self):
+        value = dedup.signature(self.path)
+        with open(self.path, 'ab') as handle:
+            handle.write(b'more')
+        self.assertNotEqual(dedup.signature(self.path), value)
+
+    def test_bundle_signature_changes_with_contents(self):
+        value = dedup.signature(self.root)
+        with open(os.path.join(self.root, 'DWARF'), 'wb') as handle:
+            handle.write(b'dwarf')
+        self.assertNotEqual(dedup.signature(self.root), value)
+
+
+class HashingReaderTestCase(unittest.TestCase):
+
+    def test_digest(self):
+        reader = dedup.HashingReader(io.BytesIO(b'x' * 1000))
+        while reader.read(7):
+            pass
+        self.assertEqual(reader.digest.hexdigest(),
+                         hashlib.sha256(b'x' * 1000).hexdigest())
+
+
+class UploadIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.index = dedup.UploadIndex()
+
+    def test_record_and_lookup(self):
+        self.index.record('app', 'build', 'dsym', 'abc', 'sig')
+        self.assertEqual(self.index.digest('sig'), 'abc')
+        self.assertTrue(self.index.uploaded('app', 'dsym', 'abc'))
+        self.assertTrue(self.index.uploaded('app', 'dsym', 'abc', 'build'))
+        self.assertFalse(self.index.uploaded('app', 'dsym', 'abc', 'other'))
+        self.assertFalse(self.index.uploaded('other', 'dsym', 'abc'))
+
+    def test_size_uploaded(self):
+        self.index.record('app', 'build', 'ipa', 'abc', 'sig', 1024)
+        self.assertTrue(self.index.size_uploaded('app', 'ipa', 1024))
+        self.assertFalse(self.index.size_uploaded('app', 'ipa', 2048))
+        self.assertFalse(self.index.size_uploaded('app', 'dsym', 1024))
+
+    def test_index_without_sizes_is_migrated(self):
+        path = os.path.join(tempfile.mkdtemp(), 'uploads.db')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        connection = sqlite3.connect(path)
+        connection.execute('CREATE TABLE uploads (app_id TEXT, version TEXT, '
+                           'kind TEXT, sha256 TEXT, uploaded_at REAL)')
+        connection.close()
+        index = dedup.UploadIndex(path)
+        index.record('app', 'build', 'ipa', 'abc', 'sig', 1024)
+        self.assertTrue(index.size_uploaded('app', 'ipa', 1024))
+        index.close()
+
+
+class DeduplicatedUploadTestCase(unittest.TestCase):
+    TOKEN = 'abcdef0123456789abcdef0123456789'
+    APP_ID = '0123456789abcdef0123456789abcdef'
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.ipa = self.write('App.ipa', b'ipa' * 1000)
+        self.mapping = self.write('mapping.txt', b'mapping' * 1000)
+        self.index = dedup.UploadIndex()
+        self.app = app.Application(self.TOKEN, self.APP_ID)
+        self.bodies = []
+
+    def write(self, name, data):
+        path = os.path.join(self.root, name)
+        with open(path, 'wb') as handle:
+            handle.write(data)
+        return path
+
+    def upload(self, *args):
+        @httmock.all_requests
+        def response(url, request):
+            self.bodies.append(b''.join(request.body))
+            headers = {'content-type': 'application/json; charset=utf-8'}
+            return httmock.response(201, {'public_identifier': self.APP_ID},
+                                    headers, None, 5, request)
+
+        with httmock.HTTMock(response):
+            return self.app.upload(*args, index=self.index)
+
+    def test_first_upload_is_recorded(self):
+        self.upload(self.ipa, self.mapping)
+        digest = hashlib.sha256(b'ipa' * 1000).hexdigest()
+        self.assertEqual(self.index.digest(dedup.signature(self.ipa)), digest)
+        self.assertTrue(self.index.uploaded(self.APP_ID, 'ipa', digest))
+
+    def test_identical_upload_is_skipped(self):
+        self.upload(self.ipa, self.mapping)
+        self.assertEqual(self.upload(self.ipa, self.mapping), self.APP_ID)
+        self.assertEqual(len(self.bodies), 1)
+
+    def test_changed_dsym_is_uploaded_alone(self):
+        self.upload(self.ipa, self.mapping)
+        self.write('mapping.txt', b'changed' * 2000)
+        self.upload(self.ipa, self.mapping)
+        self.assertEqual(len(self.bodies), 2)
+        self.assertNotIn(b'name="ipa"', self.bodies[1])
+        self.assertIn(b'name="dsym"', self.bodies[1])
+
+    def test_dsym_only_upload_is_skipped(self):
+        self.upload(None, self.mapping)
+        self.upload(None, self.mapping)
+        self.assertEqual(len(self.bodies), 1)
+
+    def test_dsym_bundle_digest(self):
+        bundle = os.path.join(self.root, 'App.app.dSYM')
+        os.mkdir(bundle)
+        self.write(os.path.join('App.app.dSYM', 'DWARF'), b'dwarf')
+        self.upload(None, bundle)
+        self.upload(None, bundle)
+        self.assertEqual(len(self.bodies), 1)
+
+    def test_rebuilt_dsym_is_skipped(self):
+        bundle = os.path.join(self.root, 'App.app.dSYM')
+        dwarf = os.path.join(bundle, 'Contents', 'Resources', 'DWARF')
+        os.makedirs(dwarf)
+        uuid = 'a1b2c3d4e5f60718293a4b5c6d7e8f90'
+        self.write(os.path.join(dwarf, 'App'), macho(uuid))
+        self.upload(self.ipa, bundle)
+        self.write(os.path.join(dwarf, 'App'), macho(uuid))
+        touch_later(os.path.join(dwarf, 'App'))
+        self.assertEqual(self.upload(self.ipa, bundle), self.APP_ID)
+        self.upload(None, bundle)
+        self.assertEqual(len(self.bodies), 1)
+
+    def test_rebuilt_mapping_is_skipped(self):
+        self.upload(self.ipa, self.mapping)
+        self.write('mapping.txt', b'mapping' * 1000)
+        touch_later(self.mapping)
+        self.upload(None, self.mapping)
+        self.assertEqual(len(self.bodies), 1)
+
+    def test_rebuilt_dsym_is_sent_with_new_build(self):
+        self.upload(self.ipa, self.mapping)
+        self.write('App.ipa', b'new build' * 1000)
+        touch_later(self.mapping)
+        self.upload(self.ipa, self.mapping)
+        self.assertEqual(len(self.bodies), 2)
+        self.assertIn(b'name="dsym"', self.bodies[1])
+
+    def test_rebuilt_ipa_is_skipped(self):
+        self.upload(self.ipa, self.mapping)
+        self.write('App.ipa', b'ipa' * 1000)
+        touch_later(self.ipa)
+        self.assertEqual(self.upload(self.ipa, self.mapping), self.APP_ID)
+        self.assertEqual(len(self.bodies), 1)
+
+    def test_new_files_are_hashed_while_uploaded(self):
+        self.upload(self.ipa, self.mapping)
+        self.write('App.ipa', b'new build' * 1000)
+        self.write('mapping.txt', b'new mapping' * 1000)
+        with mock.patch('hockeyapp.dedup.content_key') as content_key:
+            self.upload(self.ipa, self.mapping)
+            content_key.assert_not_called()
+        self.assertEqual(len(self.bodies), 2)
+        digest = hashlib.sha256(b'new mapping' * 1000).hexdigest()
+        self.assertTrue(self.index.uploaded(self.APP_ID, 'dsym', digest))
+
+    def test_same_size_is_hashed_before_upload(self):
+        self.upload(self.ipa, self.mapping)
+        self.write('App.ipa', b'api' * 1000)
+        touch_later(self.ipa)
+        self.upload(self.ipa, self.mapping)
+        self.assertEqual(len(self.bodies), 2)
+        self.assertIn(b'apiapi', self.bodies[1])
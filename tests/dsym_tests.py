@@ -0,0 +1,120 @@
+"""
+Test the dSYM packaging helpers
+
+"""
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import mock
+
+from hockeyapp import dsym
+
+
+class BundleTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.bundle = os.path.join(self.root, 'App.app.dSYM')
+        dwarf = os.path.join(self.bundle, 'Contents', 'Resources', 'DWARF')
+        os.makedirs(dwarf)
+        with open(os.path.join(self.bundle, 'Contents', 'Info.plist'),
+                  'wb') as handle:
+            handle.write(b'<plist/>')
+        with open(os.path.join(dwarf, 'App'), 'wb') as handle:
+            handle.write(os.urandom(100000) + b'\0' * 400000)
+
+    def archive(self, stream):
+        return zipfile.ZipFile(io.BytesIO(stream.read()))
+
+
+class ZipStreamTestCase(BundleTestCase):
+
+    def test_archive_contents(self):
+        archive = self.archive(dsym.ZipStream(self.bundle, chunk_size=1024))
+        self.assertEqual(sorted(archive.namelist()),
+                         ['App.app.dSYM/Contents/Info.plist',
+                          'App.app.dSYM/Contents/Resources/DWARF/App'])
+        self.assertEqual(archive.read('App.app.dSYM/Contents/Info.plist'),
+                         b'<plist/>')
+        self.assertIsNone(archive.testzip())
+
+    def test_store_only(self):
+        archive = self.archive(dsym.ZipStream(self.bundle, compress_level=0))
+        self.assertTrue(all(info.compress_type == zipfile.ZIP_STORED
+                            for info in archive.infolist()))
+
+    def test_compressed(self):
+        archive = self.archive(dsym.ZipStream(self.bundle, compress_level=9))
+        info = archive.getinfo('App.app.dSYM/Contents/Resources/DWARF/App')
+        self.assertEqual(info.compress_type, zipfile.ZIP_DEFLATED)
+        self.assertLess(info.compress_size, info.file_size)
+
+    def test_chunked_reads(self):
+        stream = dsym.ZipStream(self.bundle, chunk_size=4096)
+        chunks = []
+        chunk = stream.read(1000)
+        while chunk:
+            self.assertLessEqual(len(chunk), 1000)
+            chunks.append(chunk)
+            chunk = stream.read(1000)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+        self.assertIsNone(archive.testzip())
+
+    def test_close_early(self):
+        stream = dsym.ZipStream(self.bundle, chunk_size=1024, queue_size=1)
+        stream.read(10)
+        stream.close()
+        self.assertFalse(stream._thread.is_alive())
+        self.assertEqual(stream.read(10), b'')
+
+    def test_invalid_compress_level(self):
+        self.assertRaises(ValueError, dsym.ZipStream, self.bundle, 10)
+
+    def test_parallel(self):
+        archive = self.archive(dsym.ZipStream(self.bundle, workers=4))
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(len(archive.namelist()), 2)
+
+
+class PackTestCase(BundleTestCase):
+
+    def pack(self, **kwargs):
+        destination = os.path.join(self.root, 'App.app.dSYM.zip')
+        size = dsym.pack(self.bundle, destination, **kwargs)
+        self.assertEqual(size, os.path.getsize(destination))
+        return zipfile.ZipFile(destination)
+
+    def test_matches_serial_archive(self):
+        serial = self.archive(dsym.ZipStream(self.bundle))
+        parallel = self.pack(workers=3, block_size=4096)
+        self.assertIsNone(parallel.testzip())
+        self.assertEqual(sorted(parallel.namelist()),
+                         sorted(serial.namelist()))
+        for name in serial.namelist():
+            self.assertEqual(parallel.read(name), serial.read(name))
+
+    def test_store_only_pack(self):
+        archive = self.pack(compress_level=0, workers=2)
+        self.assertIsNone(archive.testzip())
+        self.assertTrue(all(info.compress_type == zipfile.ZIP_STORED
+                            for info in archive.infolist()))
+
+    def test_empty_file(self):
+        open(os.path.join(self.bundle, 'empty'), 'wb').close()
+        archive = self.pack(workers=2)
+        self.assertEqual(archive.read('App.app.dSYM/empty'), b'')
+
+    def test_zip64(self):
+        with mock.patch.object(zipfile, 'ZIP64_LIMIT', 100):
+            destination = os.path.join(self.root, 'App.app.dSYM.zip')
+            dsym.pack(self.bundle, destination, workers=2, block_size=4096)
+        archive = zipfile.ZipFile(destination)
+        self.assertIsNone(archive.testzip())
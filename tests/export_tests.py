@@ -0,0 +1,163 @@
+"""
+Test crash log export
+
+"""
+import os
+import shutil
+import tarfile
+import tempfile
+import zipfile
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import mock
+
+from hockeyapp import api
+from hockeyapp import app
+from hockeyapp import export
+
+
+class CrashPathTestCase(unittest.TestCase):
+
+    def test_sharded(self):
+        self.assertRegex(export.crash_path(123),
+                         r'^[0-9a-f]{2}/[0-9a-f]{2}/123\.log$')
+
+    def test_description_compressed(self):
+        self.assertTrue(export.crash_path(123, 'text', True)
+                        .endswith('/123.txt.gz'))
+
+    def test_stable(self):
+        self.assertEqual(export.crash_path(123), export.crash_path(123))
+
+
+class ExporterTestCase(unittest.TestCase):
+    TOKEN = 'abcdef0123456789abcdef0123456789'
+    APP_ID = '0123456789abcdef0123456789abcdef'
+    CRASHES = {1: [{'id': 10}, {'id': 11}], 2: [{'id': 20}]}
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.application = app.Application(self.TOKEN, self.APP_ID)
+        for name, value in (
+                ('iter_crash_groups', lambda: iter([{'id': 1}, {'id': 2}])),
+                ('iter_crashes', lambda reason_id: iter(
+                    self.CRASHES[reason_id])),
+                ('download_crash', self.download_crash)):
+            patcher = mock.patch.object(self.application, name,
+                                        side_effect=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def download_crash(crash_id, sink, format, compress, chunk_size):
+        if crash_id == 99:
+            raise api.APIError({'404': 'URL Not Found'}, 404)
+        if crash_id == 98:
+            raise IOError('Connection reset')
+        if crash_id == 97:
+            sink.write(b'x' * (export.SPOOL_SIZE + 1))
+            return export.SPOOL_SIZE + 1
+        data = ('%s %s' % (format, crash_id)).encode('utf-8')
+        sink.write(data)
+        return len(data)
+
+    def test_export_directory(self):
+        destination = os.path.join(self.root, 'crashes')
+        stats = export.Exporter(self.application, destination,
+                                ('log', 'text')).export()
+        self.assertEqual((stats.crashes, stats.skipped, stats.errors),
+                         (3, 0, 0))
+        with open(os.path.join(destination,
+                               export.crash_path(11, 'text'))) as handle:
+            self.assertEqual(handle.read(), 'text 11')
+
+    def test_skips_exported_crashes(self):
+        destination = os.path.join(self.root, 'crashes')
+        export.Exporter(self.application, destination).export()
+        self.application.download_crash.reset_mock()
+        stats = export.Exporter(self.application, destination).export()
+        self.assertEqual((stats.crashes, stats.skipped), (0, 3))
+        self.assertFalse(self.application.download_crash.called)
+
+    def test_errors_are_counted(self):
+        self.CRASHES = {1: [{'id': 10}, {'id': 99}], 2: []}
+        destination = os.path.join(self.root, 'crashes')
+        progress = mock.Mock()
+        stats = export.Exporter(self.application, destination,
+                                workers=1).export(progress)
+        self.assertEqual((stats.crashes, stats.errors), (1, 1))
+        self.assertEqual(progress.call_count, 2)
+        self.assertFalse(os.path.exists(os.path.join(
+            destination, export.crash_path(99))))
+
+    def test_crash_group_errors_are_counted(self):
+        def iter_crashes(reason_id):
+            if reason_id == 1:
+                raise api.APIError({'500': 'Internal Server Error'}, 500)
+            return iter(self.CRASHES[reason_id])
+
+        self.application.iter_crashes.side_effect = iter_crashes
+        destination = os.path.join(self.root, 'crashes')
+        stats = export.Exporter(self.application, destination).export()
+        self.assertEqual((stats.crashes, stats.errors), (1, 1))
+        self.assertTrue(os.path.exists(os.path.join(
+            destination, export.crash_path(20))))
+
+    def test_crash_group_list_errors_are_counted(self):
+        def iter_crash_groups():
+            yield {'id': 2}
+            raise api.APIError({'503': 'Service Unavailable'}, 503)
+
+        self.application.iter_crash_groups.side_effect = iter_crash_groups
+        destination = os.path.join(self.root, 'crashes')
+        stats = export.Exporter(self.application, destination).export()
+        self.assertEqual((stats.crashes, stats.errors), (1, 1))
+
+    def test_export_zip(self):
+        destination = os.path.join(self.root, 'crashes.zip')
+        export.Exporter(self.application, destination).export()
+        self.CRASHES = {1: [{'id': 12}], 2: [{'id': 20}]}
+        stats = export.Exporter(self.application, destination).export()
+        self.assertEqual((stats.crashes, stats.skipped), (1, 1))
+        with zipfile.ZipFile(destination) as archive:
+            self.assertEqual(len(archive.namelist()), 4)
+            self.assertEqual(archive.read(export.crash_path(12)), b'log 12')
+
+    def test_unexpected_errors_are_counted(self):
+        self.CRASHES = {1: [{'id': 10}, {'id': 98}], 2: [{'id': 20}]}
+        destination = os.path.join(self.root, 'crashes.zip')
+        stats = export.Exporter(self.application, destination,
+                                workers=1).export()
+        self.assertEqual((stats.crashes, stats.errors), (2, 1))
+        with zipfile.ZipFile(destination) as archive:
+            self.assertEqual(sorted(archive.namelist()),
+                             sorted([export.crash_path(10),
+                                     export.crash_path(20)]))
+
+    def test_export_zip_streams_files(self):
+        self.CRASHES = {1: [{'id': 97}], 2: []}
+        for streaming in (True, False):
+            destination = os.path.join(self.root, '%s.zip' % streaming)
+            with mock.patch('hockeyapp.export.ZIP_STREAMING', streaming):
+                with mock.patch.object(zipfile.ZipFile, 'writestr') as \
+                        writestr:
+                    export.Exporter(self.application, destination).export()
+                self.assertFalse(writestr.called)
+            with zipfile.ZipFile(destination) as archive:
+                self.assertEqual(archive.read(export.crash_path(97)),
+                                 b'x' * (export.SPOOL_SIZE + 1))
+
+    def test_export_tar(self):
+        destination = os.path.join(self.root, 'crashes.tar')
+        export.Exporter(self.application, destination).export()
+        with tarfile.open(destination) as archive:
+            self.assertEqual(archive.extractfile(
+                export.crash_path(20)).read(), b'log 20')
+
+    def test_invalid_format(self):
+        self.assertRaises(ValueError, export.Exporter, self.application,
+                          self.root, ('json',))
@@ -0,0 +1,176 @@
+"""
+Test the incremental parsing of JSON arrays
+
+"""
+import json
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import httmock
+
+from hockeyapp import api
+from hockeyapp import app
+from hockeyapp import jsonstream
+from hockeyapp import records
+
+
+def chunked(content, size):
+    return [content[offset:offset + size]
+            for offset in range(0, len(content), size)]
+
+
+class ItemsTestCase(unittest.TestCase):
+    ITEMS = [{'title': 'say "hi" \\', 'tags': ['a', {'b': ']}'}],
+              'name': u'caf\u00e9 \u2603'},
+             1, -2.5e3, True, False, None, 'x\\"y', [], {}, [[1], [2]]]
+    DOCUMENT = {'status': 'success',
+                'meta': {'apps': [1, {'nested': '"[{'}]}, 'note': '\\',
+                'apps': ITEMS,
+                'after': [1, 2]}
+
+    def setUp(self):
+        self.content = json.dumps(self.DOCUMENT,
+                                  ensure_ascii=False).encode('utf-8')
+
+    def test_chunk_boundaries(self):
+        for size in (1, 2, 3, 5, 8, 13, 64, len(self.content)):
+            self.assertEqual(list(jsonstream.items(chunked(self.content, size),
+                                                   'apps')),
+                             self.ITEMS, size)
+
+    def test_top_level_array(self):
+        content = json.dumps(self.ITEMS, indent=2).encode('utf-8')
+        for size in (1, 7, len(content)):
+            self.assertEqual(list(jsonstream.items(chunked(content, size))),
+                             self.ITEMS)
+
+    def test_whitespace(self):
+        content = b' {\n "apps" :\t[ 1 ,\r\n {"a" : [ ] } ] }\n'
+        self.assertEqual(list(jsonstream.items(chunked(content, 2), 'apps')),
+                         [1, {'a': []}])
+
+    def test_empty_array(self):
+        self.assertEqual(list(jsonstream.items([b'{"apps": [ ]}'], 'apps')),
+                         [])
+
+    def test_missing_key(self):
+        self.assertEqual(list(jsonstream.items([self.content], 'versions')),
+                         [])
+        self.assertEqual(list(jsonstream.items([b'{}'], 'apps')), [])
+
+    def test_escaped_key(self):
+        content = b'{"a\\"pps": [1], "apps": [2]}'
+        self.assertEqual(list(jsonstream.items(chunked(content, 3), 'apps')),
+                         [2])
+
+    def test_items_yielded_before_end(self):
+        chunks = iter([b'{"apps": [{"id": 1}, ', b'{"id": 2}'])
+        items = jsonstream.items(chunks, 'apps')
+        self.assertEqual(next(items), {'id': 1})
+        self.assertEqual(next(items), {'id': 2})
+        self.assertRaises(ValueError, next, items)
+
+    def test_rest_of_document_not_read(self):
+        chunks = iter([b'{"apps": [1]', b', "after": '])
+        self.assertEqual(list(jsonstream.items(chunks, 'apps')), [1])
+        self.assertEqual(next(chunks), b', "after": ')
+
+    def test_truncated(self):
+        content = json.dumps({'apps': self.ITEMS}).encode('utf-8')
+        for offset in range(len(content) - 1):
+            with self.assertRaises(ValueError):
+                list(jsonstream.items([content[:offset]], 'apps'))
+
+    def test_invalid(self):
+        for content in (b'[1 2]', b'{"apps" [1]}', b'{"a": 1 "apps": [1]}',
+                        b'{"apps": {}}', b'"apps"'):
+            with self.assertRaises(ValueError):
+                list(jsonstream.items([content], 'apps'))
+
+    def test_decode(self):
+        self.assertEqual(list(jsonstream.items([b'[1, "a"]'],
+                                               decode=bytes.upper)),
+                         [b'1', b'"A"'])
+
+    def test_buffer_bounded(self):
+        item = json.dumps({'id': 1, 'title': 'x' * 100}).encode('utf-8')
+        chunks = chunked(b'[' + b','.join([item] * 1000) + b']', 64)
+        items = jsonstream.items(chunks)
+        for _item in items:
+            buffer = items.gi_frame.f_locals['reader']._buffer
+            self.assertLess(len(buffer), len(item) + 128)
+
+
+class StreamTestCase(unittest.TestCase):
+    TOKEN = 'abcdef0123456789abcdef0123456789'
+    APP_ID = '0123456789abcdef0123456789abcdef'
+    MISSING_APP_ID = 'f' * 32
+    TEXT_APP_ID = 'e' * 32
+    APPS = [{'public_identifier': '%032x' % value, 'title': 'App %i' % value}
+            for value in range(1, 4)]
+    VERSIONS = [{'id': value, 'version': str(value), 'title': 'App',
+                 'timestamp': value} for value in range(1, 6)]
+
+    def setUp(self):
+        self.requests = []
+
+        @httmock.all_requests
+        def response_content(url, request):
+            self.requests.append(url.path)
+            headers = {'content-type': 'application/json'}
+            if url.path.endswith('/%s/app_versions' % self.MISSING_APP_ID):
+                return httmock.response(422, {'errors': {'app': 'invalid'}},
+                                        headers, None, 5, request)
+            if url.path.endswith('/%s/app_versions' % self.TEXT_APP_ID):
+                return httmock.response(200, b'[]', {}, None, 5, request)
+            if url.path.endswith('app_versions'):
+                return httmock.response(200, {'status': 'success',
+                                              'app_versions': self.VERSIONS},
+                                        headers, None, 5, request)
+            return httmock.response(200, {'status': 'success',
+                                          'apps': self.APPS},
+                                    headers, None, 5, request)
+        self.mock = httmock.HTTMock(response_content)
+        self.mock.__enter__()
+        self.addCleanup(self.mock.__exit__, None, None, None)
+
+    def test_list(self):
+        apps = app.Applications(self.TOKEN).list(stream=True)
+        self.assertEqual(self.requests, [])
+        self.assertEqual(list(apps), self.APPS)
+        self.assertEqual(self.requests, ['/api/2/apps'])
+
+    def test_versions(self):
+        versions = list(app.Application(self.TOKEN,
+                                        self.APP_ID).versions(stream=True))
+        self.assertEqual(versions, self.VERSIONS)
+        self.assertIs(type(versions[0]), dict)
+
+    def test_versions_records(self):
+        versions = list(app.Application(self.TOKEN, self.APP_ID).versions(
+            stream=True, as_records=True))
+        self.assertEqual(versions, self.VERSIONS)
+        self.assertIsInstance(versions[0], records.Version)
+
+    def test_versions_decoder(self):
+        application = app.Application(self.TOKEN, self.APP_ID)
+        decoded = []
+
+        def decode(content):
+            decoded.append(content)
+            return json.loads(content.decode('utf-8'))
+        application.json_decoder = decode
+        self.assertEqual(len(list(application.versions(stream=True))), 5)
+        self.assertEqual(len(decoded), 5)
+
+    def test_api_error(self):
+        application = app.Application(self.TOKEN, self.MISSING_APP_ID)
+        with self.assertRaises(api.APIError):
+            list(application.versions(stream=True))
+
+    def test_not_json(self):
+        application = app.Application(self.TOKEN, self.TEXT_APP_ID)
+        with self.assertRaises(ValueError):
+            list(application.versions(stream=True))
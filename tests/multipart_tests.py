@@ -0,0 +1,168 @@
+"""
+Test the streaming multipart encoder
+
+"""
+import io
+import os
+import shutil
+import tempfile
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import httmock
+
+from hockeyapp import app
+from hockeyapp import multipart
+
+
+class Unseekable(object):
+
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+
+    def read(self, size=-1):
+        return self._stream.read(size)
+
+
+class MultipartEncoderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.progress = []
+        self.encoder = multipart.MultipartEncoder(
+            {'notes': 'Hello', 'tags': ['a', 'b'], 'notify': True},
+            {'ipa': ('app.ipa', io.BytesIO(b'x' * 1000))},
+            chunk_size=64,
+            callback=lambda sent, total: self.progress.append((sent, total)))
+
+    def test_length_matches_body(self):
+        length = self.encoder.len
+        self.assertEqual(len(b''.join(self.encoder)), length)
+
+    def test_chunks_are_bounded(self):
+        self.assertTrue(all(len(chunk) <= 64 for chunk in self.encoder))
+
+    def test_body(self):
+        body = b''.join(self.encoder).decode('utf-8')
+        boundary = self.encoder.boundary
+        self.assertIn('--%s\r\nContent-Disposition: form-data; name="notes"'
+                      '\r\n\r\nHello\r\n' % boundary, body)
+        self.assertEqual(body.count('name="tags"'), 2)
+        self.assertIn('name="notify"\r\n\r\n1\r\n', body)
+        self.assertIn('name="ipa"; filename="app.ipa"\r\nContent-Type: '
+                      'application/octet-stream\r\n\r\n%s\r\n' % ('x' * 1000),
+                      body)
+        self.assertTrue(body.endswith('--%s--\r\n' % boundary))
+
+    def test_progress(self):
+        total = self.encoder.len
+        list(self.encoder)
+        self.assertEqual(self.progress[-1], (total, total))
+        self.assertEqual([sent for sent, _ in self.progress],
+                         sorted(sent for sent, _ in self.progress))
+
+    def test_unknown_length(self):
+        encoder = multipart.MultipartEncoder(
+            files={'dsym': ('app.dSYM.zip', Unseekable(b'y' * 100))})
+        self.assertIsNone(encoder.len)
+        self.assertIn(b'y' * 100, b''.join(encoder))
+
+    def test_content_type(self):
+        self.assertEqual(self.encoder.content_type,
+                         'multipart/form-data; boundary=%s' %
+                         self.encoder.boundary)
+
+
+class UploadTestCase(unittest.TestCase):
+    TOKEN = 'abcdef0123456789abcdef0123456789'
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.ipa')
+        os.write(handle, b'z' * 200000)
+        os.close(handle)
+        self.addCleanup(os.unlink, self.path)
+
+    def upload(self, *args, **kwargs):
+        requests = []
+
+        @httmock.all_requests
+        def response(url, request):
+            requests.append((request.headers, b''.join(request.body)))
+            headers = {'content-type': 'application/json; charset=utf-8'}
+            return httmock.response(201, {'public_identifier': 'abc'},
+                                    headers, None, 5, request)
+
+        with httmock.HTTMock(response):
+            app.Application(self.TOKEN).upload(*args, **kwargs)
+        return requests[0]
+
+    def test_upload_streams_dsym_bundle(self):
+        bundle = tempfile.mkdtemp(suffix='.dSYM')
+        self.addCleanup(shutil.rmtree, bundle)
+        with open(os.path.join(bundle, 'DWARF'), 'wb') as handle:
+            handle.write(b'dwarf' * 1000)
+        headers, body = self.upload(self.path, bundle, dsym_compress_level=0)
+        self.assertEqual(headers['Transfer-Encoding'], 'chunked')
+        self.assertIn(('filename="%s.zip"' %
+                       os.path.basename(bundle)).encode('utf-8'), body)
+        self.assertIn(b'dwarf' * 1000, body)
+
+    def test_upload_streams_file(self):
+        requests = []
+        progress = []
+
+        @httmock.all_requests
+        def response(url, request):
+            requests.append((request.headers, b''.join(request.body)))
+            headers = {'content-type': 'application/json; charset=utf-8'}
+            return httmock.response(201, {'public_identifier': 'abc'},
+                                    headers, None, 5, request)
+
+        with httmock.HTTMock(response):
+            application = app.Application(self.TOKEN)
+            result = application.upload(
+                self.path, notes='Notes',
+                progress=lambda sent, total: progress.append(sent))
+        self.assertEqual(result, 'abc')
+        headers, body = requests[0]
+        self.assertTrue(headers['Content-Type'].startswith(
+            'multipart/form-data; boundary='))
+        self.assertEqual(int(headers['Content-Length']), len(body))
+        self.assertIn(b'z' * 200000, body)
+        self.assertEqual(progress[-1], len(body))
+
+    def test_upload_version_and_dsym(self):
+        app_id = 'e41ac9cdc3ab5f28f6e57e4dfe8cfbdb'
+        requests = []
+
+        @httmock.all_requests
+        def response(url, request):
+            requests.append((request.method, url.path,
+                             b''.join(request.body)))
+            headers = {'content-type': 'application/json; charset=utf-8'}
+            return httmock.response(201, {'id': 7, 'version': '1'},
+                                    headers, None, 5, request)
+
+        with open(os.path.join(os.path.dirname(self.path),
+                               'mapping.txt'), 'wb') as handle:
+            handle.write(b'mapping')
+        self.addCleanup(os.unlink, handle.name)
+        application = app.Application(self.TOKEN)
+        application.app_id = app_id
+        with httmock.HTTMock(response):
+            version = application.upload_version(self.path, notes='Notes')
+            self.assertTrue(application.upload_dsym(version['id'],
+                                                    handle.name))
+        self.assertEqual([request[:2] for request in requests], [
+            ('POST', '/api/2/apps/%s/app_versions/upload' % app_id),
+            ('PUT', '/api/2/apps/%s/app_versions/7' % app_id)])
+        self.assertIn(b'z' * 200000, requests[0][2])
+        self.assertIn(b'Notes', requests[0][2])
+        self.assertIn(b'filename="mapping.txt"', requests[1][2])
+        self.assertNotIn(b'z' * 200000, requests[1][2])
+
+    def test_app_id_setter_validates(self):
+        application = app.Application(self.TOKEN)
+        with self.assertRaises(ValueError):
+            application.app_id = 'foo'
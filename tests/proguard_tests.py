@@ -0,0 +1,99 @@
+"""
+Test ProGuard mapping retracing
+
+"""
+import os
+import shutil
+import tempfile
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from hockeyapp import crashparse
+from hockeyapp import proguard
+
+MAPPING = """# compiler: R8
+com.example.MainActivity -> a.a:
+    android.widget.TextView label -> a
+    1:1:void <init>():12:12 -> <init>
+    1:4:void onClick(android.view.View):40:43 -> a
+    5:5:void com.example.Helper.format(java.lang.String):20:20 -> a
+    5:5:void onClick(android.view.View):44 -> a
+    6:6:void onCreate(android.os.Bundle):30:30 -> a
+    void unused() -> b
+    void other() -> b
+com.example.Helper -> a.b:
+    1:3:java.lang.String format(java.lang.String):20:22 -> a
+com.example.MyException -> a.c:
+"""
+
+LOG = """Package: com.example
+
+a.c: boom
+\tat a.b.a(SourceFile:2)
+\tat a.a.a(SourceFile:5)
+\tat a.a.b(SourceFile)
+\tat android.view.View.performClick(View.java:6597)
+"""
+
+
+class MappingIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        mapping = os.path.join(self.root, 'mapping.txt')
+        with open(mapping, 'w') as handle:
+            handle.write(MAPPING)
+        path = os.path.join(self.root, 'mapping.idx')
+        proguard.build_index(mapping, path)
+        self.index = proguard.MappingIndex(path)
+        self.addCleanup(self.index.close)
+
+    def test_class_name(self):
+        self.assertEqual(self.index.class_name('a.a'),
+                         'com.example.MainActivity')
+        self.assertEqual(self.index.class_name('a.c'),
+                         'com.example.MyException')
+        self.assertIsNone(self.index.class_name('a.z'))
+
+    def test_method_line_range(self):
+        self.assertEqual(self.index.methods('a.a', 'a', 3),
+                         [('com.example.MainActivity', 'onClick', 42)])
+
+    def test_inlined_method(self):
+        self.assertEqual(self.index.methods('a.a', 'a', 5),
+                         [('com.example.Helper', 'format', 20),
+                          ('com.example.MainActivity', 'onClick', 44)])
+
+    def test_method_without_line(self):
+        self.assertEqual(self.index.methods('a.a', 'b'),
+                         [('com.example.MainActivity', 'unused', None),
+                          ('com.example.MainActivity', 'other', None)])
+
+    def test_unknown_method(self):
+        self.assertEqual(self.index.methods('a.a', 'z', 1), [])
+        self.assertEqual(self.index.methods('a.z', 'a', 1), [])
+
+    def test_retrace(self):
+        report = self.index.retrace(crashparse.parse_string(LOG))
+        self.assertEqual(report.exception_type, 'com.example.MyException')
+        self.assertEqual(
+            [(frame.symbol, frame.line) for frame in report.frames],
+            [('com.example.Helper.format', 21),
+             ('com.example.Helper.format', 20),
+             ('com.example.MainActivity.onClick', 44),
+             ('com.example.MainActivity.unused', None),
+             ('android.view.View.performClick', 6597)])
+
+    def test_retrace_all(self):
+        reports = list(self.index.retrace_all(
+            [crashparse.parse_string(LOG)] * 2))
+        self.assertEqual(reports[0], reports[1])
+
+    def test_invalid_index(self):
+        path = os.path.join(self.root, 'invalid.idx')
+        with open(path, 'wb') as handle:
+            handle.write(b'\0' * 32)
+        self.assertRaises(ValueError, proguard.MappingIndex, path)
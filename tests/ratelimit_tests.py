@@ -0,0 +1,131 @@
+"""
+Test request rate limiting
+
+"""
+import io
+import time
+
+import mock
+import httmock
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from hockeyapp import api
+from hockeyapp import ratelimit
+
+TOKEN = 'abcdef0123456789abcdef0123456789'
+
+
+class RetryAfterTestCase(unittest.TestCase):
+
+    def test_seconds(self):
+        self.assertEqual(ratelimit.retry_after('120'), 120)
+
+    def test_http_date(self):
+        value = time.strftime('%a, %d %b %Y %H:%M:%S GMT',
+                              time.gmtime(time.time() + 30))
+        self.assertAlmostEqual(ratelimit.retry_after(value), 30, delta=2)
+
+    def test_past_date(self):
+        self.assertEqual(
+            ratelimit.retry_after('Wed, 21 Oct 2015 07:28:00 GMT'), 0)
+
+    def test_missing(self):
+        self.assertIsNone(ratelimit.retry_after(None))
+
+    def test_invalid(self):
+        self.assertIsNone(ratelimit.retry_after('soon'))
+
+
+class RateLimiterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.limiter = ratelimit.RateLimiter(rate=10, burst=2)
+
+    def test_burst_is_not_delayed(self):
+        self.assertEqual(self.limiter.reserve(), 0)
+        self.assertEqual(self.limiter.reserve(), 0)
+
+    def test_requests_over_burst_are_spaced(self):
+        self.limiter.reserve()
+        self.limiter.reserve()
+        self.assertAlmostEqual(self.limiter.reserve(), 0.1, delta=0.01)
+        self.assertAlmostEqual(self.limiter.reserve(), 0.2, delta=0.01)
+
+    def test_throttle_halves_rate(self):
+        self.limiter.throttle(1, '0')
+        self.assertEqual(self.limiter.rate, 5)
+
+    def test_throttle_rate_minimum(self):
+        for attempt in range(20):
+            self.limiter.throttle(attempt + 1, '0')
+        self.assertEqual(self.limiter.rate, self.limiter.min_rate)
+
+    def test_throttle_holds_back_requests(self):
+        self.assertEqual(self.limiter.throttle(1, '2'), 2)
+        self.assertGreaterEqual(self.limiter.reserve(), 2)
+
+    def test_throttle_without_retry_after_backs_off(self):
+        with mock.patch('hockeyapp.api.backoff', return_value=0.5) as backoff:
+            self.assertEqual(self.limiter.throttle(3), 0.5)
+        backoff.assert_called_once_with(3, 1.0, 60.0)
+
+    def test_success_recovers_rate(self):
+        self.limiter.throttle(1, '0')
+        for _attempt in range(100):
+            self.limiter.success()
+        self.assertEqual(self.limiter.rate, 10)
+
+
+class LimitedRequestTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.limiter = ratelimit.RateLimiter(rate=1000, retries=2)
+        self.api = api.APIRequest(TOKEN, limiter=self.limiter)
+        patcher = mock.patch('time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.responses = []
+
+        @httmock.all_requests
+        def response_content(url, request):
+            status, headers = self.responses.pop(0)
+            headers['content-type'] = 'application/json'
+            return httmock.response(status, {'errors': {'rate': 'limited'}}
+                                    if status >= 400 else {'status': 'ok'},
+                                    headers, None, 5, request)
+        self.mock = httmock.HTTMock(response_content)
+        self.mock.__enter__()
+        self.addCleanup(self.mock.__exit__, None, None, None)
+
+    def test_throttled_request_is_retried(self):
+        self.responses = [(429, {'Retry-After': '3'}), (200, {})]
+        self.assertEqual(self.api._get(['apps']), {'status': 'ok'})
+        self.assertGreaterEqual(self.sleep.call_args[0][0], 3)
+
+    def test_unavailable_request_is_retried(self):
+        self.responses = [(503, {}), (503, {}), (200, {})]
+        self.assertEqual(self.api._get(['apps']), {'status': 'ok'})
+        self.assertFalse(self.responses)
+
+    def test_gives_up_after_retries(self):
+        self.responses = [(429, {})] * 3
+        with self.assertRaises(api.APIError) as context:
+            self.api._get(['apps'])
+        self.assertEqual(context.exception.status_code, 429)
+
+    def test_streamed_body_is_not_retried(self):
+        self.responses = [(429, {}), (200, {})]
+        self.assertRaises(api.APIError, self.api._post, ['apps'],
+                          io.BytesIO(b'body'))
+        self.assertEqual(len(self.responses), 1)
+
+    def test_limiter_is_shared(self):
+        other = api.APIRequest(TOKEN, limiter=self.limiter)
+        self.responses = [(429, {'Retry-After': '5'}), (200, {}), (200, {})]
+        self.api._get(['apps'])
+        self.sleep.reset_mock()
+        other._get(['apps'])
+        self.assertTrue(self.sleep.called)
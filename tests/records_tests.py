@@ -0,0 +1,183 @@
+"""
+Test the compact record types
+
+"""
+import json
+import pickle
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import mock
+
+from hockeyapp import records
+
+
+class RecordTestCase(unittest.TestCase):
+    VALUE = {'id': 1, 'model': 'iPhone10,3', 'os_version': '13.3',
+             'has_log': True, 'user_string': None, 'custom': [1, 2]}
+
+    def setUp(self):
+        self.record = records.Crash(self.VALUE)
+
+    def test_attributes(self):
+        self.assertEqual(self.record.id, 1)
+        self.assertEqual(self.record.model, 'iPhone10,3')
+
+    def test_mapping(self):
+        self.assertEqual(self.record['id'], 1)
+        self.assertIsNone(self.record['user_string'])
+        self.assertEqual(self.record['custom'], [1, 2])
+        self.assertEqual(self.record.get('oem', 'Apple'), 'Apple')
+        self.assertIn('custom', self.record)
+        self.assertNotIn('oem', self.record)
+        self.assertRaises(KeyError, lambda: self.record['oem'])
+        self.assertRaises(KeyError, lambda: self.record['keys'])
+
+    def test_missing_attribute(self):
+        self.assertRaises(AttributeError, getattr, self.record, 'oem')
+
+    def test_to_dict(self):
+        self.assertEqual(self.record.to_dict(), self.VALUE)
+        self.assertEqual(dict(self.record), self.VALUE)
+        self.assertEqual(json.loads(json.dumps(dict(self.record))),
+                         self.VALUE)
+
+    def test_equality(self):
+        self.assertEqual(self.record, self.VALUE)
+        self.assertEqual(self.VALUE, self.record)
+        self.assertEqual(self.record, records.Crash(self.VALUE))
+        self.assertNotEqual(self.record, {'id': 1})
+        self.assertNotEqual(self.record, 1)
+
+    def test_len_and_keys(self):
+        self.assertEqual(len(self.record), 6)
+        self.assertEqual(sorted(self.record), sorted(self.VALUE))
+
+    def test_no_instance_dict(self):
+        self.assertFalse(hasattr(self.record, '__dict__'))
+        self.assertIsNone(records.Crash({'id': 1})._extra)
+
+    def test_interned_values(self):
+        values = records.records(records.Crash, [
+            self.VALUE, {'model': ''.join(['iPhone', '10,3'])}])
+        self.assertIs(values[1].model, values[0].model)
+
+    def test_interned_per_list(self):
+        model = ''.join(['iPhone', '10,3'])
+        other = records.records(records.Crash, [{'model': model}])[0]
+        self.assertIs(other.model, model)
+        self.assertIsNot(records.Crash({'model': model}).model,
+                         self.record.model)
+
+    def test_shared_interned(self):
+        interned = {}
+        first = records.records(records.Crash, [self.VALUE], interned)
+        second = records.records(
+            records.Crash, [{'model': ''.join(['iPhone', '10,3'])}],
+            interned)
+        self.assertIs(second[0].model, first[0].model)
+        self.assertEqual(len(interned), 2)
+
+    def test_pickle(self):
+        self.assertEqual(pickle.loads(pickle.dumps(self.record)),
+                         self.VALUE)
+
+    def test_reserved_word_field(self):
+        reason = records.CrashReason({'class': 'AppDelegate'})
+        self.assertEqual(reason['class'], 'AppDelegate')
+
+
+class RecordListTestCase(unittest.TestCase):
+    VALUES = [{'id': 1, 'model': 'iPhone10,3'},
+              {'id': 2, 'model': ''.join(['iPhone', '10,3'])}]
+
+    def setUp(self):
+        self.values = [dict(value) for value in self.VALUES]
+        self.list = records.RecordList(records.Crash, self.values)
+
+    def test_records_built_on_access(self):
+        with mock.patch.object(records.Crash, '__init__',
+                               return_value=None) as init:
+            values = records.RecordList(records.Crash, self.values)
+            self.assertFalse(init.called)
+            values[1]
+            self.assertEqual(init.call_count, 1)
+
+    def test_sequence(self):
+        self.assertEqual(len(self.list), 2)
+        self.assertIsInstance(self.list[0], records.Crash)
+        self.assertEqual(self.list[-1].id, 2)
+        self.assertEqual([value.id for value in self.list[1:]], [2])
+        self.assertEqual(self.list, self.VALUES)
+        self.assertEqual(self.list.to_list(), self.VALUES)
+
+    def test_interned_values(self):
+        self.assertIs(self.list[1].model, self.list[0].model)
+
+
+class RecordTableTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.values = [{'id': index, 'model': 'model%d' % (index % 3),
+                        'created_at': '2015-01-01T%02d:%02d:%02dZ' % (
+                            index // 3600, index // 60 % 60, index % 60),
+                        'app_version_id': None if index % 5 else index,
+                        'flag': index % 2 == 0}
+                       for index in range(10000)]
+        self.values[10]['extra'] = {'nested': True}
+        del self.values[20]['model']
+
+    def test_round_trip(self):
+        table = records.RecordTable(records.Crash, self.values)
+        self.assertEqual(len(table), 10000)
+        self.assertEqual(list(table), self.values)
+        self.assertIsInstance(table[0], records.Crash)
+
+    def test_indexing(self):
+        table = records.RecordTable(records.Crash, self.values)
+        self.assertEqual(table[-1], self.values[-1])
+        self.assertEqual(table[2:5], self.values[2:5])
+        self.assertRaises(IndexError, lambda: table[10000])
+
+    def test_column_modes(self):
+        table = records.RecordTable(records.Crash, self.values)
+        modes = dict((name, column.mode)
+                     for name, column in table._columns.items())
+        self.assertEqual(modes['id'], 'int')
+        self.assertEqual(modes['model'], 'code')
+        self.assertEqual(modes['created_at'], 'fixed')
+        self.assertEqual(modes['extra'], 'object')
+
+    def test_column(self):
+        table = records.RecordTable(records.Crash, self.values)
+        self.assertEqual(table.column('model')[:3],
+                         ['model0', 'model1', 'model2'])
+        self.assertIsNone(table.column('model')[20])
+        self.assertEqual(table.column('unknown'), [None] * 10000)
+
+    def test_append_records(self):
+        table = records.RecordTable(records.Crash)
+        table.append(records.Crash({'id': 1}))
+        table.append({'model': 'x'})
+        self.assertEqual(list(table), [{'id': 1}, {'model': 'x'}])
+
+    def test_mixed_types(self):
+        values = [{'value': 1}, {'value': True}, {'value': 'a'},
+                  {'value': None}, {}, {'value': 2 ** 70}]
+        table = records.RecordTable(records.Crash, values)
+        self.assertEqual(list(table), values)
+        self.assertIs(table[1]['value'], True)
+
+    def test_many_codes(self):
+        values = [{'value': 'v%d' % index} for index in range(70000)]
+        table = records.RecordTable(records.Crash, values)
+        self.assertEqual(table[69999], values[69999])
+        self.assertEqual(table[300], values[300])
+
+    def test_fixed_width_falls_back_to_objects(self):
+        values = [{'value': '%05d' % index} for index in range(10000)]
+        values.append({'value': 'longer value'})
+        table = records.RecordTable(records.Crash, values)
+        self.assertEqual(list(table), values)
@@ -0,0 +1,206 @@
+"""
+Test resumable uploads
+
+"""
+import json
+import os
+import shutil
+import tempfile
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import mock
+import requests
+
+from hockeyapp import api
+from hockeyapp import app
+from hockeyapp import records
+from hockeyapp import resumable
+
+APP_ID = 'e41ac9cdc3ab5f28f6e57e4dfe8cfbdb'
+
+
+class RetryableTestCase(unittest.TestCase):
+
+    def test_connection_error_is_retryable(self):
+        self.assertTrue(resumable.retryable(
+            requests.exceptions.ConnectionError()))
+
+    def test_server_error_is_retryable(self):
+        self.assertTrue(resumable.retryable(api.APIError({}, 503)))
+
+    def test_too_many_requests_is_retryable(self):
+        self.assertTrue(resumable.retryable(api.APIError({}, 429)))
+
+    def test_client_error_is_not_retryable(self):
+        self.assertFalse(resumable.retryable(api.APIError({}, 422)))
+
+    def test_value_error_is_not_retryable(self):
+        self.assertFalse(resumable.retryable(ValueError()))
+
+    def test_server_error_is_not_retryable_if_not_idempotent(self):
+        self.assertFalse(resumable.retryable(api.APIError({}, 503), False))
+
+    def test_connection_error_is_not_retryable_if_not_idempotent(self):
+        self.assertFalse(resumable.retryable(
+            requests.exceptions.ConnectionError(), False))
+
+    def test_unsent_request_is_retryable_if_not_idempotent(self):
+        self.assertTrue(resumable.retryable(
+            requests.exceptions.ConnectTimeout(), False))
+        self.assertTrue(resumable.retryable(api.APIError({}, 429), False))
+
+
+class ResumableUploadTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.ipa = os.path.join(self.root, 'App.ipa')
+        self.dsym = os.path.join(self.root, 'mapping.txt')
+        for path in (self.ipa, self.dsym):
+            with open(path, 'wb') as handle:
+                handle.write(b'data')
+        self.state_path = os.path.join(self.root, 'state.json')
+        self.application = app.Application('0' * 32)
+        self.upload = self.patch('upload', return_value=APP_ID)
+        self.upload_version = self.patch(
+            'upload_version', return_value=records.Version({'id': 7}))
+        self.upload_dsym = self.patch('upload_dsym', return_value=True)
+        patcher = mock.patch('time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.resumable = resumable.ResumableUpload(self.application,
+                                                   self.state_path, retries=2)
+
+    def patch(self, name, **kwargs):
+        patcher = mock.patch.object(self.application, name, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def test_uploads_single_part_without_app_id(self):
+        self.assertEqual(self.resumable.upload(self.ipa, self.dsym,
+                                               notes='foo'), APP_ID)
+        self.upload.assert_called_once_with(self.ipa, self.dsym,
+                                            progress=None, notes='foo')
+        self.assertFalse(self.upload_version.called)
+        self.assertEqual(self.application.app_id, APP_ID)
+
+    def test_attaches_dsym_to_uploaded_version(self):
+        self.application.app_id = APP_ID
+        self.assertEqual(self.resumable.upload(self.ipa, self.dsym,
+                                               notes='foo', chunk_size=8,
+                                               dsym_workers=2), APP_ID)
+        self.upload_version.assert_called_once_with(
+            self.ipa, progress=None, notes='foo', chunk_size=8)
+        self.upload_dsym.assert_called_once_with(
+            7, self.dsym, progress=None, chunk_size=8, dsym_workers=2)
+        self.assertFalse(self.upload.called)
+
+    def test_uploads_single_part_with_index(self):
+        self.application.app_id = APP_ID
+        index = mock.Mock()
+        self.resumable.upload(self.ipa, self.dsym, index=index)
+        self.upload.assert_called_once_with(self.ipa, self.dsym,
+                                            progress=None, index=index)
+        self.assertFalse(self.upload_version.called)
+
+    def test_removes_state_file_when_complete(self):
+        self.application.app_id = APP_ID
+        self.resumable.upload(self.ipa, self.dsym)
+        self.assertFalse(os.path.exists(self.state_path))
+
+    def test_retries_transient_errors(self):
+        self.application.app_id = APP_ID
+        self.upload_dsym.side_effect = [
+            requests.exceptions.ConnectionError(), api.APIError({}, 503),
+            True]
+        self.assertEqual(self.resumable.upload(self.ipa, self.dsym), APP_ID)
+        self.assertEqual(self.upload_dsym.call_count, 3)
+        self.assertEqual(self.sleep.call_count, 2)
+
+    def test_retries_unsent_version_upload(self):
+        self.upload.side_effect = [requests.exceptions.ConnectTimeout(),
+                                   api.APIError({}, 429), APP_ID]
+        self.assertEqual(self.resumable.upload(self.ipa), APP_ID)
+        self.assertEqual(self.upload.call_count, 3)
+
+    def test_does_not_retry_version_upload_server_errors(self):
+        self.upload.side_effect = [api.APIError({}, 503), APP_ID]
+        self.assertRaises(api.APIError, self.resumable.upload, self.ipa)
+        self.assertEqual(self.upload.call_count, 1)
+
+    def test_does_not_retry_version_create_connection_errors(self):
+        self.application.app_id = APP_ID
+        self.upload_version.side_effect = \
+            requests.exceptions.ConnectionError()
+        self.assertRaises(requests.exceptions.ConnectionError,
+                          self.resumable.upload, self.ipa, self.dsym)
+        self.assertEqual(self.upload_version.call_count, 1)
+        self.assertFalse(self.upload_dsym.called)
+
+    def test_does_not_retry_client_errors(self):
+        self.upload.side_effect = api.APIError({'ipa': 'invalid'}, 422)
+        self.assertRaises(api.APIError, self.resumable.upload, self.ipa)
+        self.assertEqual(self.upload.call_count, 1)
+
+    def test_gives_up_after_retries(self):
+        self.application.app_id = APP_ID
+        self.upload_dsym.side_effect = api.APIError({}, 500)
+        self.assertRaises(api.APIError, self.resumable.upload,
+                          self.ipa, self.dsym)
+        self.assertEqual(self.upload_dsym.call_count, 3)
+
+    def test_saves_completed_parts(self):
+        self.application.app_id = APP_ID
+        self.upload_dsym.side_effect = ValueError()
+        self.assertRaises(ValueError, self.resumable.upload,
+                          self.ipa, self.dsym)
+        with open(self.state_path) as handle:
+            self.assertEqual(json.load(handle)['parts'], {'ipa': 7})
+
+    def test_resumes_from_state_file(self):
+        self.application.app_id = APP_ID
+        self.upload_dsym.side_effect = ValueError()
+        self.assertRaises(ValueError, self.resumable.upload,
+                          self.ipa, self.dsym)
+        self.upload_version.reset_mock()
+        self.upload_dsym.reset_mock(side_effect=True)
+        self.assertEqual(self.resumable.upload(self.ipa, self.dsym), APP_ID)
+        self.assertFalse(self.upload_version.called)
+        self.upload_dsym.assert_called_once_with(7, self.dsym, progress=None)
+
+    def test_resumes_single_part_from_state_file(self):
+        with open(self.state_path, 'w') as handle:
+            json.dump({'key': self.resumable._key(self.ipa, self.dsym, {}),
+                       'parts': {'upload': APP_ID}}, handle)
+        self.assertEqual(self.resumable.upload(self.ipa, self.dsym), APP_ID)
+        self.assertFalse(self.upload.called)
+        self.assertEqual(self.application.app_id, APP_ID)
+
+    def test_ignores_state_for_changed_files(self):
+        self.application.app_id = APP_ID
+        self.upload_dsym.side_effect = ValueError()
+        self.assertRaises(ValueError, self.resumable.upload,
+                          self.ipa, self.dsym)
+        with open(self.ipa, 'ab') as handle:
+            handle.write(b'changed build')
+        self.upload_dsym.reset_mock(side_effect=True)
+        self.resumable.upload(self.ipa, self.dsym)
+        self.assertEqual(self.upload_version.call_count, 2)
+
+    def test_progress_includes_part_name(self):
+        self.application.app_id = APP_ID
+        progress = mock.Mock()
+
+        def upload(*args, **kwargs):
+            kwargs['progress'](4, 4)
+            return mock.DEFAULT
+
+        self.upload_version.side_effect = upload
+        self.upload_dsym.side_effect = upload
+        self.resumable.upload(self.ipa, self.dsym, progress=progress)
+        self.assertEqual(progress.call_args_list, [mock.call('ipa', 4, 4),
+                                                   mock.call('dsym', 4, 4)])
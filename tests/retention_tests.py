@@ -0,0 +1,67 @@
+"""
+Test version retention planning
+
+"""
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from hockeyapp import retention
+
+
+class PlanTestCase(unittest.TestCase):
+    VERSIONS = [
+        {'id': 1, 'version': '9', 'timestamp': 500, 'appsize': 100},
+        {'id': 2, 'version': '10', 'timestamp': 100, 'appsize': 200},
+        {'id': 3, 'version': '1.2.10', 'timestamp': 300, 'appsize': 300},
+        {'id': 4, 'version': '1.2.9', 'timestamp': 400, 'appsize': 400},
+        {'id': 5, 'version': '11', 'timestamp': 200, 'appsize': 0}]
+
+    def ids(self, **kwargs):
+        return [value['id'] for value in
+                retention.plan(self.VERSIONS, **kwargs)]
+
+    def test_keep_by_version(self):
+        self.assertEqual(self.ids(keep=2), [4, 3, 1])
+
+    def test_keep_by_date(self):
+        self.assertEqual(self.ids(sort='date', keep=2), [2, 5, 3])
+
+    def test_number(self):
+        self.assertEqual(self.ids(number=2), [4, 3])
+
+    def test_number_and_keep(self):
+        self.assertEqual(self.ids(number=2, keep=4), [4])
+
+    def test_keep_more_than_versions(self):
+        self.assertEqual(self.ids(keep=10), [])
+
+    def test_storage_percentage(self):
+        self.assertEqual(self.ids(sort='date', storage_percentage=50),
+                         [2, 5, 3])
+
+    def test_storage_percentage_respects_keep(self):
+        self.assertEqual(self.ids(storage_percentage=0, keep=1),
+                         [4, 3, 1, 2])
+
+    def test_storage_percentage_not_exceeded(self):
+        self.assertEqual(self.ids(storage_percentage=100), [])
+
+    def test_version_id(self):
+        self.assertEqual(self.ids(version_id=1), [4, 3])
+
+    def test_unknown_version_id(self):
+        self.assertRaises(ValueError, retention.plan, self.VERSIONS,
+                          version_id=42)
+
+    def test_requires_criteria(self):
+        self.assertRaises(ValueError, retention.plan, self.VERSIONS)
+
+    def test_invalid_sort(self):
+        self.assertRaises(ValueError, retention.plan, self.VERSIONS,
+                          sort='size', keep=1)
+
+    def test_invalid_storage_percentage(self):
+        self.assertRaises(ValueError, retention.plan, self.VERSIONS,
+                          storage_percentage=150)
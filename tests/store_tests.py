@@ -0,0 +1,139 @@
+"""
+Test the SQLite crash store
+
+"""
+import mock
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from hockeyapp import app
+from hockeyapp import store
+
+
+class StoreTestCase(unittest.TestCase):
+    TOKEN = 'abcdef0123456789abcdef0123456789'
+    APP_ID = '0123456789abcdef0123456789abcdef'
+
+    def setUp(self):
+        self.store = store.Store()
+        self.app = app.Application(self.TOKEN, self.APP_ID)
+        self.reason_data = []
+        self.crash_data = {}
+        self.feedback_data = []
+        self.version_data = [{'id': 1, 'version': '10', 'shortversion': '1.0',
+                              'timestamp': 1000}]
+        self.requests = []
+        for name in ('crash_groups', 'crashes', 'feedback', 'versions'):
+            patcher = mock.patch.object(self.app, name,
+                                        side_effect=getattr(self, name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.store.close()
+
+    def add_crash(self, reason_id, crash_id, created_at):
+        crashes = self.crash_data.setdefault(reason_id, [])
+        crashes.append({'id': crash_id, 'crash_reason_id': reason_id,
+                        'created_at': created_at})
+        self.reason_data = [r for r in self.reason_data
+                            if r['id'] != reason_id]
+        self.reason_data.append({'id': reason_id,
+                             'number_of_crashes': len(crashes),
+                             'last_crash_at': created_at})
+        self.reason_data.sort(key=lambda r: r['last_crash_at'],
+                              reverse=True)
+
+    def crash_groups(self, offset, limit, **kwargs):
+        self.requests.append(('crash_groups', offset))
+        return self.page(app.CrashGroups, self.reason_data, offset, limit)
+
+    def crashes(self, reason_id, offset, limit):
+        self.requests.append(('crashes', reason_id, offset))
+        return self.page(app.Crashes, self.crash_data[reason_id],
+                         offset, limit)
+
+    def feedback(self, offset, limit, order):
+        self.requests.append(('feedback', offset))
+        return self.page(app.Feedback, self.feedback_data, offset, limit)
+
+    def versions(self):
+        self.requests.append(('versions',))
+        return [dict(version) for version in self.version_data]
+
+    @staticmethod
+    def page(page_type, items, offset, limit):
+        pages = (len(items) + limit - 1) // limit
+        return page_type(items[(offset - 1) * limit:offset * limit],
+                         len(items), pages, offset, limit)
+
+    def test_initial_sync(self):
+        self.add_crash(1, 100, '2014-01-01T00:00:00Z')
+        self.add_crash(1, 101, '2014-01-02T00:00:00Z')
+        self.add_crash(2, 200, '2014-01-03T00:00:00Z')
+        self.feedback_data = [{'id': 5,
+                               'created_at': '2014-01-01T00:00:00Z'}]
+        counts = self.store.sync(self.app)
+        self.assertEqual(counts, {'crash_reasons': 2, 'crashes': 3,
+                                  'versions': 1, 'feedback': 1})
+        self.assertEqual([c['id'] for c in self.store.crashes(self.APP_ID, 1)],
+                         [100, 101])
+        self.assertEqual([r['id'] for r in
+                          self.store.crash_reasons(self.APP_ID)], [2, 1])
+        self.assertEqual(self.store.versions(self.APP_ID)[0]['shortversion'],
+                         '1.0')
+        self.assertEqual(self.store.checkpoint(self.APP_ID, 'last_crash_at'),
+                         '2014-01-03T00:00:00Z')
+
+    def test_incremental_sync_only_fetches_changes(self):
+        for crash_id in range(250):
+            self.add_crash(1, crash_id, '2014-01-01T00:00:00Z')
+        self.add_crash(2, 1000, '2014-01-02T00:00:00Z')
+        self.store.sync(self.app)
+        self.add_crash(1, 250, '2014-02-01T00:00:00Z')
+        self.requests = []
+        counts = self.store.sync(self.app)
+        self.assertEqual(counts, {'crash_reasons': 1, 'crashes': 1,
+                                  'versions': 0, 'feedback': 0})
+        self.assertIn(('crashes', 1, 3), self.requests)
+        self.assertNotIn(('crashes', 1, 1), self.requests)
+        self.assertNotIn(('crashes', 2, 1), self.requests)
+        self.assertEqual(len(self.store.crashes(self.APP_ID)), 252)
+
+    def test_sync_without_changes(self):
+        self.add_crash(1, 100, '2014-01-01T00:00:00Z')
+        self.store.sync(self.app)
+        counts = self.store.sync(self.app)
+        self.assertEqual(counts, {'crash_reasons': 0, 'crashes': 0,
+                                  'versions': 0, 'feedback': 0})
+
+    def test_sync_counts_changed_versions(self):
+        self.store.sync(self.app)
+        self.version_data[0]['title'] = 'Renamed'
+        self.version_data.append({'id': 2, 'version': '11',
+                                  'shortversion': '1.1', 'timestamp': 2000})
+        counts = self.store.sync(self.app)
+        self.assertEqual(counts['versions'], 2)
+        self.assertEqual(self.store.versions(self.APP_ID)[1]['title'],
+                         'Renamed')
+
+    def test_sync_without_crashes_keeps_crash_checkpoint(self):
+        self.add_crash(1, 100, '2014-01-01T00:00:00Z')
+        self.store.sync(self.app)
+        self.add_crash(2, 200, '2014-02-01T00:00:00Z')
+        counts = self.store.sync(self.app, crashes=False)
+        self.assertEqual(counts['crash_reasons'], 1)
+        self.assertEqual(counts['crashes'], 0)
+        self.assertEqual(self.store.checkpoint(self.APP_ID, 'last_crash_at'),
+                         '2014-02-01T00:00:00Z')
+        self.add_crash(3, 300, '2014-03-01T00:00:00Z')
+        counts = self.store.sync(self.app)
+        self.assertEqual(counts['crashes'], 2)
+        self.assertEqual(sorted(c['id'] for c in
+                                self.store.crashes(self.APP_ID)),
+                         [100, 200, 300])
+        self.assertEqual(self.store.checkpoint(self.APP_ID,
+                                               'crashes_last_crash_at'),
+                         '2014-03-01T00:00:00Z')
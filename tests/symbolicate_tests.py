@@ -0,0 +1,171 @@
+"""
+Test offline symbolication
+
+"""
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import mock
+
+from hockeyapp import crashparse
+from hockeyapp import symbolicate
+
+UUID = 'a1b2c3d4e5f60718293a4b5c6d7e8f90'
+TEXT_ADDRESS = 0x100000000
+
+
+def macho(uuid=UUID, symbols=None):
+    """Return a 64-bit Mach-O file with a UUID, __TEXT segment and symbols"""
+    symbols = symbols or [(0x100001000, b'_main'),
+                          (0x100001100, b'-[ViewController tap:]'),
+                          (0x100001200, b'_helper')]
+    entries = symbols + [(0x100001000, b'stab', 0x24),
+                         (0, b'_undefined', 0x01)]
+    strings, nlist = b'\0', b''
+    for entry in entries:
+        nlist += struct.pack('<IBBHQ', len(strings),
+                             entry[2] if len(entry) > 2 else 0x0f, 1, 0,
+                             entry[0])
+        strings += entry[1] + b'\0'
+    symoff = 32 + 24 + 72 + 24
+    commands = (struct.pack('<II', 0x1b, 24) + bytes(bytearray.fromhex(uuid)) +
+                struct.pack('<II16sQQQQiiII', 0x19, 72, b'__TEXT',
+                            TEXT_ADDRESS, 0x4000, 0, 0x4000, 5, 5, 0, 0) +
+                struct.pack('<IIIIII', 0x2, 24, symoff, len(entries),
+                            symoff + len(nlist), len(strings)))
+    header = struct.pack('<IiiIIIII', 0xfeedfacf, 0x0100000c, 0, 0xa, 3,
+                         len(commands), 0, 0)
+    return header + commands + nlist + strings
+
+
+def fat(*slices):
+    """Return a universal Mach-O file containing the slices"""
+    data = struct.pack('>II', 0xcafebabe, len(slices))
+    offset = 8 + 20 * len(slices)
+    body = b''
+    for value in slices:
+        data += struct.pack('>iiIII', 0x0100000c, 0, offset + len(body),
+                            len(value), 0)
+        body += value
+    return data + body
+
+
+class ReadMachOTestCase(unittest.TestCase):
+
+    def test_thin(self):
+        slices = symbolicate.read_macho(macho())
+        self.assertEqual(len(slices), 1)
+        self.assertEqual(slices[0].uuid, UUID)
+        self.assertEqual(slices[0].text_address, TEXT_ADDRESS)
+        self.assertEqual(sorted(slices[0].symbols),
+                         [(0x100001000, 'main'),
+                          (0x100001100, '-[ViewController tap:]'),
+                          (0x100001200, 'helper')])
+
+    def test_fat(self):
+        other = 'ffffffffffffffffffffffffffffffff'
+        slices = symbolicate.read_macho(fat(macho(), macho(other)))
+        self.assertEqual([value.uuid for value in slices], [UUID, other])
+
+    def test_not_macho(self):
+        self.assertRaises(ValueError, symbolicate.read_macho, b'\0' * 64)
+
+
+class BuildIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.path = os.path.join(self.root, 'MyApp')
+        self.other = 'ffffffffffffffffffffffffffffffff'
+        with open(self.path, 'wb') as handle:
+            handle.write(fat(macho(), macho(self.other)))
+
+    def test_fat_file(self):
+        destination = os.path.join(self.root, 'index')
+        self.assertEqual(symbolicate.build_index(self.path, destination),
+                         [UUID, self.other])
+        self.assertEqual(sorted(os.listdir(destination)),
+                         sorted([UUID + symbolicate.INDEX_SUFFIX,
+                                 self.other + symbolicate.INDEX_SUFFIX]))
+
+    def test_file_is_memory_mapped(self):
+        with mock.patch('mmap.mmap', side_effect=mmap.mmap) as mapped:
+            symbolicate.build_index(self.path,
+                                    os.path.join(self.root, 'index'))
+        self.assertEqual(mapped.call_count, 1)
+
+    def test_not_macho(self):
+        with open(self.path, 'wb') as handle:
+            handle.write(b'\0' * 64)
+        self.assertRaises(ValueError, symbolicate.build_index, self.path,
+                          os.path.join(self.root, 'index'))
+
+
+class SymbolicatorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        dwarf = os.path.join(self.root, 'MyApp.app.dSYM', 'Contents',
+                             'Resources', 'DWARF')
+        os.makedirs(dwarf)
+        with open(os.path.join(dwarf, 'MyApp'), 'wb') as handle:
+            handle.write(macho())
+        self.symbolicator = symbolicate.Symbolicator(
+            os.path.join(self.root, 'index'), max_indexes=1)
+        self.addCleanup(self.symbolicator.close)
+        self.assertEqual(self.symbolicator.add(
+            os.path.join(self.root, 'MyApp.app.dSYM')), [UUID])
+        load_address = 0x104a00000
+        self.report = crashparse.CrashReport(
+            crashparse.APPLE, {}, 'EXC_CRASH (SIGABRT)', None, '0', [
+                crashparse.Frame('MyApp', None, load_address + 0x1108, 4360,
+                                 None, None),
+                crashparse.Frame('MyApp', None, load_address + 0x1204, 4612,
+                                 None, None),
+                crashparse.Frame('UIKitCore', None, 0x1a6d1e2c4, None, None,
+                                 None),
+                crashparse.Frame('MyApp', 'main', load_address + 0x1000, 0,
+                                 None, None)],
+            [crashparse.BinaryImage(load_address, load_address + 0x3fff,
+                                    'MyApp', 'arm64', UUID, '/MyApp')])
+
+    def test_symbolicate(self):
+        frames = self.symbolicator.symbolicate(self.report).frames
+        self.assertEqual([(frame.symbol, frame.offset) for frame in frames],
+                         [('-[ViewController tap:]', 8), ('helper', 4),
+                          (None, None), ('main', 0)])
+
+    def test_symbolicate_all(self):
+        reports = list(self.symbolicator.symbolicate_all([self.report] * 3))
+        self.assertEqual(len(reports), 3)
+        self.assertEqual(reports[2].frames[0].symbol,
+                         '-[ViewController tap:]')
+
+    def test_index_is_cached(self):
+        self.assertIs(self.symbolicator.index(UUID),
+                      self.symbolicator.index(UUID.upper()))
+
+    def test_least_recently_used_index_is_closed(self):
+        index = self.symbolicator.index(UUID)
+        self.assertIsNone(self.symbolicator.index('f' * 32))
+        self.assertIsNot(self.symbolicator.index(UUID), index)
+
+    def test_address_before_first_symbol(self):
+        index = self.symbolicator.index(UUID)
+        self.assertIsNone(index.lookup(0x10))
+        self.assertEqual(len(index), 3)
+
+    def test_invalid_index(self):
+        path = os.path.join(self.root, 'invalid.symidx')
+        with open(path, 'wb') as handle:
+            handle.write(b'\0' * 64)
+        self.assertRaises(ValueError, symbolicate.SymbolIndex, path)
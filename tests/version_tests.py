@@ -0,0 +1,81 @@
+"""
+Test the version API requests
+
+"""
+import io
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import httmock
+
+from hockeyapp import version
+
+
+class VersionRequestTestCase(unittest.TestCase):
+    TOKEN = 'abcdef0123456789abcdef0123456789'
+    APP_ID = '0123456789abcdef0123456789abcdef'
+
+    def setUp(self):
+        self.requests = []
+
+        @httmock.all_requests
+        def response(url, request):
+            body = request.body
+            if body is not None and not isinstance(body, (bytes, str)):
+                body = b''.join(body)
+            self.requests.append((request.method, url.path, request.headers,
+                                  body))
+            headers = {'content-type': 'application/json; charset=utf-8'}
+            return httmock.response(201, {'id': 7, 'version': '12'},
+                                    headers, None, 5, request)
+        self.mock = httmock.HTTMock(response)
+        self.mock.__enter__()
+        self.addCleanup(self.mock.__exit__, None, None, None)
+
+    def test_delete(self):
+        request = version.AppVersionDelete(self.TOKEN, self.APP_ID, 7)
+        self.assertTrue(request.execute())
+        method, path, _headers, body = self.requests[0]
+        self.assertEqual((method, path),
+                         ('DELETE', '/api/2/apps/%s/app_versions/7' %
+                          self.APP_ID))
+        self.assertFalse(body)
+
+    def test_delete_purge(self):
+        request = version.AppVersionDelete(self.TOKEN, self.APP_ID, 7,
+                                           purge=True)
+        self.assertTrue(request.execute())
+        method, path, _headers, body = self.requests[0]
+        self.assertEqual((method, path),
+                         ('DELETE', '/api/2/apps/%s/app_versions/7' %
+                          self.APP_ID))
+        self.assertEqual(body, 'strategy=purge')
+
+    def test_add(self):
+        ipa = io.BytesIO(b'z' * 100000)
+        ipa.name = '/tmp/App.ipa'
+        dsym = io.BytesIO(b'mapping')
+        progress = []
+        request = version.AppVersionAdd(self.TOKEN, self.APP_ID, ipa, dsym,
+                                        notes='Fixes', tags='beta')
+        self.assertEqual(request.execute(
+            progress=lambda sent, total: progress.append((sent, total)),
+            chunk_size=4096), {'id': 7, 'version': '12'})
+        method, path, headers, body = self.requests[0]
+        self.assertEqual((method, path),
+                         ('POST', '/api/2/apps/%s/app_versions/upload' %
+                          self.APP_ID))
+        self.assertTrue(headers['Content-Type'].startswith(
+            'multipart/form-data; boundary='))
+        self.assertIn(b'filename="App.ipa"', body)
+        self.assertIn(b'filename="dsym"', body)
+        self.assertIn(b'z' * 100000, body)
+        for name, value in ((b'notes', b'Fixes'), (b'notes_type', b'1'),
+                            (b'notify', b'1'), (b'status', b'2'),
+                            (b'tags', b'beta')):
+            self.assertIn(b'name="' + name + b'"\r\n\r\n' + value + b'\r\n',
+                          body)
+        self.assertEqual(progress[-1], (len(body), len(body)))
+        self.assertGreater(len(progress), 1)
@@ -0,0 +1,146 @@
+"""
+Test crash spike watching
+
+"""
+import io
+import json
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import mock
+
+from hockeyapp import api
+from hockeyapp import app
+from hockeyapp import watch
+
+
+class WatcherTestCase(unittest.TestCase):
+    TOKEN = 'abcdef0123456789abcdef0123456789'
+    APP_ID = '0123456789abcdef0123456789abcdef'
+
+    def setUp(self):
+        self.groups = [self.group(id_, 10, '2015-01-01T00:%02i:00Z' % id_)
+                       for id_ in range(1, 251)]
+        self.calls = []
+
+        def crash_groups(offset=1, limit=25, order='asc', sort=None):
+            self.calls.append((offset, order, sort))
+            groups = sorted(self.groups, reverse=True,
+                            key=lambda value: value['last_crash_at'])
+            pages = (len(groups) + limit - 1) // limit
+            return app.CrashGroups(groups[(offset - 1) * limit:offset * limit],
+                                   len(groups), pages, offset, limit)
+        patcher = mock.patch.object(app.Application, 'crash_groups',
+                                    side_effect=crash_groups)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.now = 1000000.0
+        patcher = mock.patch('time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.watcher = watch.Watcher(app.Applications(self.TOKEN),
+                                     [self.APP_ID], threshold=100,
+                                     rate_factor=5.0, min_crashes=10)
+
+    @staticmethod
+    def group(id_, crashes, last_crash_at):
+        return {'id': id_, 'number_of_crashes': crashes,
+                'reason': 'reason %i' % id_, 'last_crash_at': last_crash_at,
+                'created_at': '2015-01-01T00:00:00Z'}
+
+    def crash(self, id_, crashes, last_crash_at):
+        self.groups[id_ - 1] = self.group(id_, crashes, last_crash_at)
+
+    def test_baseline_emits_no_events(self):
+        self.assertEqual(self.watcher.poll(), [])
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(self.calls[0], (1, 'desc', 'last_crash_at'))
+
+    def test_unchanged_poll_fetches_one_page(self):
+        self.watcher.poll()
+        del self.calls[:]
+        self.assertEqual(self.watcher.poll(), [])
+        self.assertEqual(len(self.calls), 1)
+
+    def test_new_group(self):
+        self.watcher.poll()
+        self.groups.append(self.group(251, 3, '2015-01-02T00:00:00Z'))
+        events = self.watcher.poll()
+        self.assertEqual([(event.kind, event.group_id, event.new_crashes)
+                          for event in events], [(watch.NEW, 251, 3)])
+
+    def test_threshold(self):
+        self.watcher.poll()
+        self.crash(5, 200, '2015-01-02T00:00:00Z')
+        events = self.watcher.poll()
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].kind, watch.THRESHOLD)
+        self.assertEqual(events[0].crashes, 200)
+        self.assertEqual(events[0].new_crashes, 190)
+
+    def test_rate(self):
+        self.watcher.poll()
+        for minutes, crashes in ((60, 12), (120, 14), (121, 40)):
+            self.now = 1000000.0 + minutes * 60
+            self.crash(5, crashes, '2015-01-02T00:%02i:00Z' % (minutes % 60))
+            events = self.watcher.poll()
+        self.assertEqual([event.kind for event in events], [watch.RATE])
+        self.assertEqual(events[0].new_crashes, 26)
+        self.assertEqual(events[0].rate, 26.0)
+
+    def test_rate_below_min_crashes(self):
+        self.watcher.poll()
+        self.now += 60
+        self.crash(5, 15, '2015-01-02T00:00:00Z')
+        self.assertEqual(self.watcher.poll(), [])
+
+    def test_paging_stops_at_unchanged_groups(self):
+        self.watcher.poll()
+        del self.calls[:]
+        for id_ in range(1, 151):
+            self.crash(id_, 11, '2015-01-02T00:00:00Z')
+        self.watcher.poll()
+        self.assertEqual(len(self.calls), 2)
+
+    def test_errors_are_logged(self):
+        with mock.patch.object(app.Application, 'crash_groups',
+                               side_effect=api.APIError({'app': 'invalid'},
+                                                        422)):
+            self.assertEqual(self.watcher.poll(), [])
+        self.assertEqual(self.watcher.poll(), [])
+
+    def test_run(self):
+        callback = mock.Mock()
+        self.groups.append(self.group(251, 3, '2015-01-02T00:00:00Z'))
+        self.watcher.run(callback, interval=0, polls=2)
+        self.assertFalse(callback.called)
+
+    def test_stop(self):
+        self.watcher.stop()
+        with mock.patch.object(self.watcher, '_stop') as stop:
+            stop.is_set.side_effect = [False, True]
+            self.watcher.run(mock.Mock(), interval=0)
+        self.assertEqual(len(self.calls), 3)
+
+    def test_defaults_to_all_apps(self):
+        with mock.patch.object(app.Applications, 'list',
+                               return_value=[{'public_identifier':
+                                              self.APP_ID}]):
+            watcher = watch.Watcher(app.Applications(self.TOKEN))
+            watcher.poll()
+        self.assertEqual(watcher.app_ids, [self.APP_ID])
+
+
+class JSONLinesTestCase(unittest.TestCase):
+
+    def test_json_lines(self):
+        output = io.StringIO()
+        event = watch.Event(watch.NEW, 'a', 1, 'reason', 3, 3, None, None,
+                            '2015-01-02T00:00:00Z', 1.0)
+        watch.json_lines(event, output)
+        value = output.getvalue()
+        self.assertTrue(value.endswith('\n'))
+        self.assertEqual(json.loads(value)['kind'], 'new')
+        self.assertEqual(json.loads(value)['group_id'], 1)